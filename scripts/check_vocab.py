@@ -1,46 +1,72 @@
-import pickle
-import os
+"""
+Prints the vocabulary and token statistics of prepared datasets.
+
+Reads only `metadata.json` and the `stats.npz` index written by
+`craft dataset prepare` (see `craft.data.dataset_index`), so it returns
+instantly regardless of corpus size.
+
+Usage:
+    python scripts/check_vocab.py [DATASET_DIR ...] [--top N]
+"""
+import argparse
 import json
+import os
+
+from craft.data.dataset_index import DatasetIndex
+
+DEFAULT_DIRS = ['data/processed/got/char', 'data/processed/got/subword']
+
+
+def check_dataset(directory, top=10):
+    if not os.path.exists(os.path.join(directory, 'metadata.json')):
+        print(f"\nNo prepared dataset found in: {directory}")
+        return
+    index = DatasetIndex.open(directory)
+    print(f"\n{directory}:")
+    print(f"  Vocabulary size: {index.vocab_size}")
+    print(f"  Number of tokens: {index.total_tokens:,}")
+    for split, size in index.split_sizes.items():
+        documents = index.num_documents(split)
+        details = f", {documents:,} documents" if documents is not None else ""
+        try:
+            details = f" in {len(index.shard_lengths(split))} file(s)" + details
+        except KeyError:
+            pass # Legacy metadata without a token_store header
+        print(f"  {split}: {size:,} tokens{details}")
+    if not index.has_stats:
+        print("  No stats.npz index (re-run `craft dataset prepare` for token frequencies).")
+        return
+    counts = index.unigram_counts()
+    print(f"  Token ids used: {int((counts > 0).sum())} of {len(counts)}")
+    idx_to_char = index.metadata.get('idx_to_char') or {}
+    total = max(int(counts.sum()), 1)
+    for token_id in counts.argsort()[::-1][:top]:
+        label = repr(idx_to_char.get(str(token_id), token_id))
+        print(f"    {label:>8}: {counts[token_id] / total:.2%}")
+
+
+def check_tokenizer(path):
+    if not os.path.exists(path):
+        print(f"\nTokenizer file not found: {path}")
+        return
+    print("\nTokenizer Data:")
+    with open(path, 'r', encoding='utf-8') as f:
+        tokenizer_data = json.load(f)
+    print(f"  Model type: {tokenizer_data.get('model', {}).get('type')}")
+    vocab_data = tokenizer_data.get('model', {}).get('vocab', {})
+    print(f"  Vocabulary size: {len(vocab_data)}")
+    print(f"  Special tokens: {tokenizer_data.get('added_tokens', [])}")
+
+
+def check_vocab_size(directories=None, top=10):
+    for directory in directories or DEFAULT_DIRS:
+        check_dataset(directory, top)
+    check_tokenizer('data/processed/got/subword/tokenizer/tokenizer.json')
 
-def check_vocab_size():
-    # Check character-level data
-    char_data_path = 'data/processed/got/char/game_of_thrones_train.pkl'
-    if not os.path.exists(char_data_path):
-        print(f"Character-level file not found: {char_data_path}")
-    else:
-        print("\nCharacter-Level Data:")
-        with open(char_data_path, 'rb') as f:
-            data = pickle.load(f)
-            print(f"  Vocabulary size: {data.get('vocab_size')}")
-            print(f"  Number of tokens: {len(data.get('token_ids', []))}")
-            print(f"  Number of unique characters: {len(data.get('chars', []))}")
-    
-    # Check subword-level data
-    # Note: Subword data files themselves might not exist yet, 
-    # the script currently only checks for a hypothetical train file.
-    subword_data_path = 'data/processed/got/subword/game_of_thrones_train.pkl' 
-    if not os.path.exists(subword_data_path):
-        print(f"\nSubword-level data file not found: {subword_data_path}")
-    else:
-        print("\nSubword-Level Data:")
-        with open(subword_data_path, 'rb') as f:
-            data = pickle.load(f)
-            print(f"  Vocabulary size: {data.get('vocab_size')}")
-            print(f"  Tokenizer name: {data.get('tokenizer_name')}")
-            print(f"  Number of tokens: {len(data.get('token_ids', []))}")
-    
-    # Check the tokenizer file
-    tokenizer_path = 'data/processed/got/subword/tokenizer/tokenizer.json'
-    if not os.path.exists(tokenizer_path):
-        print(f"\nTokenizer file not found: {tokenizer_path}")
-    else:
-        print("\nTokenizer Data:")
-        with open(tokenizer_path, 'r', encoding='utf-8') as f:
-            tokenizer_data = json.load(f)
-            print(f"  Model type: {tokenizer_data.get('model', {}).get('type')}")
-            vocab_data = tokenizer_data.get('model', {}).get('vocab', {})
-            print(f"  Vocabulary size: {len(vocab_data)}")
-            print(f"  Special tokens: {tokenizer_data.get('added_tokens', [])}")
 
 if __name__ == "__main__":
-    check_vocab_size() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('directories', nargs='*', help="Prepared dataset directories (default: the GoT char/subword datasets).")
+    parser.add_argument('--top', type=int, default=10, help="Number of most frequent tokens to show.")
+    args = parser.parse_args()
+    check_vocab_size(args.directories, args.top)
@@ -1,5 +1,6 @@
 # src/cli/dataset_commands.py
 import typer
+import codecs
 import logging
 import os
 import sys
@@ -17,6 +18,19 @@ from ..data.tokenizers.sentencepiece_trainer import train_sentencepiece_model
 from ..data.tokenizers.sentencepiece import SentencePieceTokenizer
 # Import char processor
 from ..data.char_processor import process_char_data
+# Import raw token store helpers
+from ..data.token_store import (
+    select_token_dtype, build_token_store_header, DOC_INDEX_SUFFIX, TOKEN_FILE_SUFFIX,
+    COMPRESSED_FILE_SUFFIX, DEFAULT_CHUNK_TOKENS,
+)
+from ..data.compressed_store import CODECS, resolve_codec
+from ..data.dedup import Deduplicator, DEFAULT_WINDOW_CHARS
+from ..data.dataset_index import STATS_FILE_NAME
+from ..data.preprocessing import (
+    SentencePieceEncoder, encode_documents_to_token_file, encode_file_cached, write_split_token_files,
+    DOC_FORMATS, DEFAULT_DOC_DELIMITER,
+)
+from ..data.token_cache import TokenCache, CACHE_DIR_ENV_VAR, DEFAULT_CACHE_DIR
 # Import IO utils
 from ..utils.io import ensure_directory
 
@@ -106,6 +120,20 @@ def prepare_dataset(
     split_ratios: Optional[str] = typer.Option(None, "--split-ratios", help="Train/Val/Test ratios (e.g., '0.9,0.05,0.05'). Default for char: 0.9,0.05,0.05. Required for subword.", callback=lambda v: [float(x) for x in v.split(',')] if v else None),
     tokenizer_path: Optional[Path] = typer.Option(None, "--tokenizer-path", help="Required for type='subword'. Path to the trained SentencePiece tokenizer model prefix (e.g., /path/to/spm)."), # Clarified help text
     force: bool = typer.Option(False, "--force", "-f", help="Force reprocessing by deleting existing files/dirs in the output directory"),
+    write_pickle: bool = typer.Option(True, "--pickle/--no-pickle", help="Also write legacy .pkl split files next to the raw .bin token files."),
+    shard_size: Optional[int] = typer.Option(None, "--shard-size", min=1, help="Write each split as '{split}-NNNNN.bin' shards of at most this many tokens (for ShardedTokenDataset)."),
+    num_workers: int = typer.Option(1, "--num-workers", "-w", min=1, help="Number of processes used to tokenize line-aligned chunks of the input in parallel."),
+    cache_dir: Optional[Path] = typer.Option(None, "--cache-dir", help="Token cache directory. Reuses tokens encoded earlier from the same input and tokenizer.", file_okay=False),
+    doc_format: Optional[str] = typer.Option(None, "--doc-format", help="Treat the input as documents ('jsonl' or 'delimited'): pack them with EOS separators and write per-split document boundary indexes.", case_sensitive=False),
+    doc_delimiter: str = typer.Option(DEFAULT_DOC_DELIMITER, "--doc-delimiter", help="Document separator for --doc-format=delimited (backslash escapes such as '\\n' are decoded).", callback=lambda v: codecs.decode(v, 'unicode_escape')),
+    text_field: str = typer.Option("text", "--text-field", help="JSON field holding the document text for --doc-format=jsonl."),
+    compression: Optional[str] = typer.Option(None, "--compression", help="Write splits as chunk-compressed '.tkz' files with this codec ('auto', 'zstd', 'lz4' or 'zlib'). Combine with --no-pickle to keep only the compressed copy.", case_sensitive=False),
+    chunk_tokens: int = typer.Option(DEFAULT_CHUNK_TOKENS, "--chunk-tokens", min=1, help="Tokens per independently compressed chunk for --compression."),
+    dedup: Optional[str] = typer.Option(None, "--dedup", help="Drop duplicate documents (or line-aligned windows of plain text) while tokenizing: 'exact' or 'minhash' (exact plus near duplicates). The removed fraction is saved in metadata.json.", case_sensitive=False),
+    dedup_window_chars: int = typer.Option(DEFAULT_WINDOW_CHARS, "--dedup-window-chars", min=1, help="Window size in characters used as the dedup unit when --doc-format is not set."),
+    minhash_perm: int = typer.Option(128, "--minhash-perm", min=1, help="MinHash signature length for --dedup=minhash."),
+    minhash_bands: int = typer.Option(16, "--minhash-bands", min=1, help="LSH bands for --dedup=minhash (more bands catch less similar near duplicates)."),
+    dedup_ngram: int = typer.Option(5, "--dedup-ngram", min=1, help="Words per MinHash shingle."),
 ) -> None: # Added return type hint
     """Prepare a dataset for training (char or subword tokenization and splitting)."""
     logger.info(f"Starting dataset preparation...")
@@ -119,6 +147,24 @@ def prepare_dataset(
         raise typer.Exit(code=1)
     if type == "char" and tokenizer_path:
         logger.warning("--tokenizer-path is ignored when --type='char'")
+    if doc_format is not None and doc_format not in DOC_FORMATS:
+        logger.error(f"Invalid --doc-format '{doc_format}'. Expected one of {DOC_FORMATS}.")
+        raise typer.Exit(code=1)
+    if compression is not None:
+        try:
+            compression = resolve_codec(compression)
+        except (ValueError, ImportError) as e:
+            logger.error(f"Invalid --compression: {e} Available codecs: {CODECS}.")
+            raise typer.Exit(code=1)
+        logger.info(f"  Compression: {compression} ({chunk_tokens:,} tokens per chunk)")
+    deduplicator: Optional[Deduplicator] = None
+    if dedup is not None:
+        try:
+            deduplicator = Deduplicator(dedup.lower(), minhash_perm, minhash_bands, dedup_ngram, window_chars=dedup_window_chars)
+        except ValueError as e:
+            logger.error(f"Invalid dedup options: {e}")
+            raise typer.Exit(code=1)
+        logger.info(f"  Dedup: {dedup}")
 
     # Validate and set default splits
     splits_tuple: Tuple[float, float, float]
@@ -151,15 +197,15 @@ def prepare_dataset(
         # Handle --force: Clean the target directory
         if force and output_dir.exists():
             logger.warning(f"Force flag set. Cleaning up existing files/dirs in {output_dir}")
-            # Delete .pkl files
-            for pkl_file in output_dir.glob("*.pkl"):
-                try: pkl_file.unlink(); logger.info(f"Deleted {pkl_file}")
-                except OSError as e: logger.error(f"Error deleting file {pkl_file}: {e}")
-            # Delete metadata.json
-            metadata_file = output_dir / "metadata.json"
-            if metadata_file.exists():
-                 try: metadata_file.unlink(); logger.info(f"Deleted {metadata_file}")
-                 except OSError as e: logger.error(f"Error deleting file {metadata_file}: {e}")
+            # Delete .pkl, raw .bin and compressed .tkz token files
+            for split_file in [*output_dir.glob("*.pkl"), *output_dir.glob(f"*{TOKEN_FILE_SUFFIX}"), *output_dir.glob(f"*{COMPRESSED_FILE_SUFFIX}"), *output_dir.glob(f"*{DOC_INDEX_SUFFIX}")]:
+                try: split_file.unlink(); logger.info(f"Deleted {split_file}")
+                except OSError as e: logger.error(f"Error deleting file {split_file}: {e}")
+            # Delete metadata.json and the statistics index
+            for metadata_file in (output_dir / "metadata.json", output_dir / STATS_FILE_NAME):
+                if metadata_file.exists():
+                     try: metadata_file.unlink(); logger.info(f"Deleted {metadata_file}")
+                     except OSError as e: logger.error(f"Error deleting file {metadata_file}: {e}")
             # Delete tokenizer directory (Only makes sense for char type where tokenizer is saved within output)
             if type == 'char':
                 tokenizer_dir = output_dir / "tokenizer"
@@ -176,7 +222,17 @@ def prepare_dataset(
             output_paths = process_char_data(
                 input_path=str(input_path),
                 output_dir=str(output_dir),
-                splits=splits_tuple
+                splits=splits_tuple,
+                write_pickle=write_pickle,
+                shard_size=shard_size,
+                num_workers=num_workers,
+                cache_dir=str(cache_dir) if cache_dir else None,
+                doc_format=doc_format,
+                doc_delimiter=doc_delimiter,
+                text_field=text_field,
+                compression=compression,
+                chunk_tokens=chunk_tokens,
+                dedup=deduplicator,
             )
 
         elif type == 'subword':
@@ -195,46 +251,53 @@ def prepare_dataset(
                 logger.error(f"Failed to load tokenizer from {tokenizer_path}: {e}", exc_info=True)
                 raise typer.Exit(code=1)
 
-            # 2. Read input data
-            logger.info(f"Reading raw data file {input_path}...")
+            # 2-3. Encode the input in line-aligned chunks (in a process pool if --num-workers > 1),
+            # streaming ids to a temporary token file instead of holding the text and id list in RAM
+            token_dtype = select_token_dtype(tokenizer.get_vocab_size())
+            # Chunks are encoded without BOS/EOS; wrap the whole stream as a single encode() would
+            bos_id, eos_id = tokenizer.bos_token_id, tokenizer.eos_token_id
+            prefix_ids = [bos_id] if getattr(tokenizer, '_add_bos_token', False) and bos_id is not None else []
+            suffix_ids = [eos_id] if getattr(tokenizer, '_add_eos_token', False) and eos_id is not None else []
+            all_tokens_path = output_dir / f"all{TOKEN_FILE_SUFFIX}.tmp"
+            logger.info(f"Encoding {input_path} with {num_workers} worker(s)...")
+            # One SentencePiece thread per worker process; all cores when encoding in-process
+            encoder = SentencePieceEncoder(
+                tokenizer_abs_path, token_dtype, tokenizer=tokenizer, num_threads=1 if num_workers > 1 else None,
+            )
+            doc_starts = None
             try:
-                text = input_path.read_text(encoding='utf-8')
-                logger.info(f"Read {len(text):,} characters.")
-            except Exception as e:
-                logger.error(f"Could not read input file {input_path}: {e}")
-                raise typer.Exit(code=1)
+                if doc_format:
+                    # Pack documents densely, each followed by EOS, and keep their start offsets
+                    if eos_id is None:
+                        raise ValueError("The tokenizer has no EOS token; it is required to separate documents.")
+                    if cache_dir:
+                        logger.warning("The token cache is not used when packing documents; tokenizing.")
+                    n, doc_starts = encode_documents_to_token_file(
+                        input_path, all_tokens_path, encoder, token_dtype, eos_id,
+                        doc_format, doc_delimiter, text_field, num_workers=num_workers, dedup=deduplicator,
+                    )
+                    token_file = all_tokens_path
+                else:
+                    token_file, n = encode_file_cached(
+                        input_path, all_tokens_path, encoder,
+                        tokenizer, token_dtype, cache=TokenCache(cache_dir) if cache_dir else None,
+                        num_workers=num_workers, prefix_ids=prefix_ids, suffix_ids=suffix_ids, dedup=deduplicator,
+                    )
+                logger.info(f"Generated {n:,} tokens.")
 
-            # 3. Encode data
-            logger.info("Encoding data...")
-            token_ids = tokenizer.encode(text)
-            token_ids_np = np.array(token_ids, dtype=np.int32)
-            logger.info(f"Generated {len(token_ids_np):,} tokens.")
-
-            # 4. Split data
-            n = len(token_ids_np)
-            train_end = int(splits_tuple[0] * n)
-            val_end = train_end + int(splits_tuple[1] * n)
-            train_ids = token_ids_np[:train_end]
-            val_ids = token_ids_np[train_end:val_end]
-            test_ids = token_ids_np[val_end:]
-            logger.info(f"Split sizes: Train={len(train_ids):,}, Val={len(val_ids):,}, Test={len(test_ids):,}")
-
-            # 5. Save splits to .pkl files
-            output_paths = {}
-            split_data_map = {'train': train_ids, 'val': val_ids, 'test': test_ids}
-            for split_name, split_data in split_data_map.items(): # Use consistent name split_data_map
-                if len(split_data) == 0:
-                     logger.warning(f"Split '{split_name}' has size 0. Skipping save.")
-                     continue
-                output_filepath = output_dir / f"{split_name}.pkl"
-                logger.info(f"Saving {split_name} split to {output_filepath}...")
-                try:
-                    with open(output_filepath, 'wb') as f:
-                        pickle.dump(split_data, f)
-                    output_paths[split_name] = str(output_filepath)
-                except IOError as e:
-                     logger.error(f"Failed to save {split_name} split to {output_filepath}: {e}")
-                     raise typer.Exit(code=1)
+                # 4-5. Split and save to raw .bin token files (and legacy int32 .pkl files)
+                output_paths, token_store_splits, split_sizes = write_split_token_files(
+                    token_file, token_dtype, output_dir, splits_tuple,
+                    write_pickle=write_pickle, shard_size=shard_size, pickle_dtype=np.dtype(np.int32),
+                    doc_starts=doc_starts, compression=compression, chunk_tokens=chunk_tokens,
+                    vocab_size=tokenizer.get_vocab_size(),
+                )
+            except (IOError, UnicodeDecodeError, ValueError) as e:
+                logger.error(f"Failed to encode or save {input_path}: {e}")
+                raise typer.Exit(code=1)
+            finally:
+                if all_tokens_path.exists():
+                    all_tokens_path.unlink()
 
             # 6. Prepare and Save Metadata
             logger.info("Preparing and saving metadata.json for subword dataset...")
@@ -246,12 +309,14 @@ def prepare_dataset(
                 'tokenizer_model_path': str(tokenizer_abs_path), # Store absolute path
                 'total_tokens': n,
                 'split_ratios': list(splits_tuple),
-                'split_sizes': {
-                    'train': len(train_ids),
-                    'val': len(val_ids),
-                    'test': len(test_ids)
-                 },
+                'split_sizes': split_sizes,
+                'token_store': build_token_store_header(token_dtype, token_store_splits),
+                'stats_index': STATS_FILE_NAME,
             }
+            if doc_starts is not None:
+                metadata.update({'doc_format': doc_format, 'eos_id': eos_id, 'num_documents': int(len(doc_starts))})
+            if deduplicator is not None:
+                metadata['dedup'] = deduplicator.report()
             metadata_path = output_dir / "metadata.json"
             try:
                 with open(metadata_path, 'w', encoding='utf-8') as f:
@@ -275,4 +340,38 @@ def prepare_dataset(
          raise typer.Exit(code=1)
     except Exception as e:
         logger.exception(f"An unexpected error occurred during dataset preparation: {str(e)}")
-        raise typer.Exit(code=1) 
\ No newline at end of file
+        raise typer.Exit(code=1) 
+
+@dataset_app.command("cache-info")
+def cache_info_command(
+    cache_dir: Path = typer.Option(DEFAULT_CACHE_DIR, "--cache-dir", envvar=CACHE_DIR_ENV_VAR, help="Token cache directory to inspect.", file_okay=False),
+) -> None:
+    """List entries in the tokenization cache, most recently used first."""
+    cache = TokenCache(cache_dir)
+    entries = cache.entries()
+    console(f"Token cache: {cache.cache_dir}")
+    if not entries:
+        console("  (empty)")
+        return
+    for entry in entries:
+        sources = ", ".join(entry.get('sources', [])) or "?"
+        console(
+            f"  {entry['key'][:12]}  {entry['size_bytes'] / 2**20:8.1f} MiB  {entry.get('length', 0):>14,} tokens  "
+            f"{entry.get('tokenizer', '?'):<24} {sources}"
+        )
+    console(f"Total: {len(entries)} entries, {sum(e['size_bytes'] for e in entries) / 2**20:.1f} MiB")
+
+
+@dataset_app.command("cache-clear")
+def cache_clear_command(
+    cache_dir: Path = typer.Option(DEFAULT_CACHE_DIR, "--cache-dir", envvar=CACHE_DIR_ENV_VAR, help="Token cache directory to clear.", file_okay=False),
+    max_size_mb: Optional[float] = typer.Option(None, "--max-size-mb", min=0, help="Only evict least recently used entries until the cache fits in this many MiB."),
+) -> None:
+    """Clear the tokenization cache, or trim it to a size limit (LRU)."""
+    cache = TokenCache(cache_dir)
+    if max_size_mb is None:
+        removed = cache.clear()
+        console(f"Removed {removed} entries from {cache.cache_dir}")
+    else:
+        evicted = cache.evict(int(max_size_mb * 2**20))
+        console(f"Evicted {len(evicted)} entries; {cache.total_bytes() / 2**20:.1f} MiB remain in {cache.cache_dir}")
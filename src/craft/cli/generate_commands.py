@@ -38,6 +38,7 @@ def generate_text(
     repetition_penalty: float = typer.Option(1.0, "--repetition-penalty", "--rp", help="Repetition penalty (1.0 = no penalty)."),
     seed: Optional[int] = typer.Option(None, "--seed", "-s", help="Random seed for reproducibility."),
     device: Optional[str] = typer.Option(None, "--device", "-d", help="Device override (e.g., 'cpu', 'cuda'). Auto-detect if None."),
+    stream: bool = typer.Option(False, "--stream", help="Print text as each token is generated (incremental detokenization)."),
 ) -> None:
     """Generate text using a trained model checkpoint/directory."""
     
@@ -119,6 +120,17 @@ def generate_text(
              if eos_token_id is None:
                   logger.warning("Tokenizer does not have an 'eos_token_id'. Generation might not stop correctly.")
                   
+             on_token = None
+             if stream:
+                 # The prompt only primes the decoder's context; each new token prints just its own text
+                 decoder = tokenizer.incremental_decoder()
+                 decoder.extend(input_ids[0].tolist())
+                 console("--- Generated Text ---")
+                 console(prompt, nl=False)
+
+                 def on_token(tokens: torch.Tensor) -> None:
+                     console(decoder.push(int(tokens[0])), nl=False)
+
              generative_model = cast(GenerativeModel, model)
              generated_ids = generative_model.generate(
                  input_ids,
@@ -128,7 +140,8 @@ def generate_text(
                  top_p=top_p,
                  repetition_penalty=repetition_penalty,
                  eos_token_id=eos_token_id,
-                 verbose=True
+                 verbose=True,
+                 on_token=on_token,
              )
         logger.info(f"Output tensor shape: {generated_ids.shape}")
 
@@ -141,6 +154,12 @@ def generate_text(
         raise typer.Exit(code=1)
 
     # --- 5. Decode and Output --- 
+    if stream:
+        console(decoder.flush())
+        console("----------------------")
+        console("Text generation finished.")
+        return
+
     console("Decoding output...")
     try:
         # Base tokenizer decode expects List[int]
@@ -187,6 +187,12 @@ CallbacksConfig = Optional[Dict[str, CallbackConfigEntry]]
 
 # --- Data Configuration (Existing, minor adjustments maybe needed) ---
 
+class MixtureSourceConfig(BaseModel):
+    """One corpus of a MixtureDataset: a dataset config (or instance) and its sampling weight."""
+    model_config = ConfigDict(arbitrary_types_allowed=True, extra='forbid')
+    dataset: Any = Field(..., description="Dataset config with _target_ (e.g. MemmapTokenDataset) or an instantiated dataset")
+    weight: float = Field(1.0, gt=0, description="Relative sampling weight; weights are normalized across sources")
+
 class DataConfig(BaseModel):
     model_config = _model_config_shared.copy()
     type: Optional[str] = None # Add type field to match YAML
@@ -241,6 +247,9 @@ class DataConfig(BaseModel):
     batch_size: int = Field(..., gt=0, description="Data loading batch size")
     num_workers: int = Field(0, ge=0, description="Number of workers for data loading")
     block_size: int = Field(..., gt=0, description="Sequence length for model input")
+    sampler: Optional[Union[str, Dict[str, Any]]] = Field(None, description="Batch sampler for the train split, e.g. 'random_offsets' or {type: random_offsets, seed: 42}")
+    device_resident: bool = Field(False, description="Copy the train split's tokens to the training device once and gather random-offset batches there (small corpora only)")
+    max_tokens: Optional[int] = Field(None, gt=0, description="Token budget per padded batch for variable-length datasets (exposing `lengths`); replaces batch_size with TokenBudgetBatchSampler")
 
     # Expects a 'datasets' dictionary containing the splits
     datasets: Dict[Literal['train', 'val', 'test'], Optional[DatasetSplitConfig]]
@@ -281,6 +290,13 @@ class GenerationConfig(BaseModel):
 
 
 # --- Training Configuration (Refined) ---
+class SequenceLengthWarmupConfig(BaseModel):
+    """Sequence-length curriculum: rows grow linearly from start_length to the full block over warmup_steps."""
+    model_config = _model_config_shared.copy()
+    start_length: int = Field(128, gt=0, description="Sequence length at step 0")
+    warmup_steps: int = Field(..., ge=0, description="Optimizer steps over which the length reaches the full block size")
+    multiple_of: int = Field(8, gt=0, description="Round scheduled lengths down to a multiple of this")
+
 class TrainingConfig(BaseModel):
     model_config = _model_config_shared.copy()
     # batch_size removed - defined in DataConfig
@@ -296,6 +312,9 @@ class TrainingConfig(BaseModel):
     max_grad_norm: Optional[float] = Field(None, gt=0, description="Maximum gradient norm for clipping")
     log_interval: int = Field(50, gt=0, description="Log training metrics every N steps")
     eval_interval: int = Field(1000, ge=0, description="Evaluate on validation set every N steps (0 to disable)")
+    eval_max_batches: Optional[int] = Field(None, gt=0, description="Score a fixed validation subset of at most N batches instead of the whole split")
+    eval_max_tokens: Optional[int] = Field(None, gt=0, description="Score a fixed validation subset of at most N tokens instead of the whole split")
+    full_eval_every: int = Field(0, ge=0, description="With an eval budget, sweep the complete validation split on every Nth evaluation (0 = never)")
     save_interval: Optional[int] = Field(None, ge=0, description="Save checkpoint every N steps (0 to disable)") # Default None
     # time_save_interval_seconds: int = Field(0, description="Save checkpoint every N seconds (0 to disable). Prioritized over step/epoch intervals if non-zero.") # Moved to CheckpointingConfig
     # time_eval_interval_seconds: Optional[int] = Field(None, ge=0, description="Evaluate every N seconds") # Revisit if needed
@@ -305,6 +324,8 @@ class TrainingConfig(BaseModel):
     log_throughput_interval_batches: int = Field(
         100, description="Log throughput every N batches."
     )
+    prefetch_depth: int = Field(0, ge=0, description="Batches prepared and moved to the device ahead of the training loop on a background thread (0 disables prefetching)")
+    seq_len_warmup: Optional[SequenceLengthWarmupConfig] = Field(None, description="Short-to-long sequence length curriculum (None disables it)")
 
     @model_validator(mode='after')
     def check_epochs_or_steps(self) -> 'TrainingConfig':
@@ -68,7 +68,65 @@ class BaseDataset(Dataset, ABC):
             Any: The data sample at the specified index.
         """
         raise NotImplementedError("Subclasses must implement __getitem__")
-    
+
+    # --- Sliding-window helpers shared by token-sequence datasets --- #
+
+    def _init_windows(self, block_size: int, stride: Optional[int] = None) -> None:
+        """
+        Sets `block_size` and `stride` for datasets that cut a flat token stream
+        into windows of `block_size + 1` tokens (inputs plus shifted targets).
+
+        Window `idx` starts at token `idx * stride`. The default stride equals
+        block_size, i.e. non-overlapping windows covering the corpus once per
+        epoch; a smaller stride opts into overlapping windows.
+        """
+        if stride is None:
+            stride = block_size
+        if stride <= 0:
+            raise ValueError(f"stride must be a positive integer, got {stride}.")
+        if stride > block_size:
+            logger.warning(f"stride ({stride}) > block_size ({block_size}): tokens between windows will never be sampled.")
+        self.block_size = block_size
+        self.stride = stride
+
+    def _num_windows(self, num_tokens: int) -> int:
+        """Number of complete `block_size + 1` windows at multiples of `stride` in `num_tokens` tokens."""
+        if num_tokens < self.block_size + 1:
+            return 0
+        return (num_tokens - self.block_size - 1) // self.stride + 1
+
+    def _window_start(self, idx: int) -> int:
+        """Maps a sample index to the token offset of its window, validating bounds."""
+        length = len(self)
+        if idx < 0 or idx >= length:
+            raise IndexError(f"Index {idx} out of bounds for dataset with length {length}")
+        return idx * self.stride
+
+    # --- Worker sharing --- #
+
+    # Per-process caches rebuilt lazily after pickling (e.g. into spawned DataLoader workers)
+    _worker_local_attrs: Tuple[str, ...] = ()
+
+    def _share_token_ids(self) -> None:
+        """
+        Moves an in-memory `token_ids` tensor into shared memory. Forked DataLoader
+        workers then map the same pages, and spawned workers receive a handle to the
+        segment when the dataset is pickled, instead of each holding a private copy.
+        Memory-mapped stores (numpy arrays) are already shared through the page cache.
+        The tensor is backed by /dev/shm, so only call this when workers will be started.
+        """
+        token_ids = getattr(self, 'token_ids', None)
+        if isinstance(token_ids, torch.Tensor) and token_ids.numel() > 0 and not token_ids.is_shared():
+            token_ids.share_memory_()
+            logger.debug(f"Moved {token_ids.numel():,} tokens of {self.__class__.__name__} to shared memory.")
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        for name in self._worker_local_attrs:
+            if name in state:
+                state[name] = None
+        return state
+
     def preprocess(self, sample: Any) -> Any:
         """
         Optional method for applying common preprocessing steps to a sample.
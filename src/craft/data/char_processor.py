@@ -6,28 +6,73 @@ import os
 import pickle
 import logging
 import json
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
 import numpy as np
 from pathlib import Path
 
 from craft.data.tokenizers.char import CharTokenizer
+from craft.data.token_store import select_token_dtype, build_token_store_header, TOKEN_FILE_SUFFIX, DEFAULT_CHUNK_TOKENS
+from craft.data.preprocessing import (
+    CharEncoder, ascii_char_vocab, collect_char_vocab, count_bytes, encode_documents_to_token_file,
+    encode_file_cached, iter_documents, write_split_token_files, DEFAULT_CHUNK_CHARS, DEFAULT_DOC_DELIMITER,
+)
+from craft.data.token_cache import TokenCache
+from craft.data.dedup import Deduplicator
+from craft.data.dataset_index import STATS_FILE_NAME
 
 logger = logging.getLogger(__name__)
 
-def process_char_data(input_path: str, output_dir: str, splits: Tuple[float, float, float] = (0.9, 0.05, 0.05)) -> Dict[str, str]:
+def process_char_data(
+    input_path: str,
+    output_dir: str,
+    splits: Tuple[float, float, float] = (0.9, 0.05, 0.05),
+    write_pickle: bool = True,
+    shard_size: Optional[int] = None,
+    num_workers: int = 1,
+    chunk_chars: int = DEFAULT_CHUNK_CHARS,
+    cache_dir: Optional[str] = None,
+    doc_format: Optional[str] = None,
+    doc_delimiter: str = DEFAULT_DOC_DELIMITER,
+    text_field: str = "text",
+    compression: Optional[str] = None,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    dedup: Optional[Deduplicator] = None,
+) -> Dict[str, str]:
     """
     Processes a raw text file for character-level language modeling.
 
-    Reads the input file, creates a character vocabulary, converts the text to
-    token IDs, splits into train/val/test sets, saves each split to pickle
-    files, and saves the tokenizer information separately.
+    Streams the input file to build a character vocabulary, converts the text to
+    token IDs in line-aligned chunks (optionally in a process pool), splits into
+    train/val/test sets, saves each split to a raw .bin token file (plus a legacy
+    pickle file), and saves the tokenizer information separately.
+
+    Plain (non-document, non-deduplicated) input that is pure ASCII is never
+    decoded: the vocabulary comes from a byte histogram and the raw bytes are
+    mapped through a 256-entry lookup table. Vocabularies of at most 256 entries
+    are stored as uint8.
 
     Args:
         input_path: Path to the raw input text file.
-        output_dir: Directory to save the processed .pkl files (train.pkl, val.pkl, test.pkl)
-                    and the tokenizer directory.
+        output_dir: Directory to save the processed split files (train.bin, val.bin, test.bin
+                    and optionally train.pkl, val.pkl, test.pkl) and the tokenizer directory.
         splits: A tuple representing the fraction for (train, validation, test) splits.
                 Must sum to 1.0.
+        write_pickle: Whether to also write the legacy .pkl split files read by PickledDataset.
+        shard_size: If set, write each split as `{split}-NNNNN.bin` shards of at most this
+                    many tokens (read with ShardedTokenDataset) instead of one `.bin` file.
+        num_workers: Number of processes used to tokenize chunks (1 = in-process).
+        chunk_chars: Approximate number of characters tokenized per chunk.
+        cache_dir: Optional token cache directory; a cache hit skips tokenization.
+        doc_format: 'jsonl' or 'delimited' to pack documents separated by an EOS token
+                    (added to the vocabulary) and write `{split}.docs.npy` boundary indexes.
+                    None treats the file as one continuous text.
+        doc_delimiter: Document separator for doc_format='delimited'.
+        text_field: Field holding the document text for doc_format='jsonl'.
+        compression: Codec ('zstd', 'lz4', 'zlib' or 'auto') to write chunk-compressed
+                     `.tkz` split files instead of raw `.bin` files.
+        chunk_tokens: Tokens per compressed chunk.
+        dedup: Optional `Deduplicator` that drops repeated documents (or line-aligned
+               windows) while tokenizing; its report is saved under `dedup` in metadata.json.
 
     Returns:
         A dictionary mapping split names ('train', 'val', 'test') to their output file paths.
@@ -56,23 +101,33 @@ def process_char_data(input_path: str, output_dir: str, splits: Tuple[float, flo
     os.makedirs(output_dir, exist_ok=True)
 
     try:
-        # Read the raw data
-        logger.info("Reading raw data...")
-        with open(input_path, 'r', encoding='utf-8') as f:
-            data = f.read()
-        logger.info(f"Read {len(data):,} characters.")
-
-        # Build vocabulary
-        chars = sorted(list(set(data)))
-        vocab_size = len(chars)
+        # Build vocabulary in a streaming pass (never holds the whole text)
+        logger.info("Scanning raw data for the character vocabulary...")
+        ascii_chars: Optional[List[str]] = None
+        if not doc_format and dedup is None:
+            ascii_chars = ascii_char_vocab(count_bytes(input_path, chunk_chars))
+        read_bytes = ascii_chars is not None
+        if ascii_chars is not None:
+            logger.info("Input is pure ASCII; tokenizing raw bytes through a byte lookup table.")
+            chars = ascii_chars
+        else:
+            documents = iter_documents(input_path, doc_format, doc_delimiter, text_field, chunk_chars) if doc_format else None
+            chars = collect_char_vocab(input_path, chunk_chars, texts=documents)
         char_to_idx = {ch: i for i, ch in enumerate(chars)}
-        idx_to_char = {i: ch for i, ch in enumerate(chars)}
+        tokenizer = CharTokenizer()
+        eos_id: Optional[int] = None
+        if doc_format:
+            # Documents are separated by an EOS token appended after the characters
+            eos_id = len(char_to_idx)
+            char_to_idx[tokenizer.eos_token or "<eos>"] = eos_id
+            tokenizer.eos_id = eos_id
+        vocab_size = len(char_to_idx)
+        idx_to_char = {i: ch for ch, i in char_to_idx.items()}
         logger.info(f"Vocabulary size: {vocab_size}")
         # logger.debug(f"Vocabulary: {''.join(chars)}")
 
         # --- Instantiate and Save Tokenizer ---
         logger.info("Creating and saving CharTokenizer...")
-        tokenizer = CharTokenizer()
         tokenizer.char_to_idx = char_to_idx
         tokenizer.idx_to_char = idx_to_char
         tokenizer.vocab_size = vocab_size
@@ -86,20 +141,39 @@ def process_char_data(input_path: str, output_dir: str, splits: Tuple[float, flo
         # --- End Tokenizer Saving ---
 
 
-        # Convert text to token IDs
+        # Convert text to token IDs, streamed chunk by chunk into a temporary token file
         logger.info("Tokenizing data...")
-        token_ids = np.array([char_to_idx[ch] for ch in data], dtype=np.uint16) # Use uint16 if vocab_size < 65536
-        logger.info(f"Generated {len(token_ids):,} tokens.")
-
-        # Calculate split points
-        n = len(token_ids)
-        train_end = int(splits[0] * n)
-        val_end = train_end + int(splits[1] * n)
-
-        train_ids = token_ids[:train_end]
-        val_ids = token_ids[train_end:val_end]
-        test_ids = token_ids[val_end:]
-        logger.info(f"Split sizes: Train={len(train_ids):,}, Val={len(val_ids):,}, Test={len(test_ids):,}")
+        token_dtype = select_token_dtype(vocab_size)
+        all_tokens_path = os.path.join(output_dir, f"all{TOKEN_FILE_SUFFIX}.tmp")
+        doc_starts = None
+        try:
+            if doc_format and eos_id is not None:
+                if cache_dir:
+                    logger.warning("The token cache is not used when packing documents; tokenizing.")
+                n, doc_starts = encode_documents_to_token_file(
+                    input_path, all_tokens_path, CharEncoder(char_to_idx, token_dtype), token_dtype, eos_id,
+                    doc_format, doc_delimiter, text_field, num_workers=num_workers, chunk_chars=chunk_chars,
+                    dedup=dedup,
+                )
+                token_file = Path(all_tokens_path)
+            else:
+                token_file, n = encode_file_cached(
+                    input_path, all_tokens_path, CharEncoder(char_to_idx, token_dtype), tokenizer, token_dtype,
+                    cache=TokenCache(cache_dir) if cache_dir else None,
+                    num_workers=num_workers, chunk_chars=chunk_chars, dedup=dedup,
+                    byte_lut=tokenizer.byte_lut if read_bytes else None,
+                )
+            logger.info(f"Generated {n:,} tokens.")
+
+            # --- Save Splits (Raw Token Files + Legacy Pickles) --- #
+            output_paths, token_store_splits, split_sizes = write_split_token_files(
+                token_file, token_dtype, output_dir, splits,
+                write_pickle=write_pickle, shard_size=shard_size, doc_starts=doc_starts,
+                compression=compression, chunk_tokens=chunk_tokens, vocab_size=vocab_size,
+            )
+        finally:
+            if os.path.exists(all_tokens_path):
+                os.remove(all_tokens_path)
 
         # --- Prepare Metadata --- #
         metadata = {
@@ -109,27 +183,14 @@ def process_char_data(input_path: str, output_dir: str, splits: Tuple[float, flo
             'tokenizer_type': str(type(tokenizer)),
             'total_tokens': n,
             'split_ratios': list(splits),
-            'split_sizes': {
-                'train': len(train_ids),
-                'val': len(val_ids),
-                'test': len(test_ids)
-             },
+            'split_sizes': split_sizes,
+            'token_store': build_token_store_header(token_dtype, token_store_splits),
+            'stats_index': STATS_FILE_NAME,
         }
-
-        # --- Save Splits (Numpy Arrays) --- #
-        output_paths = {}
-        split_data_map = {'train': train_ids, 'val': val_ids, 'test': test_ids}
-        for split_name, split_ids_array in split_data_map.items():
-            if len(split_ids_array) == 0:
-                 logger.warning(f"Split '{split_name}' has size 0. Skipping save.")
-                 continue
-            output_filename = f"{split_name}.pkl"
-            output_filepath = os.path.join(output_dir, output_filename)
-            logger.info(f"Saving {split_name} split to {output_filepath}...")
-            with open(output_filepath, 'wb') as f:
-                pickle.dump(split_ids_array, f)
-            output_paths[split_name] = output_filepath
-            logger.info(f"Saved {split_name} split ({len(split_ids_array):,} tokens).")
+        if doc_starts is not None:
+            metadata.update({'doc_format': doc_format, 'eos_id': eos_id, 'num_documents': int(len(doc_starts))})
+        if dedup is not None:
+            metadata['dedup'] = dedup.report()
 
         # --- Save Metadata --- #
         metadata_path = os.path.join(output_dir, "metadata.json")
@@ -0,0 +1,50 @@
+"""
+Collate functions for variable-length samples.
+
+`PadCollate` right-pads a list of `(x, y)` samples (or dicts with 'input_ids'
+and 'labels') to the longest sample in the batch. Padded label positions are set
+to -1, the `ignore_index` used by the training loss, and an `attention_mask`
+(1 = real token, 0 = padding) is added that `TransformerModel.forward` honours.
+Paired with `TokenBudgetBatchSampler`, batches hold samples of similar length,
+so little compute is spent on padding.
+"""
+from typing import Any, Dict, List, Sequence
+
+import torch
+
+IGNORE_INDEX = -1 # Matches ignore_index in the training/eval losses
+
+
+class PadCollate:
+    """Picklable padding collate (DataLoader workers need a top-level callable)."""
+
+    def __init__(self, pad_id: int = 0, label_pad_id: int = IGNORE_INDEX):
+        self.pad_id = pad_id
+        self.label_pad_id = label_pad_id
+
+    def __call__(self, samples: Sequence[Any]) -> Dict[str, torch.Tensor]:
+        if isinstance(samples[0], dict):
+            inputs = [s['input_ids'] for s in samples]
+            labels = [s['labels'] for s in samples]
+        else:
+            inputs = [s[0] for s in samples]
+            labels = [s[1] for s in samples]
+        max_len = max(len(x) for x in inputs)
+        batch_size = len(samples)
+        input_ids = torch.full((batch_size, max_len), self.pad_id, dtype=torch.long)
+        padded_labels = torch.full((batch_size, max_len), self.label_pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((batch_size, max_len), dtype=torch.long)
+        for row, (x, y) in enumerate(zip(inputs, labels)):
+            length = len(x)
+            input_ids[row, :length] = torch.as_tensor(x)
+            padded_labels[row, :length] = torch.as_tensor(y)
+            attention_mask[row, :length] = 1
+        return {'input_ids': input_ids, 'labels': padded_labels, 'attention_mask': attention_mask}
+
+
+def pad_collate(samples: List[Any]) -> Dict[str, torch.Tensor]:
+    """PadCollate with the default pad id (0) for use as a plain `collate_fn`."""
+    return _DEFAULT_PAD_COLLATE(samples)
+
+
+_DEFAULT_PAD_COLLATE = PadCollate()
@@ -0,0 +1,297 @@
+"""
+Chunk-compressed token files (`.tkz`), an optional on-disk format for `craft dataset prepare`.
+
+A split is cut into chunks of `chunk_tokens` tokens, and each chunk is compressed
+on its own with zstd or lz4 when installed (zlib otherwise). Before compression,
+the bytes of each chunk are regrouped by significance ("byte shuffle"). The high
+bytes of uint16/uint32 ids are mostly zero or repeated, so this makes them compress
+much better. Layout of a file:
+
+    magic (8 bytes) | header length (uint32) | JSON header |
+    chunk offsets (uint64[num_chunks + 1]) | compressed chunks
+
+The offsets index lets `CompressedTokenArray` decompress only the chunks touched
+by a read. Recently used chunks are kept in an LRU cache, so consecutive blocks
+and random-offset batches over a hot region reuse them.
+"""
+import io
+import json
+import logging
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
+
+import numpy as np
+
+# Optional codecs, preferred over zlib when installed
+try:
+    import zstandard
+    _ZSTD_AVAILABLE = True
+except ImportError:
+    _ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame # type: ignore[import-untyped]
+    _LZ4_AVAILABLE = True
+except ImportError:
+    _LZ4_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+COMPRESSED_FILE_SUFFIX = ".tkz"
+COMPRESSED_MAGIC = b"CRAFTTKZ"
+COMPRESSED_VERSION = 1
+CODECS = ("zstd", "lz4", "zlib")
+DEFAULT_CHUNK_TOKENS = 1 << 16
+DEFAULT_CACHE_CHUNKS = 64
+
+_PREAMBLE = struct.Struct("<8sI") # magic, header length
+_PIP_NAMES = {"zstd": "zstandard", "lz4": "lz4"}
+
+
+def available_codecs() -> List[str]:
+    """Codecs usable in this environment, best first."""
+    return [c for c in CODECS if c == "zlib" or (c == "zstd" and _ZSTD_AVAILABLE) or (c == "lz4" and _LZ4_AVAILABLE)]
+
+
+def resolve_codec(codec: Optional[str] = "auto") -> str:
+    """Maps 'auto'/None to the best available codec and checks that `codec` can be used."""
+    if codec in (None, "auto"):
+        return available_codecs()[0]
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec '{codec}'. Expected one of {CODECS} or 'auto'.")
+    if codec not in available_codecs():
+        raise ImportError(f"Codec '{codec}' requires the '{_PIP_NAMES[codec]}' package: pip install {_PIP_NAMES[codec]}")
+    return codec
+
+
+def _compress(codec: str, data: bytes, level: Optional[int]) -> bytes:
+    if codec == "zstd":
+        return cast(bytes, zstandard.ZstdCompressor(level=3 if level is None else level).compress(data))
+    if codec == "lz4":
+        return cast(bytes, lz4.frame.compress(data, compression_level=0 if level is None else level))
+    return zlib.compress(data, 6 if level is None else level)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return cast(bytes, zstandard.ZstdDecompressor().decompress(data))
+    if codec == "lz4":
+        return cast(bytes, lz4.frame.decompress(data))
+    return zlib.decompress(data)
+
+
+def _shuffle_bytes(chunk: np.ndarray) -> bytes:
+    """Byte-plane shuffle: all lowest bytes first, then the next byte of every token, and so on."""
+    return cast(bytes, np.ascontiguousarray(chunk).view(np.uint8).reshape(-1, chunk.dtype.itemsize).T.tobytes())
+
+
+def _unshuffle_bytes(data: bytes, dtype: np.dtype) -> np.ndarray:
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(dtype.itemsize, -1)
+    return np.ascontiguousarray(planes.T).view(dtype).ravel()
+
+
+def write_compressed_token_file(
+    path: Union[str, Path],
+    token_ids: np.ndarray,
+    dtype: Union[str, np.dtype],
+    offset: int = 0,
+    codec: Optional[str] = "auto",
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    level: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Writes token ids as a chunk-compressed `.tkz` file and returns its header entry.
+
+    Args:
+        path: Destination file.
+        token_ids: 1-D array of token ids (a memory-map view is read one chunk at a time).
+        dtype: Storage dtype (e.g. 'uint16').
+        offset: Position of the first token of this file in the full token stream.
+        codec: 'zstd', 'lz4', 'zlib' or 'auto' (best available).
+        chunk_tokens: Tokens per independently compressed chunk.
+        level: Codec compression level (codec default if None).
+
+    Returns:
+        Dict[str, Any]: Entry with the 'file', 'length' and 'offset' keys of a raw
+                        token file plus 'codec', 'chunk_tokens' and 'compressed_bytes'.
+    """
+    if chunk_tokens <= 0:
+        raise ValueError(f"chunk_tokens must be positive, got {chunk_tokens}.")
+    path = Path(path)
+    dtype = np.dtype(dtype)
+    codec = resolve_codec(codec)
+    length = len(token_ids)
+    num_chunks = -(-length // chunk_tokens)
+    header = json.dumps({
+        "version": COMPRESSED_VERSION, "codec": codec, "dtype": dtype.name,
+        "chunk_tokens": int(chunk_tokens), "length": int(length), "shuffle": True,
+    }).encode("utf-8")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    chunk_offsets = np.zeros(num_chunks + 1, dtype=np.uint64)
+    with open(path, "wb") as f:
+        f.write(_PREAMBLE.pack(COMPRESSED_MAGIC, len(header)))
+        f.write(header)
+        index_position = f.tell()
+        f.write(chunk_offsets.tobytes()) # Placeholder, rewritten once the chunk sizes are known
+        data_position = f.tell()
+        for chunk_index in range(num_chunks):
+            chunk = np.asarray(token_ids[chunk_index * chunk_tokens : (chunk_index + 1) * chunk_tokens]).astype(dtype, copy=False)
+            f.write(_compress(codec, _shuffle_bytes(chunk), level))
+            chunk_offsets[chunk_index + 1] = f.tell() - data_position
+        f.seek(index_position)
+        f.write(chunk_offsets.tobytes())
+
+    compressed_bytes = int(path.stat().st_size)
+    ratio = (length * dtype.itemsize) / compressed_bytes if compressed_bytes else 0.0
+    logger.info(f"Wrote {length:,} tokens ({dtype.name}, {codec}, {num_chunks} chunk(s), {ratio:.2f}x) to {path}")
+    return {
+        "file": path.name, "length": int(length), "offset": int(offset),
+        "codec": codec, "chunk_tokens": int(chunk_tokens), "compressed_bytes": compressed_bytes,
+    }
+
+
+def read_compressed_header(path: Union[str, Path]) -> Dict[str, Any]:
+    """Reads the JSON header of a `.tkz` file."""
+    with open(path, "rb") as f:
+        return _read_header(f, path)[0]
+
+
+def _read_header(f: io.BufferedReader, path: Union[str, Path]) -> Tuple[Dict[str, Any], int]:
+    preamble = f.read(_PREAMBLE.size)
+    if len(preamble) != _PREAMBLE.size:
+        raise ValueError(f"{path} is too short to be a compressed token file.")
+    magic, header_length = _PREAMBLE.unpack(preamble)
+    if magic != COMPRESSED_MAGIC:
+        raise ValueError(f"{path} is not a compressed token file (bad magic {magic!r}).")
+    header = json.loads(f.read(header_length).decode("utf-8"))
+    if header.get("version") != COMPRESSED_VERSION:
+        raise ValueError(f"Unsupported compressed token file version {header.get('version')} in {path}.")
+    return header, _PREAMBLE.size + header_length
+
+
+class CompressedTokenArray:
+    """
+    Read-only 1-D view of a `.tkz` file that decompresses chunks on demand.
+
+    Only the header and the chunk offsets index are read at construction time.
+    A read decompresses the chunks it overlaps and keeps the last `cache_chunks`
+    of them in an LRU cache. Supports `len()`, contiguous slices, integer
+    indexing and integer-array indexing, like `ShardedTokenArray`.
+
+    Reads are serialized by a lock, so the array can be shared with a prefetch
+    thread. The open file, cache and lock are dropped when pickled (each
+    DataLoader worker reopens the file and keeps its own cache).
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        dtype: Optional[Union[str, np.dtype]] = None,
+        length: Optional[int] = None,
+        cache_chunks: int = DEFAULT_CACHE_CHUNKS,
+    ):
+        """
+        Args:
+            path: Path to the `.tkz` file.
+            dtype: Expected storage dtype (validated against the file header if given).
+            length: Expected number of tokens (validated against the file header if given).
+            cache_chunks: Maximum number of decompressed chunks kept in memory.
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            header, index_position = _read_header(f, self.path)
+            self.codec = header["codec"]
+            self.dtype = np.dtype(header["dtype"])
+            self.chunk_tokens = int(header["chunk_tokens"])
+            self._length = int(header["length"])
+            num_chunks = -(-self._length // self.chunk_tokens)
+            self.chunk_offsets = np.frombuffer(f.read(8 * (num_chunks + 1)), dtype=np.uint64).astype(np.int64)
+        self._data_position = index_position + 8 * (num_chunks + 1)
+        if dtype is not None and np.dtype(dtype) != self.dtype:
+            raise ValueError(f"Token file {self.path} stores {self.dtype.name} but {np.dtype(dtype).name} was expected.")
+        if length is not None and length != self._length:
+            raise ValueError(f"Token file {self.path} holds {self._length} tokens but the header records {length}.")
+        resolve_codec(self.codec) # Fail early if the codec's package is missing
+        self.cache_chunks = max(1, int(cache_chunks))
+        self._reset_runtime_state()
+
+    def _reset_runtime_state(self) -> None:
+        self._file: Optional[io.BufferedReader] = None
+        self._cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def num_chunks(self) -> int:
+        return len(self.chunk_offsets) - 1
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        for key in ("_file", "_cache", "_lock"):
+            state.pop(key)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._reset_runtime_state()
+
+    def _chunk(self, chunk_index: int) -> np.ndarray:
+        """Returns a decompressed chunk, from the LRU cache when possible. Call with the lock held."""
+        chunk = self._cache.get(chunk_index)
+        if chunk is not None:
+            self._cache.move_to_end(chunk_index)
+            return chunk
+        if self._file is None:
+            self._file = open(self.path, "rb")
+        start, stop = int(self.chunk_offsets[chunk_index]), int(self.chunk_offsets[chunk_index + 1])
+        self._file.seek(self._data_position + start)
+        chunk = _unshuffle_bytes(_decompress(self.codec, self._file.read(stop - start)), self.dtype)
+        chunk.flags.writeable = False
+        self._cache[chunk_index] = chunk
+        if len(self._cache) > self.cache_chunks:
+            self._cache.popitem(last=False)
+        return chunk
+
+    def _read_span(self, start: int, stop: int) -> np.ndarray:
+        """Copies tokens [start, stop) into one array, decompressing the chunks they overlap."""
+        out = np.empty((max(0, stop - start),), dtype=self.dtype)
+        position = start
+        with self._lock:
+            while position < stop:
+                chunk_index = position // self.chunk_tokens
+                chunk_start = chunk_index * self.chunk_tokens
+                chunk_stop = min(stop, chunk_start + self.chunk_tokens)
+                out[position - start : chunk_stop - start] = self._chunk(chunk_index)[position - chunk_start : chunk_stop - chunk_start]
+                position = chunk_stop
+        return out
+
+    def __getitem__(self, key: Any) -> Any:
+        total = len(self)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(total)
+            if step == 1:
+                return self._read_span(start, stop)
+            key = np.arange(start, stop, step)
+        if isinstance(key, (int, np.integer)):
+            position = int(key) + total if key < 0 else int(key)
+            if not 0 <= position < total:
+                raise IndexError(f"Index {key} out of bounds for {total} tokens")
+            return self._read_span(position, position + 1)[0]
+        index = np.asarray(key, dtype=np.int64)
+        flat = index.ravel()
+        if flat.size and (flat.min() < 0 or flat.max() >= total):
+            raise IndexError(f"Index out of bounds for {total} tokens")
+        chunk_ids = flat // self.chunk_tokens
+        out = np.empty(flat.shape, dtype=self.dtype)
+        with self._lock:
+            for chunk_index in np.unique(chunk_ids):
+                mask = chunk_ids == chunk_index
+                out[mask] = self._chunk(int(chunk_index))[flat[mask] - chunk_index * self.chunk_tokens]
+        return out.reshape(index.shape)
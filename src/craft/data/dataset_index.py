@@ -0,0 +1,204 @@
+"""
+Precomputed statistics of a prepared dataset directory.
+
+`craft dataset prepare` writes `stats.npz` next to `metadata.json`. It holds
+the unigram counts of each split (int64[vocab_size]) and the token count of
+every shard. The counts are accumulated while the split files are written, so
+no extra pass over the corpus is needed. `DatasetIndex.open(directory)` serves
+these values together with `metadata.json` and the `{split}.docs.npy` document
+offsets without reading token data. Opened indexes are cached per directory
+(and invalidated when `metadata.json` changes), so many datasets over the same
+directory parse the metadata once.
+"""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
+
+import numpy as np
+
+from .token_store import DOC_INDEX_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILE_NAME = "metadata.json"
+STATS_FILE_NAME = "stats.npz"
+_COUNT_CHUNK = 1 << 24 # Tokens counted per bincount call
+
+
+def count_unigrams(token_ids: Any, vocab_size: int) -> np.ndarray:
+    """Counts token ids (int64[max(vocab_size, max id + 1)]) in chunks, so memory maps are not copied whole."""
+    counts = np.zeros(vocab_size, dtype=np.int64)
+    for start in range(0, len(token_ids), _COUNT_CHUNK):
+        chunk_counts = np.bincount(np.asarray(token_ids[start : start + _COUNT_CHUNK]), minlength=vocab_size)
+        if len(chunk_counts) > len(counts):
+            logger.warning(f"Token id {len(chunk_counts) - 1} is outside the vocabulary of size {vocab_size}.")
+            counts = np.pad(counts, (0, len(chunk_counts) - len(counts)))
+        counts[: len(chunk_counts)] += chunk_counts
+    return counts
+
+
+def write_dataset_stats(
+    output_dir: Union[str, Path],
+    unigram_counts: Dict[str, np.ndarray],
+    token_store_splits: Dict[str, Dict[str, Any]],
+) -> Path:
+    """
+    Writes `stats.npz`: `{split}.unigram_counts` and `{split}.shard_lengths` for each split.
+
+    Returns:
+        Path: The written file.
+    """
+    arrays: Dict[str, np.ndarray] = {}
+    for split_name, counts in unigram_counts.items():
+        arrays[f"{split_name}.unigram_counts"] = np.asarray(counts, dtype=np.int64)
+    for split_name, entry in token_store_splits.items():
+        shards = entry.get('shards') or [entry]
+        arrays[f"{split_name}.shard_lengths"] = np.array([shard['length'] for shard in shards], dtype=np.int64)
+    path = Path(output_dir) / STATS_FILE_NAME
+    np.savez(path, **cast(Dict[str, Any], arrays))
+    logger.info(f"Wrote dataset statistics for {sorted(unigram_counts)} to {path}")
+    return path
+
+
+class DatasetIndex:
+    """
+    Read-only view of a prepared dataset's metadata and precomputed statistics.
+
+    Use `DatasetIndex.open(directory)`; construct directly only to bypass the cache.
+    Arrays from `stats.npz` are loaded on first access.
+    """
+
+    _cache: Dict[Tuple[str, int, int], "DatasetIndex"] = {}
+
+    def __init__(self, directory: Union[str, Path]):
+        """
+        Args:
+            directory: Dataset directory holding metadata.json.
+
+        Raises:
+            FileNotFoundError: If metadata.json does not exist.
+            ValueError: If metadata.json is not a JSON object.
+        """
+        self.directory = Path(directory)
+        self.metadata_path = self.directory / METADATA_FILE_NAME
+        with open(self.metadata_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        if not isinstance(metadata, dict):
+            raise ValueError(f"Metadata file {self.metadata_path} does not contain a JSON object.")
+        self.metadata: Dict[str, Any] = metadata
+        self.stats_path = self.directory / STATS_FILE_NAME
+        self._stats: Optional[Dict[str, np.ndarray]] = None
+
+    @classmethod
+    def open(cls, directory: Union[str, Path]) -> "DatasetIndex":
+        """Returns the cached index of `directory`, re-reading it if metadata.json changed."""
+        directory = Path(directory).resolve()
+        stat = os.stat(directory / METADATA_FILE_NAME)
+        key = (str(directory), stat.st_mtime_ns, stat.st_size)
+        index = cls._cache.get(key)
+        if index is None:
+            index = cls(directory)
+            cls._cache = {k: v for k, v in cls._cache.items() if k[0] != key[0]} # Drop stale entries
+            cls._cache[key] = index
+        return index
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        cls._cache = {}
+
+    @property
+    def has_stats(self) -> bool:
+        return self.stats_path.exists()
+
+    def _load_stats(self) -> Dict[str, np.ndarray]:
+        if self._stats is None:
+            if not self.has_stats:
+                raise FileNotFoundError(
+                    f"No {STATS_FILE_NAME} in {self.directory}; re-run `craft dataset prepare` to compute dataset statistics."
+                )
+            with np.load(self.stats_path) as stats:
+                self._stats = {key: stats[key] for key in stats.files}
+        return self._stats
+
+    @property
+    def vocab_size(self) -> Optional[int]:
+        return self.metadata.get('vocab_size')
+
+    @property
+    def splits(self) -> List[str]:
+        """Names of the splits with data, in prepare order."""
+        split_sizes = self.split_sizes
+        return [name for name, size in split_sizes.items() if size]
+
+    @property
+    def split_sizes(self) -> Dict[str, int]:
+        """Tokens per split, from the token_store header (or the legacy `split_sizes` key)."""
+        entries = self.metadata.get('token_store', {}).get('splits', {})
+        if entries:
+            return {name: int(entry['length']) for name, entry in entries.items()}
+        return {name: int(size) for name, size in self.metadata.get('split_sizes', {}).items()}
+
+    @property
+    def total_tokens(self) -> int:
+        return int(self.metadata.get('total_tokens', sum(self.split_sizes.values())))
+
+    def unigram_counts(self, split: Optional[str] = None) -> np.ndarray:
+        """Token counts (int64[vocab_size]) of one split, or summed over all splits if None."""
+        stats = self._load_stats()
+        if split is not None:
+            key = f"{split}.unigram_counts"
+            if key not in stats:
+                raise KeyError(f"No unigram counts for split '{split}' in {self.stats_path}.")
+            return stats[key]
+        arrays = [value for key, value in stats.items() if key.endswith(".unigram_counts")]
+        size = max([len(a) for a in arrays] + [self.vocab_size or 0])
+        total = np.zeros(size, dtype=np.int64)
+        for counts in arrays:
+            total[: len(counts)] += counts
+        return total
+
+    def unigram_frequencies(self, split: Optional[str] = 'train') -> np.ndarray:
+        """Unigram distribution (float64, sums to 1) of a split, e.g. for frequency-based loss weights."""
+        counts = self.unigram_counts(split)
+        return counts / max(int(counts.sum()), 1)
+
+    def shard_lengths(self, split: str) -> np.ndarray:
+        """Token count of each file of a split (one entry for unsharded splits)."""
+        key = f"{split}.shard_lengths"
+        if self.has_stats and key in self._load_stats():
+            return self._load_stats()[key]
+        entry = self.metadata.get('token_store', {}).get('splits', {}).get(split)
+        if entry is None:
+            raise KeyError(f"Split '{split}' not found in {self.metadata_path}.")
+        return np.array([shard['length'] for shard in entry.get('shards') or [entry]], dtype=np.int64)
+
+    def doc_starts(self, split: str) -> Optional[np.ndarray]:
+        """Document start offsets of a split (memory-mapped), or None if it was not prepared with documents."""
+        entry = self.metadata.get('token_store', {}).get('splits', {}).get(split, {})
+        path = self.directory / entry.get('doc_index', f"{split}{DOC_INDEX_SUFFIX}")
+        if not path.exists():
+            return None
+        return cast(np.ndarray, np.load(path, mmap_mode='r'))
+
+    def num_documents(self, split: Optional[str] = None) -> Optional[int]:
+        """Document count of a split (or of the whole dataset), if it was prepared with documents."""
+        if split is None:
+            return cast(Optional[int], self.metadata.get('num_documents'))
+        return cast(Optional[int], self.metadata.get('token_store', {}).get('splits', {}).get(split, {}).get('num_documents'))
+
+    def summary(self) -> Dict[str, Any]:
+        """Small dict of headline numbers (for logging and tooling)."""
+        summary: Dict[str, Any] = {
+            'directory': str(self.directory),
+            'vocab_size': self.vocab_size,
+            'total_tokens': self.total_tokens,
+            'split_sizes': self.split_sizes,
+            'num_documents': self.num_documents(),
+        }
+        if self.has_stats:
+            counts = self.unigram_counts()
+            summary['tokens_used'] = int(np.count_nonzero(counts))
+            summary['shards'] = {split: len(self.shard_lengths(split)) for split in self.splits}
+        return summary
@@ -0,0 +1,69 @@
+import logging
+from typing import Any, Optional, Tuple
+
+import numpy as np
+import torch
+
+from .memmap_dataset import MemmapTokenDataset
+from ..collate import PadCollate
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentDataset(MemmapTokenDataset):
+    """
+    One variable-length sample per document of a packed `.bin` token store.
+
+    Requires the `{split}.docs.npy` boundary index written by
+    `craft dataset prepare --doc-format ...`. Sample `i` is document `i`
+    (including its trailing EOS) as `(x, y)` shifted by one token, truncated to
+    `max_length` inputs. Documents with fewer than 2 tokens are skipped.
+
+    `lengths` holds every sample's input length without reading any tokens, for
+    `TokenBudgetBatchSampler`. `collate_fn` pads batches and adds an attention mask.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        max_length: int,
+        dtype: Optional[str] = None,
+        pad_id: int = 0,
+        **kwargs: Any,
+    ):
+        """
+        Args:
+            file_path (str): Path to the split's `.bin` file (e.g. 'data/processed/docs/train.bin').
+            max_length (int): Maximum input length; longer documents are truncated.
+            dtype (Optional[str]): Storage dtype, if metadata.json has no 'token_store' header.
+            pad_id (int): Input id used for padding (masked out, so any valid id works).
+            **kwargs: Additional keyword arguments (ignored).
+        """
+        kwargs.pop('block_size', None) # Documents are not cut into fixed blocks
+        super().__init__(file_path, max_length, dtype=dtype, **kwargs)
+        self.max_length = max_length
+        doc_starts = self._load_doc_starts()
+        doc_ends = np.append(doc_starts[1:], self.num_tokens)
+        # A document of n tokens yields n - 1 (input, target) pairs
+        input_lengths = np.minimum(doc_ends - doc_starts - 1, max_length)
+        keep = input_lengths > 0
+        self.sample_starts = doc_starts[keep]
+        self.lengths = input_lengths[keep]
+        self.collate_fn = PadCollate(pad_id)
+        skipped = int((~keep).sum())
+        self.logger.info(
+            f"{len(self.lengths):,} documents (mean length {self.lengths.mean() if len(self.lengths) else 0:.1f} tokens, "
+            f"max_length {max_length}){f', skipped {skipped} too short' if skipped else ''}."
+        )
+
+    # Samples have different lengths, so fixed-window batch gathering does not apply
+    get_batch = None # type: ignore[assignment]
+
+    def __len__(self) -> int:
+        return len(self.lengths) if hasattr(self, 'lengths') else 0
+
+    def __getitem__(self, idx: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        if idx < 0 or idx >= len(self):
+            raise IndexError(f"Index {idx} out of bounds for dataset with length {len(self)}")
+        block = self._get_block(int(self.sample_starts[idx]), int(self.lengths[idx]) + 1)
+        return block[:-1], block[1:]
@@ -0,0 +1,70 @@
+import torch
+import logging
+import numpy as np
+from typing import Dict, Any, Optional
+
+from .pickled_dataset import PickledDataset
+from ..token_store import TokenArray, open_token_store, find_split_entry, is_compressed_token_file
+
+logger = logging.getLogger(__name__)
+
+
+class MemmapTokenDataset(PickledDataset):
+    """
+    Dataset over a raw `.bin` token file written by `craft dataset prepare`.
+
+    The file is opened with `np.memmap` and kept in its native storage dtype
+    (uint16/uint32), so construction is O(1) regardless of corpus size and
+    DataLoader workers share the OS page cache instead of holding private
+    copies. Tokens are converted to int64 one block at a time in `__getitem__`.
+
+    Chunk-compressed `.tkz` files are opened as a `CompressedTokenArray` instead,
+    which decompresses only the chunks a block touches.
+
+    Metadata handling, `vocab_size` and `decode` are inherited from PickledDataset
+    and read the same 'metadata.json' next to the data file.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        block_size: int,
+        stride: Optional[int] = None,
+        dtype: Optional[str] = None,
+        **kwargs: Any,
+    ):
+        """
+        Args:
+            file_path (str): Path to the `.bin` or `.tkz` file (e.g., 'data/processed/my_data/train.bin').
+            block_size (int): Maximum sequence length for blocks.
+            stride (Optional[int]): Token distance between windows (defaults to block_size).
+            dtype (Optional[str]): Storage dtype. Only needed when metadata.json has no
+                                   'token_store' header describing the file.
+            **kwargs: Additional keyword arguments (ignored).
+        """
+        self._dtype_override = dtype
+        super().__init__(file_path, block_size, stride=stride, **kwargs)
+
+    def _load_token_ids(self) -> TokenArray:
+        """Opens the token file as a read-only memory map using the metadata header."""
+        header = self.get_metadata().get('token_store', {})
+        entry = find_split_entry(header, self.file_path.name) or {}
+        dtype = self._dtype_override or header.get('dtype')
+        if dtype is None:
+            raise ValueError(
+                f"Cannot determine dtype for {self.file_path}: no 'token_store' header in "
+                f"{self.metadata_path} and no dtype argument given."
+            )
+        token_ids = open_token_store(self.file_path, dtype, entry.get('length'))
+        action = "Opened compressed" if is_compressed_token_file(self.file_path) else "Memory-mapped"
+        self.logger.info(f"{action} {len(token_ids):,} tokens ({np.dtype(dtype).name}) from {self.file_path}")
+        return token_ids
+
+    def _get_block(self, start: int, length: int) -> torch.Tensor:
+        """Copies one block out of the memory map and widens it to int64."""
+        return torch.from_numpy(self.token_ids[start : start + length].astype(np.int64))
+
+    def _gather_blocks(self, starts: torch.Tensor, length: int) -> torch.Tensor:
+        """Gathers a [B, length] block from the memory map and widens it to int64 once."""
+        index = starts.numpy().reshape(-1, 1) + np.arange(length)
+        return torch.from_numpy(self.token_ids[index].astype(np.int64))
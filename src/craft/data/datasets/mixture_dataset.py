@@ -0,0 +1,100 @@
+import bisect
+import logging
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import torch
+from hydra.utils import instantiate
+
+from ..base import BaseDataset
+from ...config.schemas import MixtureSourceConfig
+
+logger = logging.getLogger(__name__)
+
+
+class MixtureDataset(BaseDataset):
+    """
+    Weighted mixture of several prepared token datasets.
+
+    Each source is an ordinary token dataset (typically a `MemmapTokenDataset`
+    over its own `.bin` store), so nothing is concatenated or rewritten on disk.
+    The global index space is the concatenation of the sources' windows, and
+    `offsets` holds each source's first global index. Index `i` maps back to
+    its source by binary search over `offsets`.
+
+    Sequential iteration visits every window once. Training draws from the
+    sources at the configured `weights` through a `WeightedMixtureSampler`,
+    which `initialize_dataloaders` attaches automatically. Changing the ratios
+    therefore only means editing the config.
+    """
+
+    def __init__(
+        self,
+        sources: Sequence[Union[Mapping[str, Any], MixtureSourceConfig]],
+        block_size: Optional[int] = None,
+        **kwargs: Any,
+    ):
+        """
+        Args:
+            sources: One entry per corpus with a `dataset` (an instantiated dataset,
+                     or a Hydra config with `_target_`) and a positive `weight`.
+                     Weights are normalized to sum to 1.
+            block_size (Optional[int]): Injected into source configs that do not set it.
+            **kwargs: Additional keyword arguments (ignored).
+        """
+        super().__init__()
+        if not sources:
+            raise ValueError("MixtureDataset needs at least one source.")
+        self.datasets: List[Any] = []
+        raw_weights: List[float] = []
+        for source in sources:
+            source_cfg = source if isinstance(source, MixtureSourceConfig) else MixtureSourceConfig(**dict(source))
+            self.datasets.append(self._build_source(source_cfg.dataset, block_size))
+            raw_weights.append(source_cfg.weight)
+        total_weight = sum(raw_weights)
+        self.weights = [w / total_weight for w in raw_weights]
+
+        self.block_size = block_size if block_size is not None else self.datasets[0].block_size
+        block_sizes = {getattr(ds, 'block_size', self.block_size) for ds in self.datasets}
+        if block_sizes != {self.block_size}:
+            raise ValueError(f"All mixture sources must share one block_size, got {sorted(block_sizes)}.")
+
+        self.source_lengths = [len(ds) for ds in self.datasets]
+        for i, length in enumerate(self.source_lengths):
+            if length == 0:
+                raise ValueError(f"Mixture source {i} ({type(self.datasets[i]).__name__}) has no complete windows.")
+        self.offsets: List[int] = [0]
+        for length in self.source_lengths[:-1]:
+            self.offsets.append(self.offsets[-1] + length)
+        summary = ", ".join(f"{type(ds).__name__}[{n:,} windows, w={w:.3f}]" for ds, n, w in zip(self.datasets, self.source_lengths, self.weights))
+        logger.info(f"MixtureDataset over {len(self.datasets)} sources: {summary}")
+
+    @staticmethod
+    def _build_source(dataset: Any, block_size: Optional[int]) -> Any:
+        """Instantiates a source dataset config (passing block_size if unset) or returns the instance."""
+        if isinstance(dataset, Mapping) or hasattr(dataset, '_target_'):
+            overrides = {} if block_size is None or 'block_size' in dataset else {'block_size': block_size}
+            return instantiate(dataset, **overrides)
+        return dataset
+
+    def locate(self, idx: int) -> Tuple[int, int]:
+        """Maps a global index to (source index, index within that source)."""
+        if idx < 0 or idx >= len(self):
+            raise IndexError(f"Index {idx} out of bounds for dataset with length {len(self)}")
+        source = bisect.bisect_right(self.offsets, idx) - 1
+        return source, idx - self.offsets[source]
+
+    def __len__(self) -> int:
+        return sum(self.source_lengths)
+
+    def __getitem__(self, idx: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        source, local_idx = self.locate(idx)
+        return self.datasets[source][local_idx] # type: ignore[no-any-return]
+
+    def get_metadata(self) -> Dict[str, Any]:
+        """Metadata of the first source (sources are expected to share a tokenizer)."""
+        get_metadata = getattr(self.datasets[0], 'get_metadata', None)
+        return get_metadata() if callable(get_metadata) else {}
+
+    def decode(self, ids: Union[torch.Tensor, List[int]], skip_special_tokens: bool = True) -> str:
+        """Decodes with the first source (sources are expected to share a tokenizer)."""
+        return self.datasets[0].decode(ids, skip_special_tokens=skip_special_tokens) # type: ignore[no-any-return]
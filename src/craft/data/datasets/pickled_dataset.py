@@ -4,15 +4,18 @@ import os
 import json # Import json
 import pickle
 import numpy as np
-from typing import Dict, Any, List, Union, Optional, Tuple
+from typing import Dict, Any, List, Union, Optional, Tuple, cast
 from pathlib import Path
 
 from torch.utils.data import Dataset
 
 # Import the new BaseDataset directly
 from ..base import BaseDataset
+from ..token_store import DOC_INDEX_SUFFIX
+from ..dataset_index import DatasetIndex
 # Import SentencePieceTokenizer for dynamic loading during decode
 from ..tokenizers.sentencepiece import SentencePieceTokenizer
+from ..tokenizers.char import CharDecodeTable
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +24,18 @@ class PickledDataset(BaseDataset):
 
     # Cache for loaded tokenizer instances (keyed by model path)
     _tokenizer_cache: Dict[str, Any] = {}
-
-    def __init__(self, file_path: str, block_size: int, **kwargs: Any):
+    # Metadata and the char decode map are reloaded on first use in each worker
+    _worker_local_attrs = ('_metadata', '_decode_table')
+
+    def __init__(
+        self,
+        file_path: str,
+        block_size: int,
+        stride: Optional[int] = None,
+        return_segments: bool = False,
+        share_memory: bool = False,
+        **kwargs: Any,
+    ):
         """
         Initializes the Dataset from a .pkl file containing a list or numpy array of token IDs.
         Metadata (vocab size, tokenizer info) is expected in a 'metadata.json'
@@ -31,13 +44,22 @@ class PickledDataset(BaseDataset):
         Args:
             file_path (str): Path to the .pkl file (e.g., 'data/processed/my_data/train.pkl').
             block_size (int): Maximum sequence length for blocks.
+            stride (Optional[int]): Token distance between consecutive windows. Defaults to
+                                    block_size (non-overlapping); smaller values overlap.
+            return_segments (bool): Return dict samples with per-position `segment_ids`
+                                    (document number within the block) read from the
+                                    `{split}.docs.npy` index written by `prepare --doc-format`.
+            share_memory (bool): Keep in-memory token tensors in shared memory so DataLoader
+                                 workers attach to one copy instead of duplicating it. Only useful
+                                 with num_workers > 0; the tensor then lives in /dev/shm, which must
+                                 be large enough to hold it (Docker defaults to 64MB, see --shm-size).
             **kwargs: Additional keyword arguments (ignored).
         """
         super().__init__() # Initialize BaseDataset
         self.file_path = Path(file_path)
-        self.block_size = block_size
+        self._init_windows(block_size, stride)
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.logger.info(f"Initializing PickledDataset with file: {self.file_path}")
+        self.logger.info(f"Initializing {self.__class__.__name__} with file: {self.file_path}")
 
         # Metadata file path is inferred from the data file path
         self.metadata_path = self.file_path.parent / "metadata.json"
@@ -47,85 +69,148 @@ class PickledDataset(BaseDataset):
             self.logger.debug(f"Ignoring unexpected arguments: {list(kwargs.keys())}")
 
         self._metadata: Optional[Dict[str, Any]] = None # Cache for metadata
-        self._idx_map_cache: Optional[Dict[int, str]] = None # Cache for char idx map
+        self._decode_table: Optional[CharDecodeTable] = None # Char lookup table, built on first decode
 
         if not self.file_path.exists():
-            raise FileNotFoundError(f"Pickled dataset file not found: {self.file_path}")
-
+            raise FileNotFoundError(f"Dataset file not found: {self.file_path}")
+
+        self.token_ids = self._load_token_ids()
+        if share_memory:
+            self._share_token_ids()
+        self.doc_starts: Optional[np.ndarray] = self._load_doc_starts() if return_segments else None
+
+        # Basic validation
+        num_tokens = len(self.token_ids)
+        if num_tokens == 0:
+             self.logger.warning(f"Dataset loaded from {self.file_path} is empty (0 tokens).")
+        elif num_tokens < self.block_size + 1:
+            self.logger.warning(
+                f"Dataset length ({num_tokens}) is less than block_size+1 ({self.block_size + 1}). "
+                f"This might lead to issues during training if drop_last=False."
+            )
+        self.logger.info(f"Successfully loaded {num_tokens} tokens from {self.file_path}.")
+
+    def _load_token_ids(self) -> Any:
+        """
+        Loads the token ids for this split. Subclasses override this to read other
+        storage formats; the returned object must support len() and slicing.
+        """
         try:
             with open(self.file_path, 'rb') as f:
                 loaded_data = pickle.load(f)
 
             # Expect a list or numpy array directly
             if isinstance(loaded_data, np.ndarray):
-                self.token_ids = torch.from_numpy(loaded_data.astype(np.int64))
+                return torch.from_numpy(loaded_data.astype(np.int64))
             elif isinstance(loaded_data, list):
-                self.token_ids = torch.tensor(loaded_data, dtype=torch.long)
+                return torch.tensor(loaded_data, dtype=torch.long)
             elif isinstance(loaded_data, torch.Tensor):
                 if loaded_data.dtype != torch.long:
                      self.logger.warning(f"Loaded tensor has dtype {loaded_data.dtype}, converting to long.")
-                     self.token_ids = loaded_data.long()
-                else:
-                     self.token_ids = loaded_data
+                     return loaded_data.long()
+                return loaded_data
             else:
                 raise TypeError(f"Pickled file content must be a list, numpy array, or torch.Tensor of token IDs, found {type(loaded_data)}")
 
-            # Basic validation
-            if len(self.token_ids) == 0:
-                 self.logger.warning(f"Dataset loaded from {self.file_path} is empty (0 tokens).")
-            elif len(self.token_ids) < self.block_size + 1:
-                self.logger.warning(
-                    f"Dataset length ({len(self.token_ids)}) is less than block_size+1 ({self.block_size + 1}). "
-                    f"This might lead to issues during training if drop_last=False."
-                )
-            self.logger.info(f"Successfully loaded {len(self.token_ids)} tokens from {self.file_path}.")
-
-        except FileNotFoundError:
-            raise # Re-raise specific error
         except (pickle.UnpicklingError, TypeError, Exception) as e:
             self.logger.error(f"Failed to load or parse pickle file {self.file_path}: {e}", exc_info=True)
             raise IOError(f"Failed to load pickle file {self.file_path}: {e}") from e
 
+    def _doc_index_path(self) -> Path:
+        """Location of the document boundary index for this split."""
+        return self.file_path.with_name(f"{self.file_path.stem}{DOC_INDEX_SUFFIX}")
+
+    def _load_doc_starts(self) -> np.ndarray:
+        """Loads the sorted document start offsets of this split."""
+        path = self._doc_index_path()
+        if not path.exists():
+            raise FileNotFoundError(f"return_segments=True needs a document index at {path} (prepare with --doc-format).")
+        doc_starts: np.ndarray = np.load(path)
+        self.logger.info(f"Loaded {len(doc_starts):,} document boundaries from {path}")
+        return doc_starts
+
+    def _segment_ids(self, starts: np.ndarray, length: int) -> torch.Tensor:
+        """
+        Numbers the documents inside each block: position p of a block starting at s
+        gets the count of documents that begin in (s, p]. Equal ids mark tokens of the
+        same document, which is enough to build a block-diagonal causal mask.
+        """
+        assert self.doc_starts is not None
+        positions = starts.reshape(-1, 1) + np.arange(length)
+        segment_ids = np.searchsorted(self.doc_starts, positions, side='right') - np.searchsorted(self.doc_starts, starts.reshape(-1, 1), side='right')
+        return torch.from_numpy(segment_ids.astype(np.int64))
+
+    def _get_block(self, start: int, length: int) -> torch.Tensor:
+        """Returns `length` tokens starting at `start` as a LongTensor."""
+        return cast(torch.Tensor, self.token_ids[start : start + length])
+
+    def _gather_blocks(self, starts: torch.Tensor, length: int) -> torch.Tensor:
+        """Gathers `length` tokens at each offset in `starts` with one fancy-index -> [B, length]."""
+        index = starts.view(-1, 1) + torch.arange(length)
+        return cast(torch.Tensor, self.token_ids[index])
+
+    @property
+    def num_tokens(self) -> int:
+        """Total number of tokens in this split."""
+        return len(self.token_ids) if hasattr(self, 'token_ids') else 0
+
+    def get_batch(self, starts: torch.Tensor) -> Union[Tuple[torch.Tensor, torch.Tensor], Dict[str, torch.Tensor]]:
+        """
+        Builds a whole batch from raw token offsets (used by RandomOffsetBatchSampler).
+
+        Args:
+            starts (torch.Tensor): 1-D LongTensor of B start offsets in [0, num_tokens - block_size - 1].
+
+        Returns:
+            Inputs (x) and targets (y), each [B, block_size]; with return_segments a dict
+            with 'input_ids', 'labels' and 'segment_ids'.
+        """
+        starts = torch.as_tensor(starts, dtype=torch.long)
+        max_start = self.num_tokens - self.block_size - 1
+        if starts.numel() and (int(starts.min()) < 0 or int(starts.max()) > max_start):
+            raise IndexError(f"Batch offsets out of bounds for {self.num_tokens} tokens with block_size {self.block_size}")
+        blocks = self._gather_blocks(starts, self.block_size + 1)
+        if self.doc_starts is not None:
+            segment_ids = self._segment_ids(starts.numpy(), self.block_size)
+            return {'input_ids': blocks[:, :-1], 'labels': blocks[:, 1:], 'segment_ids': segment_ids}
+        return blocks[:, :-1], blocks[:, 1:]
+
     def __len__(self) -> int:
-        """Returns the number of sequences of length block_size that can be obtained."""
-        # Check if token_ids is initialized and is a tensor
-        if not hasattr(self, 'token_ids') or not isinstance(self.token_ids, torch.Tensor):
-             # Should not happen if __init__ ran correctly, but good safeguard
-             return 0 
-             
-        # Correct check for empty or too short tensor
-        if self.token_ids.numel() == 0 or self.token_ids.numel() <= self.block_size:
+        """Returns the number of windows of block_size + 1 tokens spaced `stride` apart."""
+        # token_ids is only missing if __init__ failed part-way
+        if not hasattr(self, 'token_ids'):
              return 0
-             
-        # Correct calculation: number of full blocks of size block_size.
-        # Example: 10 tokens, block_size 3 -> (10-1)//3 = 9//3 = 3 blocks ([0:3], [3:6], [6:9])
-        # The number of items is the total number of tokens minus 1 (for the target offset)
-        # divided by the block size (sequence length). Integer division gives full blocks.
-        return (self.token_ids.numel() - 1) // self.block_size
-
-    def __getitem__(self, idx: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        # Example: 10 tokens, block_size 3, stride 3 -> windows at 0, 3, 6 ((10-3-1)//3 + 1 = 3)
+        return self._num_windows(len(self.token_ids))
+
+    def __getitem__(self, idx: int) -> Union[Tuple[torch.Tensor, torch.Tensor], Dict[str, torch.Tensor]]:
         """
         Retrieves a block of data and the target block offset by one.
 
         Args:
-            idx (int): Starting index for the block.
+            idx (int): Window index; the block starts at token `idx * stride`.
 
         Returns:
-            Tuple[torch.Tensor, torch.Tensor]: Input sequence (x) and target sequence (y).
+            Input sequence (x) and target sequence (y); with return_segments a dict
+            with 'input_ids', 'labels' and 'segment_ids'.
         """
-        if idx < 0 or idx >= len(self):
-            raise IndexError(f"Index {idx} out of bounds for dataset with length {len(self)}")
-        
-        # Get sequence block (x) and target block (y)
-        x = self.token_ids[idx : idx + self.block_size]
-        y = self.token_ids[idx + 1 : idx + self.block_size + 1]
+        start = self._window_start(idx)
+
+        # Read block_size + 1 tokens once and split into sequence (x) and target (y)
+        block = self._get_block(start, self.block_size + 1)
+        x = block[:-1]
+        y = block[1:]
+        if self.doc_starts is not None:
+            segment_ids = self._segment_ids(np.array([start]), self.block_size)[0]
+            return {'input_ids': x, 'labels': y, 'segment_ids': segment_ids}
         return x, y
 
     def get_metadata(self) -> Dict[str, Any]:
         """
         Loads and returns metadata from 'metadata.json' located in the same
         directory as the data file.
-        Caches the metadata after the first load.
+        The file is parsed once per directory through `DatasetIndex.open`, so
+        datasets over the same prepared directory share one copy.
 
         Returns:
             Dict[str, Any]: Dictionary containing metadata.
@@ -134,30 +219,32 @@ class PickledDataset(BaseDataset):
         if self._metadata is not None:
             return self._metadata
 
-        self.logger.info(f"Loading metadata from: {self.metadata_path}")
         if not self.metadata_path.exists():
             self.logger.error(f"Metadata file not found: {self.metadata_path}")
             self._metadata = {}
             return self._metadata
 
         try:
-            with open(self.metadata_path, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
-            if not isinstance(metadata, dict):
-                 self.logger.error(f"Metadata file {self.metadata_path} does not contain a valid JSON dictionary.")
-                 metadata = {}
-            self._metadata = metadata
-            self.logger.info(f"Successfully loaded metadata. Keys: {list(self._metadata.keys())}")
+            self._metadata = DatasetIndex.open(self.metadata_path.parent).metadata
+            self.logger.debug(f"Loaded metadata from {self.metadata_path}. Keys: {list(self._metadata.keys())}")
             return self._metadata
         except json.JSONDecodeError as e:
             self.logger.error(f"Failed to decode JSON from metadata file {self.metadata_path}: {e}")
             self._metadata = {}
             return self._metadata
+        except ValueError as e:
+            self.logger.error(str(e))
+            self._metadata = {}
+            return self._metadata
         except Exception as e:
             self.logger.error(f"Failed to load metadata file {self.metadata_path}: {e}", exc_info=True)
             self._metadata = {}
             return self._metadata
 
+    def get_index(self) -> DatasetIndex:
+        """Precomputed statistics (unigram counts, shard lengths, document offsets) of this dataset's directory."""
+        return DatasetIndex.open(self.metadata_path.parent)
+
     @property
     def vocab_size(self) -> Optional[int]:
         """Attempts to get vocab_size from loaded metadata."""
@@ -196,6 +283,31 @@ class PickledDataset(BaseDataset):
             # self.logger.warning(f"Unsupported tokenizer type '{tokenizer_type}' for dynamic loading in decode.")
             return None
 
+    def _get_decode_table(self) -> Optional[CharDecodeTable]:
+        """Builds (once per process) the char lookup table from the metadata's idx_to_char."""
+        if self._decode_table is None:
+            metadata = self.get_metadata()
+            idx_to_char = metadata.get('idx_to_char')
+            if not idx_to_char:
+                self.logger.warning("Cannot decode: idx_to_char mapping not found in metadata for char type.")
+                return None
+            # JSON object keys are strings
+            idx_map = {int(k): v for k, v in idx_to_char.items()}
+            # PAD and EOS are dropped with skip_special_tokens; '?' marks unknown IDs
+            special_ids = (metadata.get('pad_token_id'), metadata.get('eos_token_id'))
+            self._decode_table = CharDecodeTable(idx_map, unknown='?', special_ids=special_ids)
+        return self._decode_table
+
+    def batch_decode(self, ids: Union[torch.Tensor, np.ndarray, List[List[int]]], skip_special_tokens: bool = True) -> List[str]:
+        """
+        Decodes a [batch, seq_len] batch of token IDs to one string per row. Char
+        vocabularies use a single vectorized lookup; other types decode row by row.
+        """
+        decode_table = self._get_decode_table() if self.get_metadata().get('idx_to_char') else None
+        if decode_table is not None:
+            return decode_table.batch_decode(ids, skip_special_tokens=skip_special_tokens)
+        return [self.decode(row, skip_special_tokens=skip_special_tokens) for row in ids]
+
     def decode(self, ids: Union[torch.Tensor, List[int]], skip_special_tokens: bool = True) -> str:
         """
         Decodes a sequence of token IDs back into text using information from metadata.json.
@@ -210,39 +322,14 @@ class PickledDataset(BaseDataset):
         """
         metadata = self.get_metadata()
         tokenizer_type = metadata.get('tokenizer_type')
-        # Convert tensor to list if necessary
-        if isinstance(ids, torch.Tensor):
-            ids = ids.tolist()
 
         if tokenizer_type == 'CharTokenizer' or metadata.get('idx_to_char'):
             # --- Character Decoding Logic --- #
-            idx_to_char = metadata.get('idx_to_char')
-            if not idx_to_char:
-                self.logger.warning("Cannot decode: idx_to_char mapping not found in metadata for char type.")
+            decode_table = self._get_decode_table()
+            if decode_table is None:
                 return "[Decode unavailable: Missing idx_to_char]"
-            # Handle special tokens if needed (example)
-            pad_token_id = metadata.get('pad_token_id')
-            eos_token_id = metadata.get('eos_token_id')
-
             try:
-                # Cache integer map if keys are strings
-                if self._idx_map_cache is None:
-                    if idx_to_char and all(isinstance(k, str) for k in idx_to_char.keys()):
-                         self._idx_map_cache = {int(k): v for k, v in idx_to_char.items()}
-                    else:
-                         self._idx_map_cache = idx_to_char # Assume keys are already integers or map is missing
-
-                idx_map = self._idx_map_cache or {}
-
-                decoded_chars = []
-                for i in ids:
-                    if skip_special_tokens:
-                        if pad_token_id is not None and i == pad_token_id:
-                            continue
-                        if eos_token_id is not None and i == eos_token_id:
-                            continue
-                    decoded_chars.append(idx_map.get(i, '?')) # Use '?' for unknown IDs
-                return ''.join(decoded_chars)
+                return decode_table.decode(ids, skip_special_tokens=skip_special_tokens)
             except Exception as e:
                 self.logger.error(f"Error during character decoding: {e}", exc_info=True)
                 return f"[Char Decode error: {e}]"
@@ -255,7 +342,7 @@ class PickledDataset(BaseDataset):
                 try:
                     # Note: SentencePiece decode handles skip_special_tokens internally based on its model
                     # We might need to pass flags if the tokenizer interface supports it
-                    return tokenizer.decode(ids)
+                    return tokenizer.decode(ids.tolist() if isinstance(ids, torch.Tensor) else ids)
                 except Exception as e:
                     self.logger.error(f"Error during SentencePiece decoding: {e}", exc_info=True)
                     return f"[SP Decode error: {e}]"
@@ -0,0 +1,80 @@
+import glob
+import logging
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Union
+
+from .memmap_dataset import MemmapTokenDataset
+from ..token_store import ShardedTokenArray, TokenArray, find_split_entry, DOC_INDEX_SUFFIX, TOKEN_FILE_SUFFIX, COMPRESSED_FILE_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_shard_paths(shards: Union[str, Sequence[str]]) -> List[Path]:
+    """
+    Expands a shard specification into a sorted list of files.
+
+    Accepts a directory (every `.bin` file inside it, or every `.tkz` file if
+    it has no `.bin` files), a glob pattern
+    (e.g. 'data/processed/got/char/train-*.bin'), a single file, or an explicit list.
+    """
+    if not isinstance(shards, str):
+        return [Path(p) for p in shards]
+    path = Path(shards)
+    if path.is_dir():
+        return sorted(path.glob(f"*{TOKEN_FILE_SUFFIX}")) or sorted(path.glob(f"*{COMPRESSED_FILE_SUFFIX}"))
+    if path.exists():
+        return [path]
+    return [Path(p) for p in sorted(glob.glob(shards))]
+
+
+class ShardedTokenDataset(MemmapTokenDataset):
+    """
+    Dataset over a corpus split into many raw `.bin` token shards.
+
+    The shards are presented as one contiguous token stream through a
+    `ShardedTokenArray` (cumulative offset index + binary search, shards
+    memory-mapped lazily), so blocks may span shard boundaries and nothing is
+    read into memory up front. Windowing, `get_batch` and metadata/decoding are
+    inherited; metadata.json is read from the directory of the first shard.
+    """
+
+    def __init__(
+        self,
+        shards: Union[str, Sequence[str]],
+        block_size: int,
+        stride: Optional[int] = None,
+        dtype: Optional[str] = None,
+        **kwargs: Any,
+    ):
+        """
+        Args:
+            shards (Union[str, Sequence[str]]): Directory, glob pattern or list of shard files.
+                                                Shards are concatenated in sorted order.
+            block_size (int): Maximum sequence length for blocks.
+            stride (Optional[int]): Token distance between windows (defaults to block_size).
+            dtype (Optional[str]): Storage dtype, if metadata.json has no 'token_store' header.
+            **kwargs: Additional keyword arguments (ignored).
+        """
+        self.shard_paths = resolve_shard_paths(shards)
+        if not self.shard_paths:
+            raise FileNotFoundError(f"No token shards found for: {shards}")
+        super().__init__(str(self.shard_paths[0]), block_size, stride=stride, dtype=dtype, **kwargs)
+
+    def _doc_index_path(self) -> Path:
+        """The document index covers the whole split: '{split}-00000.bin' -> '{split}.docs.npy'."""
+        split_name = self.shard_paths[0].stem.rsplit('-', 1)[0]
+        return self.shard_paths[0].with_name(f"{split_name}{DOC_INDEX_SUFFIX}")
+
+    def _load_token_ids(self) -> TokenArray:
+        """Builds the global offset index over all shards without mapping any of them."""
+        header = self.get_metadata().get('token_store', {})
+        dtype = self._dtype_override or header.get('dtype')
+        if dtype is None:
+            raise ValueError(
+                f"Cannot determine dtype for shards in {self.file_path.parent}: no 'token_store' header in "
+                f"{self.metadata_path} and no dtype argument given."
+            )
+        lengths = [(find_split_entry(header, path.name) or {}).get('length') for path in self.shard_paths]
+        token_ids = ShardedTokenArray(self.shard_paths, dtype, lengths)
+        self.logger.info(f"Indexed {len(token_ids):,} tokens across {len(self.shard_paths)} shard(s) starting at {self.file_path}")
+        return token_ids
@@ -0,0 +1,166 @@
+import os
+import logging
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import torch
+from torch.utils.data import IterableDataset, get_worker_info
+
+# Import BaseTokenizer for type hinting
+from ..tokenizers.base import Tokenizer
+# Import hydra utils for path resolution
+import hydra.utils
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1 << 20 # 1 MiB of raw text per tokenizer call
+
+
+def _utf8_safe_cut(buffer: bytes) -> int:
+    """Returns the largest cut point <= len(buffer) that does not split a UTF-8 sequence."""
+    cut = len(buffer)
+    # Step back over continuation bytes (10xxxxxx) to the start of the last character
+    while cut > 0 and (buffer[cut - 1] & 0xC0) == 0x80:
+        cut -= 1
+    if cut > 0 and buffer[cut - 1] >= 0xC0:
+        cut -= 1 # Last character is incomplete; leave it for the next chunk
+    return cut
+
+
+class StreamingTextDataset(IterableDataset):
+    """
+    Streams raw text files and tokenizes them lazily, one chunk at a time.
+
+    Unlike TextDataset, nothing is read or tokenized at construction time and
+    memory is bounded by `chunk_size`: each chunk of roughly `chunk_size` bytes
+    (cut at a line boundary) is encoded with the configured tokenizer, and the
+    tokens left over after emitting full blocks are carried into the next chunk.
+
+    With DataLoader workers, the total byte range of all files is split evenly
+    across workers via `get_worker_info()`. Ranges are aligned to line starts, so
+    every line is tokenized by exactly one worker. Chunks are tokenized
+    independently, so subword merges never cross a line boundary.
+
+    Yields `(x, y)` pairs of `block_size` tokens (non-overlapping windows, same
+    layout as the map-style datasets). The dataset has no `__len__`.
+    """
+
+    def __init__(
+        self,
+        file_paths: Union[str, Sequence[str]],
+        block_size: int,
+        tokenizer: Tokenizer,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        """
+        Args:
+            file_paths (Union[str, Sequence[str]]): Text file path or list of paths.
+            block_size (int): Maximum sequence length for blocks.
+            tokenizer (Tokenizer): An initialized tokenizer instance.
+            chunk_size (int): Approximate number of bytes read and tokenized per step.
+        """
+        super().__init__()
+        if not tokenizer:
+            raise ValueError("A valid tokenizer must be provided to StreamingTextDataset.")
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}.")
+        if isinstance(file_paths, str):
+            file_paths = [file_paths]
+        self.block_size = block_size
+        self.tokenizer = tokenizer
+        self.chunk_size = chunk_size
+        self.vocab_size: int = tokenizer.get_vocab_size()
+
+        self.file_paths: List[str] = []
+        for file_path in file_paths:
+            # Resolve path using Hydra utils if it might be relative
+            abs_file_path = hydra.utils.to_absolute_path(str(file_path))
+            if not os.path.exists(abs_file_path):
+                logger.error(f"Text file not found: {abs_file_path} (resolved from {file_path})")
+                continue # Skip missing files, as TextDataset does
+            self.file_paths.append(abs_file_path)
+        if not self.file_paths:
+            raise FileNotFoundError(f"None of the text files exist: {list(file_paths)}")
+        self.file_sizes = [os.path.getsize(p) for p in self.file_paths]
+        logger.info(f"StreamingTextDataset over {len(self.file_paths)} file(s), {sum(self.file_sizes):,} bytes, chunk_size={chunk_size:,}")
+
+    def _worker_ranges(self) -> List[Tuple[str, int, int]]:
+        """Splits the concatenated byte range of all files evenly across DataLoader workers."""
+        worker_info = get_worker_info()
+        num_workers, worker_id = (worker_info.num_workers, worker_info.id) if worker_info else (1, 0)
+        total = sum(self.file_sizes)
+        lo = total * worker_id // num_workers
+        hi = total * (worker_id + 1) // num_workers
+        ranges = []
+        file_start = 0
+        for path, size in zip(self.file_paths, self.file_sizes):
+            start, end = max(lo, file_start), min(hi, file_start + size)
+            if start < end:
+                ranges.append((path, start - file_start, end - file_start))
+            file_start += size
+        return ranges
+
+    def _iter_text_chunks(self, path: str, start: int, end: int) -> Iterator[str]:
+        """
+        Yields decoded text for the lines of `path` that *start* in [start, end).
+        Each yielded piece ends on a newline (except at EOF or for very long lines).
+        """
+        with open(path, 'rb') as f:
+            if start > 0:
+                # Skip the partial line owned by the previous range
+                f.seek(start - 1)
+                f.readline()
+            position = f.tell()
+            line_start = position # File offset where the current unfinished line begins
+            pending = b""
+            while position < end:
+                chunk = f.read(self.chunk_size)
+                if not chunk:
+                    break
+                buffer = pending + chunk
+                buffer_start = position - len(pending) # File offset of buffer[0]
+                position += len(chunk)
+                cut = buffer.rfind(b"\n") + 1
+                if cut and buffer_start + cut > end:
+                    # Keep only through the line containing byte end-1; later lines belong to the next worker
+                    line_end = buffer.find(b"\n", max(0, end - 1 - buffer_start)) + 1
+                    yield buffer[:line_end].decode('utf-8', errors='replace')
+                    return
+                if cut == 0:
+                    if len(buffer) < 4 * self.chunk_size:
+                        pending = buffer
+                        continue
+                    cut = _utf8_safe_cut(buffer) # Pathologically long line: cut at a character boundary
+                else:
+                    line_start = buffer_start + cut
+                pending = buffer[cut:]
+                yield buffer[:cut].decode('utf-8', errors='replace')
+            if line_start < end:
+                # Finish the line that started inside this range
+                pending += f.readline()
+                if pending:
+                    yield pending.decode('utf-8', errors='replace')
+
+    def __iter__(self) -> Iterator[Tuple[torch.Tensor, torch.Tensor]]:
+        block_len = self.block_size + 1
+        carry = torch.empty(0, dtype=torch.long) # Tokens left over from the previous chunk
+        for path, start, end in self._worker_ranges():
+            for text in self._iter_text_chunks(path, start, end):
+                encoded = torch.from_numpy(self.tokenizer.encode_array(text).astype(np.int64, copy=False))
+                tokens = torch.cat([carry, encoded])
+                num_blocks = (len(tokens) - 1) // self.block_size if len(tokens) >= block_len else 0
+                for i in range(num_blocks):
+                    # Clone so the yielded views don't pin the whole chunk in memory
+                    block = tokens[i * self.block_size : i * self.block_size + block_len].clone()
+                    yield block[:-1], block[1:]
+                # The last target token of a block is the first input token of the next
+                carry = tokens[num_blocks * self.block_size:].clone()
+
+    def get_vocab_size(self) -> int:
+        """Returns the vocabulary size of the tokenizer."""
+        return self.vocab_size
+
+    def decode(self, tokens: Union[torch.Tensor, List[int]], skip_special_tokens: bool = False) -> str:
+        """Decodes a sequence of token IDs using the dataset's tokenizer."""
+        token_list = tokens.tolist() if isinstance(tokens, torch.Tensor) else tokens
+        return self.tokenizer.decode(token_list)
@@ -1,5 +1,6 @@
 import torch
 import logging
+import numpy as np
 import os
 from typing import List, Union, Optional, Tuple
 import inspect
@@ -12,6 +13,8 @@ from torch.utils.data import Dataset
 from ..base import BaseDataset
 # Import BaseTokenizer for type hinting
 from ..tokenizers.base import Tokenizer
+from ..token_cache import TokenCache
+from ..token_store import select_token_dtype
 # Import hydra utils for path resolution
 import hydra.utils
 
@@ -20,7 +23,17 @@ logger = logging.getLogger(__name__)
 class TextDataset(BaseDataset):
     """Dataset that loads raw text files and tokenizes on the fly."""
     
-    def __init__(self, file_paths: List[str], block_size: int, tokenizer: Tokenizer) -> None:
+    def __init__(
+        self,
+        file_paths: List[str],
+        block_size: int,
+        tokenizer: Tokenizer,
+        stride: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        cache_max_bytes: Optional[int] = None,
+        hash_contents: bool = False,
+        share_memory: bool = False,
+    ) -> None:
         """
         Initializes the Dataset from raw text files.
 
@@ -28,10 +41,21 @@ class TextDataset(BaseDataset):
             file_paths (List[str]): List of paths to text files.
             block_size (int): Maximum sequence length for blocks.
             tokenizer (Tokenizer): An initialized tokenizer instance.
+            stride (Optional[int]): Token distance between consecutive windows. Defaults to
+                                    block_size (non-overlapping); smaller values overlap.
+            cache_dir (Optional[str]): Token cache directory. When set, encoded tokens are stored
+                                       under a content hash of the files and tokenizer, and later
+                                       runs with the same inputs skip tokenization.
+            cache_max_bytes (Optional[int]): Size limit for the cache (LRU eviction).
+            hash_contents (bool): Key the cache on file contents instead of path/size/mtime.
+            share_memory (bool): Keep the token tensor in shared memory so DataLoader workers
+                                 attach to one copy instead of duplicating it. Only useful with
+                                 num_workers > 0; the tensor then lives in /dev/shm, which must be
+                                 large enough to hold it (Docker defaults to 64MB, see --shm-size).
         """
         super().__init__() # Initialize BaseDataset
         self.file_paths = file_paths
-        self.block_size = block_size
+        self._init_windows(block_size, stride)
         self.tokenizer = tokenizer
         self.token_ids: torch.Tensor = torch.tensor([], dtype=torch.long)
         self.vocab_size: int = 0
@@ -62,23 +86,43 @@ class TextDataset(BaseDataset):
         # -------------------------------------------------- #
         
         # --- Read and Tokenize Text Data --- #
-        all_text = ""
-        logger.info(f"Loading and concatenating text data from: {self.file_paths}")
+        abs_file_paths: List[str] = []
         for file_path in self.file_paths:
+            # Resolve path using Hydra utils if it might be relative
+            abs_file_path = hydra.utils.to_absolute_path(file_path)
+            if not os.path.exists(abs_file_path):
+                logger.error(f"Text file not found: {abs_file_path} (resolved from {file_path})")
+                continue # Skip missing files
+            abs_file_paths.append(abs_file_path)
+
+        # --- Token Cache Lookup --- #
+        cache_key: Optional[str] = None
+        if cache_dir and abs_file_paths:
+            self.token_cache = TokenCache(cache_dir, max_bytes=cache_max_bytes)
+            cache_dtype = select_token_dtype(self.tokenizer.get_vocab_size())
+            cache_key = self.token_cache.make_key(abs_file_paths, self.tokenizer, cache_dtype, hash_contents=hash_contents)
+            cached_ids = self.token_cache.load(cache_key)
+            if cached_ids is not None:
+                self.token_ids = torch.from_numpy(cached_ids.astype(np.int64))
+                self.vocab_size = self.tokenizer.get_vocab_size()
+                logger.info(f"Loaded {self.token_ids.numel():,} tokens from token cache; skipping tokenization.")
+                if share_memory:
+                    self._share_token_ids()
+                return
+
+        text_parts: List[str] = [] # Joined once below; repeated += copies the growing string
+        logger.info(f"Loading and concatenating text data from: {self.file_paths}")
+        for abs_file_path in abs_file_paths:
             try:
-                 # Resolve path using Hydra utils if it might be relative
-                 abs_file_path = hydra.utils.to_absolute_path(file_path)
-                 if not os.path.exists(abs_file_path):
-                      logger.error(f"Text file not found: {abs_file_path} (resolved from {file_path})")
-                      continue # Skip missing files
-                      
                  with open(abs_file_path, 'r', encoding='utf-8') as f:
-                     all_text += f.read()
+                     text_parts.append(f.read())
                  logger.debug(f"Read content from {abs_file_path}")
             except Exception as e:
-                logger.error(f"Failed to read file {file_path}: {e}", exc_info=True)
+                logger.error(f"Failed to read file {abs_file_path}: {e}", exc_info=True)
                 # Decide if this should be a fatal error
         
+        all_text = "".join(text_parts)
+        del text_parts
         if not all_text:
             logger.error("No text data could be loaded from provided file paths.")
             # Set token_ids to empty tensor to avoid downstream errors with None
@@ -88,11 +132,18 @@ class TextDataset(BaseDataset):
 
         logger.info(f"Loaded total {len(all_text)} characters. Tokenizing...")
         try:
-            # Encode the entire concatenated text and convert directly to tensor
-            encoded_list: List[int] = self.tokenizer.encode(all_text)
-            self.token_ids = torch.tensor(encoded_list, dtype=torch.long)
+            # Encode the entire concatenated text straight to an array (vectorized for char vocabularies)
+            encoded = self.tokenizer.encode_array(all_text)
+            self.token_ids = torch.from_numpy(encoded.astype(np.int64, copy=False))
             self.vocab_size = self.tokenizer.get_vocab_size()
             logger.info(f"Tokenization complete. Total tokens: {self.token_ids.numel()}, Vocab size: {self.vocab_size}")
+            if share_memory:
+                self._share_token_ids()
+            if cache_key is not None:
+                self.token_cache.store_array(
+                    cache_key, encoded, cache_dtype,
+                    info={'sources': abs_file_paths, 'tokenizer': type(self.tokenizer).__name__},
+                )
             
             # Validation
             if self.token_ids.numel() <= self.block_size:
@@ -108,18 +159,28 @@ class TextDataset(BaseDataset):
     def __len__(self) -> int:
         if not hasattr(self, 'token_ids') or not isinstance(self.token_ids, torch.Tensor):
              return 0
-        if self.token_ids.numel() <= self.block_size:
-            return 0
-        return self.token_ids.numel() - self.block_size
+        return self._num_windows(self.token_ids.numel())
 
     def __getitem__(self, idx: int) -> Tuple[torch.Tensor, torch.Tensor]:
-        if idx < 0 or idx >= len(self):
-            raise IndexError(f"Index {idx} out of bounds for dataset with length {len(self)}")
-            
-        x = self.token_ids[idx : idx + self.block_size]
-        y = self.token_ids[idx + 1 : idx + self.block_size + 1]
+        start = self._window_start(idx)
+        x = self.token_ids[start : start + self.block_size]
+        y = self.token_ids[start + 1 : start + self.block_size + 1]
         return x, y
 
+    @property
+    def num_tokens(self) -> int:
+        """Total number of tokens after tokenization."""
+        return self.token_ids.numel()
+
+    def get_batch(self, starts: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Gathers a [B, block_size + 1] block for B start offsets in one indexing op and returns (x, y)."""
+        starts = torch.as_tensor(starts, dtype=torch.long)
+        max_start = self.num_tokens - self.block_size - 1
+        if starts.numel() and (int(starts.min()) < 0 or int(starts.max()) > max_start):
+            raise IndexError(f"Batch offsets out of bounds for {self.num_tokens} tokens with block_size {self.block_size}")
+        blocks = self.token_ids[starts.view(-1, 1) + torch.arange(self.block_size + 1)]
+        return blocks[:, :-1], blocks[:, 1:]
+
     def get_vocab_size(self) -> int:
         """Returns the vocabulary size determined during initialization."""
         return self.vocab_size
@@ -0,0 +1,202 @@
+"""
+Exact and near-duplicate removal for `craft dataset prepare --dedup`.
+
+Deduplication runs in the same streaming pass as tokenization. Units are
+documents with `--doc-format`, and line-aligned windows of about `window_chars`
+characters otherwise. Each batch of units is hashed by a picklable
+`DedupHasher` in the tokenizer worker processes:
+
+- an exact 64-bit BLAKE2b digest of the text, and
+- for `method='minhash'`, a MinHash signature over word n-gram shingles, cut
+  into `bands` LSH bands that are each hashed to 64 bits.
+
+The ordered results come back to the main process. There, `Deduplicator`
+keeps the first occurrence and drops a unit if its exact digest, or any of its
+band hashes, was seen before. Only these fixed-size hashes are kept, never the
+text: about `1 + bands` integers per kept unit.
+"""
+import hashlib
+import logging
+import zlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEDUP_METHODS = ('exact', 'minhash')
+DEFAULT_WINDOW_CHARS = 2048
+_SHINGLE_BLOCK = 4096 # Shingles hashed per step, bounds the [shingles, num_perm] temporary
+
+UnitHashes = Tuple[np.ndarray, Optional[np.ndarray], np.ndarray] # exact digests, band hashes, char lengths
+
+
+class DedupHasher:
+    """
+    Picklable hasher run in pool workers. Maps a list of texts to their exact
+    digests (uint64[n]), their LSH band hashes (uint64[n, bands], MinHash only)
+    and their character lengths.
+    """
+
+    def __init__(self, method: str = 'minhash', num_perm: int = 128, bands: int = 16, ngram: int = 5, seed: int = 0):
+        if method not in DEDUP_METHODS:
+            raise ValueError(f"Unknown dedup method '{method}'. Expected one of {DEDUP_METHODS}.")
+        if bands <= 0 or num_perm % bands != 0:
+            raise ValueError(f"num_perm ({num_perm}) must be a positive multiple of bands ({bands}).")
+        if ngram <= 0:
+            raise ValueError(f"ngram must be positive, got {ngram}.")
+        self.method = method
+        self.num_perm = num_perm
+        self.bands = bands
+        self.ngram = ngram
+        # Multiply-add-shift hash family: h_i(x) = ((a_i * x + b_i) mod 2^64) >> 32
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    def _shingles(self, text: str) -> np.ndarray:
+        """crc32 of every word n-gram (stable across processes, unlike `hash`)."""
+        words = text.split()
+        if len(words) <= self.ngram:
+            grams = [" ".join(words)]
+        else:
+            grams = [" ".join(words[i : i + self.ngram]) for i in range(len(words) - self.ngram + 1)]
+        return np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.uint64, count=len(grams))
+
+    def minhash(self, text: str) -> np.ndarray:
+        """MinHash signature (uint64[num_perm]) of the text's shingle set."""
+        shingles = np.unique(self._shingles(text))
+        signature = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, len(shingles), _SHINGLE_BLOCK):
+            block = shingles[start : start + _SHINGLE_BLOCK, None]
+            values = (block * self._a + self._b) >> np.uint64(32) # uint64 arithmetic wraps mod 2^64
+            np.minimum(signature, values.min(axis=0), out=signature)
+        return signature
+
+    def band_hashes(self, signature: np.ndarray) -> np.ndarray:
+        rows = signature.reshape(self.bands, -1)
+        return np.array([
+            int.from_bytes(hashlib.blake2b(row.tobytes(), digest_size=8, salt=band.to_bytes(8, 'little')).digest(), 'little')
+            for band, row in enumerate(rows)
+        ], dtype=np.uint64)
+
+    def __call__(self, texts: List[str]) -> UnitHashes:
+        exact = np.array(
+            [int.from_bytes(hashlib.blake2b(t.encode('utf-8'), digest_size=8).digest(), 'little') for t in texts],
+            dtype=np.uint64,
+        )
+        chars = np.array([len(t) for t in texts], dtype=np.int64)
+        if self.method != 'minhash':
+            return exact, None, chars
+        bands = np.empty((len(texts), self.bands), dtype=np.uint64)
+        for i, text in enumerate(texts):
+            bands[i] = self.band_hashes(self.minhash(text))
+        return exact, bands, chars
+
+
+class HashingEncoder:
+    """Picklable pool task: runs `encoder` and `hasher` on the same batch of texts."""
+
+    def __init__(self, encoder: Any, hasher: DedupHasher):
+        self.encoder = encoder
+        self.hasher = hasher
+
+    def __call__(self, texts: List[str]) -> Tuple[Any, UnitHashes]:
+        return self.encoder(texts), self.hasher(texts)
+
+
+class Deduplicator:
+    """
+    Main-process duplicate filter. Keeps the first occurrence of each unit and
+    counts what it removes; `report()` is stored under `dedup` in metadata.json.
+    """
+
+    def __init__(
+        self,
+        method: str = 'minhash',
+        num_perm: int = 128,
+        bands: int = 16,
+        ngram: int = 5,
+        window_chars: int = DEFAULT_WINDOW_CHARS,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            method: 'exact' (identical text only) or 'minhash' (exact plus near duplicates).
+            num_perm: MinHash signature length.
+            bands: LSH bands; units sharing any band are near duplicates. With
+                   r = num_perm / bands rows per band, pairs above a Jaccard similarity
+                   of about (1 / bands) ** (1 / r) are caught (~0.7 for 128/16).
+            ngram: Words per shingle.
+            window_chars: Size of the line-aligned windows used as units when the input
+                          is not split into documents.
+            seed: Seed of the MinHash hash family.
+        """
+        self.hasher = DedupHasher(method, num_perm, bands, ngram, seed)
+        self.window_chars = window_chars
+        self._seen_exact: Set[int] = set()
+        self._seen_bands: Set[int] = set()
+        self.units = 0
+        self.chars = 0
+        self.removed_exact = 0
+        self.removed_near = 0
+        self.chars_removed = 0
+
+    @property
+    def method(self) -> str:
+        return self.hasher.method
+
+    def wrap(self, encoder: Any) -> HashingEncoder:
+        """Pool task that encodes and hashes each batch of units in one go."""
+        return HashingEncoder(encoder, self.hasher)
+
+    def filter(self, hashes: UnitHashes) -> np.ndarray:
+        """Returns the keep mask for a batch of units (`DedupHasher` output), in order, and records the kept hashes."""
+        exact, bands, chars = hashes
+        keep = np.ones(len(exact), dtype=bool)
+        for i, digest in enumerate(exact.tolist()):
+            if digest in self._seen_exact:
+                keep[i] = False
+                self.removed_exact += 1
+                continue
+            self._seen_exact.add(digest)
+            if bands is not None:
+                # Band hashes are salted by band index, so one set holds all bands
+                band_keys = bands[i].tolist()
+                if any(key in self._seen_bands for key in band_keys):
+                    keep[i] = False
+                    self.removed_near += 1
+                    continue
+                self._seen_bands.update(band_keys)
+        self.units += len(keep)
+        self.chars += int(chars.sum())
+        self.chars_removed += int(chars[~keep].sum())
+        return keep
+
+    @property
+    def removed(self) -> int:
+        return self.removed_exact + self.removed_near
+
+    def report(self) -> Dict[str, Any]:
+        """Summary stored under `dedup` in metadata.json."""
+        hasher = self.hasher
+        report: Dict[str, Any] = {
+            'method': self.method,
+            'units': self.units,
+            'removed': self.removed,
+            'removed_exact': self.removed_exact,
+            'removed_near': self.removed_near,
+            'removed_fraction': self.removed / self.units if self.units else 0.0,
+            'removed_chars_fraction': self.chars_removed / self.chars if self.chars else 0.0,
+            'window_chars': self.window_chars,
+        }
+        if self.method == 'minhash':
+            report.update({'num_perm': hasher.num_perm, 'bands': hasher.bands, 'ngram': hasher.ngram})
+        return report
+
+    def log_summary(self) -> None:
+        logger.info(
+            f"Dedup ({self.method}): removed {self.removed:,} of {self.units:,} units "
+            f"({self.removed_exact:,} exact, {self.removed_near:,} near), "
+            f"{self.chars_removed / max(self.chars, 1):.2%} of the text."
+        )
@@ -0,0 +1,140 @@
+"""
+Background prefetching of training batches.
+
+`PrefetchLoader` wraps any iterable of batches (usually a DataLoader). A
+background thread pulls the next batches from it, which runs collation on that
+thread when `num_workers=0`. The thread pins each batch and copies it to the
+device, issuing the copy on a side CUDA stream when CUDA is available, and
+keeps up to `depth` ready batches in a queue. The training loop then receives
+batches that are already on the device while the next ones are being
+prepared, so data loading overlaps with compute.
+
+`queue_depth` (ready batches at the last fetch) and `starved_fetches` (fetches
+that found the queue empty) show whether training is waiting for data. The
+first fetch of each pass always waits for the thread to start and is not
+counted.
+"""
+import logging
+import queue
+import threading
+from typing import Any, Iterable, Iterator, Optional, Union
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+_END = object() # Sentinel marking the end of the wrapped iterator
+
+
+def move_to_device(batch: Any, device: torch.device, pin: bool = False) -> Any:
+    """Recursively moves the tensors of a batch (tensor, tuple/list or dict) to `device`."""
+    if isinstance(batch, torch.Tensor):
+        if pin and not batch.is_pinned():
+            batch = batch.pin_memory()
+        return batch.to(device, non_blocking=True)
+    if isinstance(batch, (list, tuple)):
+        return type(batch)(move_to_device(item, device, pin) for item in batch)
+    if isinstance(batch, dict):
+        return {key: move_to_device(value, device, pin) for key, value in batch.items()}
+    return batch
+
+
+def _record_stream(batch: Any, stream: "torch.cuda.Stream") -> None:
+    """Tells the caching allocator that `batch` is now used on `stream`."""
+    if isinstance(batch, torch.Tensor):
+        if batch.is_cuda:
+            batch.record_stream(stream)
+    elif isinstance(batch, (list, tuple)):
+        for item in batch:
+            _record_stream(item, stream)
+    elif isinstance(batch, dict):
+        for value in batch.values():
+            _record_stream(value, stream)
+
+
+class PrefetchLoader:
+    """Iterates a loader on a background thread, keeping `depth` device-ready batches queued."""
+
+    def __init__(self, loader: Iterable[Any], device: Union[str, torch.device], depth: int = 2):
+        """
+        Args:
+            loader: The wrapped DataLoader (or any re-iterable of batches).
+            device: Device the batches are moved to.
+            depth: Maximum number of ready batches held ahead of the training loop.
+        """
+        if depth <= 0:
+            raise ValueError(f"Prefetch depth must be positive, got {depth}.")
+        self.loader = loader
+        self.device = torch.device(device)
+        self.depth = depth
+        self.use_cuda_stream = self.device.type == 'cuda' and torch.cuda.is_available()
+        self.queue_depth = 0
+        self.starved_fetches = 0
+        logger.info(f"Prefetching {depth} batch(es) ahead on {self.device}{' (side CUDA stream)' if self.use_cuda_stream else ''}.")
+
+    def __len__(self) -> int:
+        return len(self.loader) # type: ignore[arg-type]
+
+    def __getattr__(self, name: str) -> Any:
+        # Expose the wrapped loader's attributes (dataset, sampler, batch_size, ...)
+        if name == 'loader':
+            raise AttributeError(name)
+        return getattr(self.loader, name)
+
+    def _produce(self, ready: "queue.Queue[Any]", stop: threading.Event) -> None:
+        stream = torch.cuda.Stream(device=self.device) if self.use_cuda_stream else None
+        try:
+            for batch in self.loader:
+                if stream is not None:
+                    with torch.cuda.stream(stream):
+                        batch = move_to_device(batch, self.device, pin=True)
+                    event: Optional[torch.cuda.Event] = torch.cuda.Event()
+                    event.record(stream) # type: ignore[union-attr]
+                else:
+                    batch = move_to_device(batch, self.device)
+                    event = None
+                while not stop.is_set():
+                    try:
+                        ready.put((batch, event), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            item: Any = _END
+        except Exception as e: # Re-raised in the consuming thread
+            item = e
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self) -> Iterator[Any]:
+        ready: "queue.Queue[Any]" = queue.Queue(maxsize=self.depth)
+        stop = threading.Event()
+        worker = threading.Thread(target=self._produce, args=(ready, stop), name="PrefetchLoader", daemon=True)
+        worker.start()
+        warming_up = True
+        try:
+            while True:
+                self.queue_depth = ready.qsize()
+                if self.queue_depth == 0 and not warming_up:
+                    self.starved_fetches += 1
+                warming_up = False
+                item = ready.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                batch, event = item
+                if event is not None:
+                    current = torch.cuda.current_stream(self.device)
+                    current.wait_event(event)
+                    _record_stream(batch, current)
+                yield batch
+        finally:
+            # Also runs when the consumer stops early (max_steps, exceptions)
+            stop.set()
+            worker.join(timeout=1.0)
@@ -0,0 +1,559 @@
+"""
+Chunked, parallel tokenization used by `craft dataset prepare`.
+
+The input file is read in text chunks of roughly `chunk_chars` characters cut
+at line boundaries. Chunks are encoded in a process pool whose workers each
+build their encoder once (pool initializer). The ordered results are appended
+straight to a raw token file, so peak memory is bounded by
+`chunk_chars * (2 * num_workers)` instead of the size of the corpus.
+The train/val/test split files are then cut from that token file through a
+memory map.
+
+Document-structured input (JSONL or delimiter-separated) is packed densely
+instead: every document is followed by EOS, and the start offset of each
+document is kept so each split gets a `{split}.docs.npy` boundary index.
+
+With a `Deduplicator` (see `dedup.py`), documents (or line-aligned windows of
+plain text) are hashed in the same worker tasks that encode them, and
+duplicates are dropped before their ids are written.
+
+Pure-ASCII input for character vocabularies skips text decoding altogether:
+the file is memory-mapped as bytes and mapped through a 256-entry byte -> id
+table (`byte_lut`), and the vocabulary comes from a byte histogram.
+"""
+import json
+import logging
+import os
+import pickle
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from .dataset_index import count_unigrams, write_dataset_stats
+from .dedup import Deduplicator
+from .token_cache import TokenCache
+from .tokenizers.char import CharEncodeTable
+from .token_store import (
+    open_token_file, write_token_file, write_token_shards, token_file_suffix,
+    DOC_INDEX_SUFFIX, TOKEN_FILE_SUFFIX, DEFAULT_CHUNK_TOKENS,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_CHARS = 4 << 20 # ~4M characters per tokenizer call
+SPLIT_NAMES = ('train', 'val', 'test')
+DOC_FORMATS = ('jsonl', 'delimited')
+DEFAULT_DOC_DELIMITER = "\n\n" # Blank line between documents
+
+
+def iter_line_chunks(input_path: Union[str, Path], chunk_chars: int = DEFAULT_CHUNK_CHARS) -> Iterator[str]:
+    """
+    Yields the text of `input_path` in chunks of about `chunk_chars` characters
+    that end on a newline (the last chunk may not). A line longer than
+    `4 * chunk_chars` is cut after a space instead. Tokenizers that split on
+    whitespace (SentencePiece by default) therefore encode the chunks exactly as
+    they would the whole file. Concatenating the chunks reproduces the file as
+    read in text mode (universal newlines).
+    """
+    pending = ""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        while True:
+            text = f.read(chunk_chars)
+            if not text:
+                break
+            text = pending + text
+            cut = text.rfind("\n") + 1
+            if cut == 0 and len(text) < 4 * chunk_chars:
+                pending = text # No line break yet; keep reading
+                continue
+            if cut == 0:
+                # Pathologically long line: cut after its last space, or anywhere without one
+                cut = text.rfind(" ") + 1 or len(text)
+            pending = text[cut:]
+            yield text[:cut]
+    if pending:
+        yield pending
+
+
+def iter_byte_chunks(input_path: Union[str, Path], chunk_bytes: int = DEFAULT_CHUNK_CHARS) -> Iterator[np.ndarray]:
+    """Yields the raw bytes of `input_path` as uint8 memory-map slices of `chunk_bytes`."""
+    if os.path.getsize(input_path) == 0:
+        return # np.memmap cannot map an empty file
+    data = np.memmap(input_path, dtype=np.uint8, mode='r')
+    for start in range(0, len(data), chunk_bytes):
+        yield data[start : start + chunk_bytes]
+
+
+def count_bytes(input_path: Union[str, Path], chunk_bytes: int = DEFAULT_CHUNK_CHARS) -> np.ndarray:
+    """Histogram (int64[256]) of the byte values of the file, read without decoding it."""
+    counts = np.zeros(256, dtype=np.int64)
+    for chunk in iter_byte_chunks(input_path, chunk_bytes):
+        counts += np.bincount(chunk, minlength=256)
+    return counts
+
+
+def ascii_char_vocab(byte_counts: np.ndarray) -> Optional[List[str]]:
+    """
+    Returns the sorted characters of a file from its `count_bytes` histogram if
+    its raw bytes can be used as characters, i.e. it is pure ASCII without '\\r'
+    (text mode would rewrite line endings). Returns None otherwise; UTF-8 files
+    with non-ASCII characters need decoding.
+    """
+    if byte_counts[128:].any() or byte_counts[ord('\r')]:
+        return None
+    return [chr(code) for code in np.flatnonzero(byte_counts)]
+
+
+def collect_char_vocab(
+    input_path: Union[str, Path],
+    chunk_chars: int = DEFAULT_CHUNK_CHARS,
+    texts: Optional[Iterable[str]] = None,
+) -> List[str]:
+    """
+    Returns the sorted set of characters in the file without loading it whole.
+    Pass `texts` (e.g. from `iter_documents`) to scan those instead of the raw file.
+    """
+    chars: Set[str] = set()
+    for chunk in (texts if texts is not None else iter_line_chunks(input_path, chunk_chars)):
+        chars.update(chunk)
+    return sorted(chars)
+
+
+class CharEncoder:
+    """
+    Picklable character -> id encoder for pool workers. Encodes through a
+    `CharEncodeTable`, built lazily in each worker instead of being pickled.
+    """
+
+    def __init__(self, char_to_idx: Dict[str, int], dtype: Union[str, np.dtype]):
+        self.char_to_idx = char_to_idx
+        self.dtype = np.dtype(dtype)
+        self._table: Optional[CharEncodeTable] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state['_table'] = None
+        return state
+
+    def __call__(self, text: str) -> np.ndarray:
+        if self._table is None:
+            self._table = CharEncodeTable(self.char_to_idx) # No unknown id: unknown characters are dropped
+        ids = self._table.encode(text, self.dtype)
+        if len(ids) != len(text):
+            missing = sorted(set(text) - set(self.char_to_idx))
+            raise KeyError(f"Characters not in the vocabulary: {missing[:10]}")
+        return ids
+
+    def encode_batch(self, texts: List[str]) -> List[np.ndarray]:
+        """Encodes several texts in one table lookup over their concatenation."""
+        if self._table is None:
+            self._table = CharEncodeTable(self.char_to_idx)
+        arrays = self._table.batch_encode(texts, self.dtype)
+        if sum(len(ids) for ids in arrays) != sum(len(text) for text in texts):
+            missing = sorted(set().union(*texts) - set(self.char_to_idx))
+            raise KeyError(f"Characters not in the vocabulary: {missing[:10]}")
+        return arrays
+
+
+class SentencePieceEncoder:
+    """
+    Picklable SentencePiece encoder for pool workers. The model is loaded lazily
+    in each worker from `model_prefix`, so only the path crosses process boundaries.
+    Chunks are encoded without BOS/EOS; the caller adds them around the whole stream.
+    An already loaded `tokenizer` is reused in-process but never pickled.
+    Document batches go through SentencePiece's thread pool with `num_threads`
+    threads (None: every core; use 1 inside a process pool).
+    """
+
+    def __init__(
+        self,
+        model_prefix: Union[str, Path],
+        dtype: Union[str, np.dtype],
+        tokenizer: Any = None,
+        num_threads: Optional[int] = None,
+    ):
+        self.model_prefix = str(model_prefix)
+        self.dtype = np.dtype(dtype)
+        self.num_threads = num_threads
+        self._tokenizer: Any = tokenizer
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state['_tokenizer'] = None
+        return state
+
+    def _get_tokenizer(self) -> Any:
+        if self._tokenizer is None:
+            from .tokenizers.sentencepiece import SentencePieceTokenizer
+            self._tokenizer = SentencePieceTokenizer.load_from_prefix(self.model_prefix)
+        return self._tokenizer
+
+    def __call__(self, text: str) -> np.ndarray:
+        return np.asarray(self._get_tokenizer().encode(text, add_special_tokens=False), dtype=self.dtype)
+
+    def encode_batch(self, texts: List[str]) -> List[np.ndarray]:
+        batch = self._get_tokenizer().batch_encode(texts, add_special_tokens=False, num_threads=self.num_threads)
+        return [np.asarray(ids, dtype=self.dtype) for ids in batch]
+
+
+class DocumentEncoder:
+    """
+    Picklable encoder for a list of documents: each document is encoded with
+    `encoder` and followed by `eos_id` (nothing if None). Returns the packed ids
+    and the length of each document (including its EOS). Encoders with an
+    `encode_batch(texts)` method get the whole list in one call.
+    """
+
+    def __init__(self, encoder: Callable[[str], np.ndarray], eos_id: Optional[int]):
+        self.encoder = encoder
+        self.eos_id = eos_id
+
+    def __call__(self, documents: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        encode_batch = getattr(self.encoder, 'encode_batch', None)
+        if encode_batch is not None and documents:
+            pieces = list(encode_batch(documents))
+        else:
+            pieces = [self.encoder(document) for document in documents]
+        if self.eos_id is not None:
+            pieces = [np.append(piece, np.array([self.eos_id], dtype=piece.dtype)) for piece in pieces]
+        lengths = np.array([len(piece) for piece in pieces], dtype=np.int64)
+        if not pieces:
+            return np.empty(0, dtype=np.int64), lengths
+        return np.concatenate(pieces), lengths
+
+
+def _encode_units(
+    encoder: DocumentEncoder,
+    batches: Iterable[List[str]],
+    num_workers: int,
+    dedup: Optional[Deduplicator] = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Yields (packed ids, unit lengths) per batch of units. With `dedup`, units are
+    hashed in the same task and duplicates are cut out of the packed ids.
+    """
+    if dedup is None:
+        yield from _map_ordered(encoder, batches, num_workers)
+        return
+    for (ids, lengths), hashes in _map_ordered(dedup.wrap(encoder), batches, num_workers):
+        keep = dedup.filter(hashes)
+        if not keep.all():
+            ids, lengths = ids[np.repeat(keep, lengths)], lengths[keep]
+        yield ids, lengths
+
+
+# --- Process pool plumbing: each worker builds/holds its encoder once --- #
+_worker_encoder: Optional[Callable[[Any], Any]] = None
+
+
+def _init_worker(encoder: Callable[[Any], Any]) -> None:
+    global _worker_encoder
+    _worker_encoder = encoder
+
+
+def _encode_in_worker(item: Any) -> Any:
+    assert _worker_encoder is not None, "Worker encoder not initialized"
+    return _worker_encoder(item)
+
+
+def _map_ordered(encoder: Callable[[Any], Any], items: Iterable[Any], num_workers: int) -> Iterator[Any]:
+    """
+    Yields `encoder(item)` for each item in order, using a process pool when
+    num_workers > 1. At most 2 * num_workers items are in flight, which keeps
+    memory flat.
+    """
+    if num_workers <= 1:
+        for item in items:
+            yield encoder(item)
+        return
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, initargs=(encoder,)) as executor:
+        in_flight: Deque[Future] = deque()
+        for item in items:
+            in_flight.append(executor.submit(_encode_in_worker, item))
+            if len(in_flight) >= 2 * num_workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def encode_file_to_token_file(
+    input_path: Union[str, Path],
+    output_path: Union[str, Path],
+    encoder: Callable[[str], np.ndarray],
+    dtype: Union[str, np.dtype],
+    num_workers: int = 1,
+    chunk_chars: int = DEFAULT_CHUNK_CHARS,
+    prefix_ids: Sequence[int] = (),
+    suffix_ids: Sequence[int] = (),
+    dedup: Optional[Deduplicator] = None,
+    byte_lut: Optional[np.ndarray] = None,
+) -> int:
+    """
+    Tokenizes `input_path` chunk by chunk and appends the ids to a raw token file.
+
+    Args:
+        input_path: Raw UTF-8 text file.
+        output_path: Destination raw token file (overwritten).
+        encoder: Picklable callable mapping a text chunk to an id array.
+        dtype: Storage dtype of the token file.
+        num_workers: Number of encoder processes; 1 encodes in this process.
+        chunk_chars: Approximate chunk size in characters.
+        prefix_ids / suffix_ids: Ids written before/after the whole stream (e.g. BOS/EOS).
+        dedup: Optional duplicate filter. The text is then cut into line-aligned
+               windows of `dedup.window_chars` characters, and repeated windows are dropped.
+        byte_lut: Optional 256-entry byte -> id table (-1 for bytes outside the vocabulary,
+                  e.g. `CharEncodeTable.byte_lut`). The file is then read as raw bytes and
+                  mapped through it in this process; `encoder` is not used. Only valid for
+                  input that `ascii_char_vocab` accepts.
+
+    Returns:
+        int: Number of tokens written.
+
+    Raises:
+        ValueError: If both `byte_lut` and `dedup` are given.
+        KeyError: If the file has a byte that `byte_lut` does not map.
+    """
+    dtype = np.dtype(dtype)
+    if byte_lut is not None and dedup is not None:
+        raise ValueError("byte_lut cannot be combined with dedup.")
+    total = 0
+    with open(output_path, 'wb') as out:
+        def _write(ids: Any) -> None:
+            nonlocal total
+            array = np.asarray(ids, dtype=dtype)
+            array.tofile(out)
+            total += len(array)
+
+        _write(prefix_ids)
+        if num_workers > 1 and byte_lut is None:
+            logger.info(f"Tokenizing {input_path} with {num_workers} worker processes...")
+        if byte_lut is not None:
+            absent = np.asarray(byte_lut) < 0
+            table = np.where(absent, 0, byte_lut).astype(dtype)
+            for codes in iter_byte_chunks(input_path, chunk_chars):
+                if absent.any() and absent[codes].any():
+                    missing = np.unique(codes[absent[codes]])
+                    raise KeyError(f"Bytes not in the vocabulary: {missing[:10].tolist()}")
+                _write(table[codes])
+        elif dedup is None:
+            for ids in _map_ordered(encoder, iter_line_chunks(input_path, chunk_chars), num_workers):
+                _write(ids)
+        else:
+            windows = _batch_documents(iter_line_chunks(input_path, dedup.window_chars), chunk_chars)
+            for ids, _ in _encode_units(DocumentEncoder(encoder, None), windows, num_workers, dedup):
+                _write(ids)
+            dedup.log_summary()
+        _write(suffix_ids)
+    logger.info(f"Tokenized {input_path} into {total:,} tokens ({dtype.name}) at {output_path}")
+    return total
+
+
+def iter_documents(
+    input_path: Union[str, Path],
+    doc_format: str,
+    delimiter: str = DEFAULT_DOC_DELIMITER,
+    text_field: str = "text",
+    chunk_chars: int = DEFAULT_CHUNK_CHARS,
+) -> Iterator[str]:
+    """
+    Streams the documents of `input_path`.
+
+    Args:
+        doc_format: 'jsonl' (one JSON object per line, text under `text_field`) or
+                    'delimited' (plain text, documents separated by `delimiter`).
+    """
+    if doc_format == 'jsonl':
+        with open(input_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if text_field not in record:
+                    raise ValueError(f"{input_path}:{line_number}: JSONL record has no '{text_field}' field.")
+                yield record[text_field]
+    elif doc_format == 'delimited':
+        pending = ""
+        for chunk in iter_line_chunks(input_path, chunk_chars):
+            parts = (pending + chunk).split(delimiter)
+            pending = parts.pop()
+            yield from (part for part in parts if part.strip())
+        if pending.strip():
+            yield pending
+    else:
+        raise ValueError(f"Unknown document format '{doc_format}'. Expected one of {DOC_FORMATS}.")
+
+
+def _batch_documents(documents: Iterable[str], chunk_chars: int) -> Iterator[List[str]]:
+    """Groups documents into lists of about `chunk_chars` characters (one pool task each)."""
+    batch: List[str] = []
+    size = 0
+    for document in documents:
+        batch.append(document)
+        size += len(document)
+        if size >= chunk_chars:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def encode_documents_to_token_file(
+    input_path: Union[str, Path],
+    output_path: Union[str, Path],
+    encoder: Callable[[str], np.ndarray],
+    dtype: Union[str, np.dtype],
+    eos_id: int,
+    doc_format: str,
+    delimiter: str = DEFAULT_DOC_DELIMITER,
+    text_field: str = "text",
+    num_workers: int = 1,
+    chunk_chars: int = DEFAULT_CHUNK_CHARS,
+    dedup: Optional[Deduplicator] = None,
+) -> Tuple[int, np.ndarray]:
+    """
+    Packs the documents of `input_path` into one dense token stream, each followed by `eos_id`.
+
+    No padding is written: blocks are later cut straight from the stream, and
+    the returned document start offsets let datasets recover where each
+    document begins inside a block. With `dedup`, duplicate documents are
+    dropped before packing.
+
+    Returns:
+        Tuple[int, np.ndarray]: Number of tokens written and the int64 start offset of every document.
+    """
+    dtype = np.dtype(dtype)
+    document_batches = _batch_documents(iter_documents(input_path, doc_format, delimiter, text_field, chunk_chars), chunk_chars)
+    all_lengths: List[np.ndarray] = []
+    total = 0
+    with open(output_path, 'wb') as out:
+        for ids, lengths in _encode_units(DocumentEncoder(encoder, eos_id), document_batches, num_workers, dedup):
+            np.asarray(ids, dtype=dtype).tofile(out)
+            total += len(ids)
+            all_lengths.append(lengths)
+    if dedup is not None:
+        dedup.log_summary()
+    lengths = np.concatenate(all_lengths) if all_lengths else np.empty(0, dtype=np.int64)
+    doc_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64) if len(lengths) else lengths
+    logger.info(f"Packed {len(doc_starts):,} documents from {input_path} into {total:,} tokens ({dtype.name}) at {output_path}")
+    return total, doc_starts
+
+
+def encode_file_cached(
+    input_path: Union[str, Path],
+    output_path: Union[str, Path],
+    encoder: Callable[[str], np.ndarray],
+    tokenizer: Any,
+    dtype: Union[str, np.dtype],
+    cache: Optional[TokenCache] = None,
+    **encode_kwargs: Any,
+) -> Tuple[Path, int]:
+    """
+    `encode_file_to_token_file` behind an optional TokenCache.
+
+    On a cache hit nothing is tokenized and the cached file is returned. On a
+    miss the file is encoded to `output_path` and, with a cache, moved into it.
+    The caller must not delete the returned path when it lives in the cache.
+    Deduplicated output (a `dedup` keyword) is never cached.
+
+    Returns:
+        Tuple[Path, int]: Path of the token file to read and its token count.
+    """
+    cache_key = None
+    if cache is not None and encode_kwargs.get('dedup') is not None:
+        logger.warning("The token cache is not used when deduplicating; tokenizing.")
+        cache = None
+    if cache is not None:
+        cache_key = cache.make_key([input_path], tokenizer, dtype)
+        entry = cache.lookup(cache_key)
+        if entry is not None:
+            logger.info(f"Token cache hit for {input_path}; skipping tokenization.")
+            return Path(entry['path']), int(entry['length'])
+    n = encode_file_to_token_file(input_path, output_path, encoder, dtype, **encode_kwargs)
+    if cache is not None and cache_key is not None:
+        info = {'sources': [str(input_path)], 'tokenizer': type(tokenizer).__name__}
+        return cache.store_file(cache_key, output_path, dtype, n, info), n
+    return Path(output_path), n
+
+
+def write_split_token_files(
+    token_file: Union[str, Path],
+    dtype: Union[str, np.dtype],
+    output_dir: Union[str, Path],
+    splits: Sequence[float],
+    write_pickle: bool = True,
+    shard_size: Optional[int] = None,
+    pickle_dtype: Optional[Union[str, np.dtype]] = None,
+    doc_starts: Optional[np.ndarray] = None,
+    compression: Optional[str] = None,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    vocab_size: Optional[int] = None,
+) -> Tuple[Dict[str, str], Dict[str, Dict[str, Any]], Dict[str, int]]:
+    """
+    Cuts a tokenized stream into train/val/test token files (and optional legacy pickles).
+
+    Split points follow the original processors: train_end = int(r_train * n) and
+    val_end = train_end + int(r_val * n). With `doc_starts` (document start
+    offsets in the stream), each split also gets a `{split}.docs.npy` index of
+    the documents starting inside it, relative to the split, recorded as
+    `doc_index` in its token_store entry. With `compression` (a codec name or
+    'auto'), splits are written as chunk-compressed `.tkz` files of
+    `chunk_tokens`-token chunks instead of raw `.bin` files. With `vocab_size`,
+    the unigram counts of each split are taken while it is written and saved
+    with the shard lengths to `stats.npz` (read with `DatasetIndex`).
+
+    Returns:
+        Tuple of (output paths by split, token_store split entries, split sizes).
+    """
+    output_dir = Path(output_dir)
+    token_ids = open_token_file(token_file, dtype)
+    n = len(token_ids)
+    train_end = int(splits[0] * n)
+    val_end = train_end + int(splits[1] * n)
+    bounds = {'train': (0, train_end), 'val': (train_end, val_end), 'test': (val_end, n)}
+    split_sizes = {name: stop - start for name, (start, stop) in bounds.items()}
+    logger.info(f"Split sizes: Train={split_sizes['train']:,}, Val={split_sizes['val']:,}, Test={split_sizes['test']:,}")
+
+    output_paths: Dict[str, str] = {}
+    token_store_splits: Dict[str, Dict[str, Any]] = {}
+    unigram_counts: Dict[str, np.ndarray] = {}
+    for split_name in SPLIT_NAMES:
+        start, stop = bounds[split_name]
+        if stop == start:
+            logger.warning(f"Split '{split_name}' has size 0. Skipping save.")
+            continue
+        split_ids = token_ids[start:stop] # View into the memory map; written without a full copy
+        suffix = token_file_suffix(compression)
+        if shard_size:
+            token_store_splits[split_name] = write_token_shards(
+                output_dir, split_name, split_ids, dtype, shard_size, offset=start,
+                compression=compression, chunk_tokens=chunk_tokens,
+            )
+            output_paths[split_name] = str(output_dir / f"{split_name}-*{suffix}")
+        else:
+            bin_filepath = output_dir / f"{split_name}{suffix}"
+            token_store_splits[split_name] = write_token_file(
+                bin_filepath, split_ids, dtype, offset=start, compression=compression, chunk_tokens=chunk_tokens,
+            )
+            output_paths[split_name] = str(bin_filepath)
+        if doc_starts is not None:
+            split_doc_starts = doc_starts[(doc_starts >= start) & (doc_starts < stop)] - start
+            doc_index_path = output_dir / f"{split_name}{DOC_INDEX_SUFFIX}"
+            np.save(doc_index_path, split_doc_starts.astype(np.int64))
+            token_store_splits[split_name]['doc_index'] = doc_index_path.name
+            token_store_splits[split_name]['num_documents'] = int(len(split_doc_starts))
+        if vocab_size is not None:
+            unigram_counts[split_name] = count_unigrams(split_ids, vocab_size) # Pages are hot from the write
+        if write_pickle:
+            output_filepath = output_dir / f"{split_name}.pkl"
+            logger.info(f"Saving {split_name} split to {output_filepath}...")
+            with open(output_filepath, 'wb') as f:
+                pickle.dump(np.array(split_ids, dtype=pickle_dtype or dtype), f)
+            output_paths[split_name] = str(output_filepath)
+        logger.info(f"Saved {split_name} split ({split_sizes[split_name]:,} tokens).")
+    del token_ids # Release the memory map before the caller removes the file
+    if vocab_size is not None:
+        write_dataset_stats(output_dir, unigram_counts, token_store_splits)
+    return output_paths, token_store_splits, split_sizes
@@ -0,0 +1,497 @@
+"""
+Batch-level samplers for token datasets.
+
+The default DataLoader path costs `batch_size` Python `__getitem__` calls plus a
+`default_collate` stack per step. The sampler here instead draws all `B` start
+offsets of a batch at once and the dataset gathers the `[B, block_size + 1]`
+block with a single fancy-index (see `get_batch` on the token datasets).
+
+For corpora that fit in memory, `DeviceBatchLoader` goes one step further: the
+token buffer is copied to the training device once and batches are gathered
+there, so no DataLoader, worker, pinning or per-step host-to-device copy is involved.
+"""
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Sized, Tuple, Union
+
+import numpy as np
+
+import torch
+from torch.utils.data import DataLoader, Dataset, Sampler
+
+logger = logging.getLogger(__name__)
+
+SAMPLER_RANDOM_OFFSETS = "random_offsets"
+
+
+class RandomOffsetBatchSampler(Sampler[torch.Tensor]):
+    """
+    Yields one LongTensor of `batch_size` random token offsets per batch.
+
+    Offsets are drawn uniformly from every valid window start, so any position of
+    the corpus can begin a block. Each batch is drawn from its own generator seeded
+    with (seed, epoch, batch index), which makes runs reproducible and lets a
+    restored position start at its batch without replaying the earlier draws. The
+    epoch counter advances automatically after each completed pass (or via `set_epoch`).
+    """
+
+    def __init__(
+        self,
+        num_tokens: int,
+        block_size: int,
+        batch_size: int,
+        num_batches: Optional[int] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            num_tokens (int): Number of tokens in the underlying token buffer.
+            block_size (int): Sequence length of each sample (targets need one extra token).
+            batch_size (int): Number of offsets per batch.
+            num_batches (Optional[int]): Batches per epoch. Defaults to the number of
+                                         non-overlapping blocks divided by batch_size.
+            seed (Optional[int]): Base seed. Defaults to `torch.initial_seed()`, which is
+                                  deterministic once the run seed has been set.
+        """
+        if num_tokens < block_size + 1:
+            raise ValueError(f"Need at least block_size+1 ({block_size + 1}) tokens, got {num_tokens}.")
+        if batch_size <= 0:
+            raise ValueError(f"batch_size must be positive, got {batch_size}.")
+        self.num_tokens = num_tokens
+        self.block_size = block_size
+        self.batch_size = batch_size
+        self.max_start = num_tokens - block_size - 1 # Inclusive upper bound for a start offset
+        if num_batches is None:
+            num_batches = max(1, ((num_tokens - 1) // block_size) // batch_size)
+        self.num_batches = num_batches
+        self.seed = int(seed) if seed is not None else torch.initial_seed()
+        self.epoch = 0
+        self.position = 0 # Batch at which the next pass starts (set when resuming)
+        self._iter_epoch = 0
+        self._iter_start = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        """Sets the epoch used to derive the RNG seed for the next pass."""
+        self.epoch = epoch
+
+    def state_dict(self, batches_consumed: Optional[int] = None, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Returns the sampler position. Pass `batches_consumed` (batches the training
+        loop has used in the current pass) while iterating, since DataLoader
+        workers run ahead of the loop. `batch_size` is unused (one item = one batch).
+        """
+        return _sampler_state(self, batches_consumed, self.num_batches)
+
+    def load_state_dict(self, state: Dict[str, int]) -> None:
+        self.seed, self.epoch, self.position = int(state['seed']), int(state['epoch']), int(state['position'])
+
+    def __len__(self) -> int:
+        return self.num_batches - self.position
+
+    def _draw_batch(self, batch_index: int) -> torch.Tensor:
+        rng = np.random.default_rng([self.seed, self.epoch, batch_index])
+        return torch.from_numpy(rng.integers(0, self.max_start + 1, size=self.batch_size, dtype=np.int64))
+
+    def __iter__(self) -> Iterator[torch.Tensor]:
+        self._iter_epoch, self._iter_start = self.epoch, self.position
+        for batch_index in range(self.position, self.num_batches):
+            yield self._draw_batch(batch_index)
+        self.epoch += 1
+        self.position = 0
+
+
+class ResumableRandomSampler(Sampler[int]):
+    """
+    Shuffling sampler whose position can be saved and restored.
+
+    Each epoch is a permutation drawn from `seed + epoch`. After `load_state_dict`
+    the next pass regenerates that permutation and starts at the saved position,
+    so a resumed run continues with the next unseen batch instead of loading and
+    discarding the batches already trained on.
+    """
+
+    def __init__(self, data_source: Sized, seed: Optional[int] = None):
+        """
+        Args:
+            data_source: Dataset to sample indices for.
+            seed: Base seed. Defaults to `torch.initial_seed()`.
+        """
+        self.data_source = data_source
+        self.seed = int(seed) if seed is not None else torch.initial_seed()
+        self.epoch = 0
+        self.position = 0 # Index into the permutation at which the next pass starts
+        self._iter_epoch = 0
+        self._iter_start = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def state_dict(self, batches_consumed: Optional[int] = None, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Returns the sampler position. While iterating, pass the number of batches
+        the training loop has consumed and the loader batch size, since DataLoader
+        workers fetch indices ahead of the loop.
+        """
+        samples_consumed = None if batches_consumed is None else batches_consumed * (batch_size or 1)
+        return _sampler_state(self, samples_consumed, len(self.data_source))
+
+    def load_state_dict(self, state: Dict[str, int]) -> None:
+        self.seed, self.epoch, self.position = int(state['seed']), int(state['epoch']), int(state['position'])
+
+    def __len__(self) -> int:
+        return len(self.data_source) - self.position
+
+    def __iter__(self) -> Iterator[int]:
+        self._iter_epoch, self._iter_start = self.epoch, self.position
+        generator = torch.Generator()
+        generator.manual_seed(self.seed + self.epoch)
+        permutation = torch.randperm(len(self.data_source), generator=generator)
+        yield from permutation[self.position:].tolist()
+        self.epoch += 1
+        self.position = 0
+
+
+class WeightedMixtureSampler(Sampler[int]):
+    """
+    Draws global indices of a `MixtureDataset` at fixed per-source ratios.
+
+    For every sample a source is chosen with probability `weights[s]` and a
+    uniformly random window of that source is returned as `offsets[s] + local`.
+    Draws are generated in chunks seeded from (seed, epoch, chunk), so a
+    restored position seeks directly to its chunk. The state_dict protocol
+    matches ResumableRandomSampler.
+    """
+
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(
+        self,
+        source_lengths: Sequence[int],
+        weights: Sequence[float],
+        num_samples: Optional[int] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            source_lengths: Number of windows in each source.
+            weights: Sampling probability per source (normalized here).
+            num_samples: Samples per epoch. Defaults to the total number of windows.
+            seed: Base seed. Defaults to `torch.initial_seed()`.
+        """
+        if len(source_lengths) != len(weights) or not source_lengths:
+            raise ValueError(f"Need one weight per source, got {len(weights)} weights for {len(source_lengths)} sources.")
+        self.source_lengths = np.asarray(source_lengths, dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(self.source_lengths)[:-1]])
+        probabilities = np.asarray(weights, dtype=np.float64)
+        self.weights = probabilities / probabilities.sum()
+        self.num_samples = int(num_samples) if num_samples is not None else int(self.source_lengths.sum())
+        self.seed = int(seed) if seed is not None else torch.initial_seed()
+        self.epoch = 0
+        self.position = 0
+        self._iter_epoch = 0
+        self._iter_start = 0
+
+    @classmethod
+    def from_dataset(cls, dataset: Any, num_samples: Optional[int] = None, seed: Optional[int] = None) -> "WeightedMixtureSampler":
+        """Builds the sampler for a MixtureDataset (uses its `source_lengths` and `weights`)."""
+        return cls(dataset.source_lengths, dataset.weights, num_samples=num_samples, seed=seed)
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def state_dict(self, batches_consumed: Optional[int] = None, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """See ResumableRandomSampler.state_dict."""
+        samples_consumed = None if batches_consumed is None else batches_consumed * (batch_size or 1)
+        return _sampler_state(self, samples_consumed, self.num_samples)
+
+    def load_state_dict(self, state: Dict[str, int]) -> None:
+        self.seed, self.epoch, self.position = int(state['seed']), int(state['epoch']), int(state['position'])
+
+    def _draw_chunk(self, chunk: int) -> np.ndarray:
+        start = chunk * self.CHUNK_SIZE
+        size = min(self.CHUNK_SIZE, self.num_samples - start)
+        rng = np.random.default_rng([self.seed, self.epoch, chunk])
+        sources = rng.choice(len(self.weights), size=size, p=self.weights)
+        local = (rng.random(size) * self.source_lengths[sources]).astype(np.int64)
+        return self.offsets[sources] + local # type: ignore[no-any-return]
+
+    def __len__(self) -> int:
+        return self.num_samples - self.position
+
+    def __iter__(self) -> Iterator[int]:
+        self._iter_epoch, self._iter_start = self.epoch, self.position
+        first_chunk, skip = divmod(self.position, self.CHUNK_SIZE)
+        for chunk in range(first_chunk, (self.num_samples + self.CHUNK_SIZE - 1) // self.CHUNK_SIZE):
+            indices = self._draw_chunk(chunk)
+            yield from indices[skip if chunk == first_chunk else 0:].tolist()
+        self.epoch += 1
+        self.position = 0
+
+
+class TokenBudgetBatchSampler(Sampler[List[int]]):
+    """
+    Batches variable-length samples by total tokens instead of sample count.
+
+    Each epoch the indices are shuffled and cut into pools of `pool_size`
+    samples. Each pool is sorted by length and split greedily so that
+    `len(batch) * longest_sample <= max_tokens`, i.e. the padded batch stays
+    within the token budget. The batch order is then shuffled. Samples of
+    similar length end up together, so padding stays small while batches remain
+    random across the corpus. Resumable with the same state_dict protocol as the
+    other samplers; positions count batches.
+    """
+
+    def __init__(
+        self,
+        lengths: Sequence[int],
+        max_tokens: int,
+        pool_size: int = 4096,
+        max_batch_size: Optional[int] = None,
+        shuffle: bool = True,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            lengths: Length (tokens after padding is applied) of every sample.
+            max_tokens: Token budget per padded batch. Longer samples form singleton batches.
+            pool_size: Number of samples sorted together; larger pools pad less but are less random.
+            max_batch_size: Optional cap on samples per batch.
+            shuffle: Shuffle samples and batches each epoch (False keeps dataset order within pools).
+            seed: Base seed. Defaults to `torch.initial_seed()`.
+        """
+        if max_tokens <= 0:
+            raise ValueError(f"max_tokens must be positive, got {max_tokens}.")
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.max_tokens = max_tokens
+        self.pool_size = pool_size
+        self.max_batch_size = max_batch_size
+        self.shuffle = shuffle
+        self.seed = int(seed) if seed is not None else torch.initial_seed()
+        self.epoch = 0
+        self.position = 0
+        self._iter_epoch = 0
+        self._iter_start = 0
+        self._iter_length = 0
+        self._plan_epoch: Optional[int] = None
+        self._plan: List[List[int]] = []
+
+    def _batches(self) -> List[List[int]]:
+        """Builds (and caches) the batch plan of the current epoch."""
+        if self._plan_epoch == self.epoch:
+            return self._plan
+        rng = np.random.default_rng([self.seed, self.epoch])
+        order = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+        batches: List[List[int]] = []
+        for pool_start in range(0, len(order), self.pool_size):
+            pool = order[pool_start:pool_start + self.pool_size]
+            pool = pool[np.argsort(self.lengths[pool], kind='stable')]
+            batch: List[int] = []
+            longest = 0
+            for index in pool.tolist():
+                longest_with = max(longest, int(self.lengths[index]))
+                full = self.max_batch_size is not None and len(batch) >= self.max_batch_size
+                if batch and (longest_with * (len(batch) + 1) > self.max_tokens or full):
+                    batches.append(batch)
+                    batch, longest_with = [], int(self.lengths[index])
+                batch.append(index)
+                longest = longest_with
+            if batch:
+                batches.append(batch)
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        self._plan_epoch, self._plan = self.epoch, batches
+        return batches
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def state_dict(self, batches_consumed: Optional[int] = None, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """See ResumableRandomSampler.state_dict; positions count batches, so batch_size is unused."""
+        return _sampler_state(self, batches_consumed, self._iter_length)
+
+    def load_state_dict(self, state: Dict[str, int]) -> None:
+        self.seed, self.epoch, self.position = int(state['seed']), int(state['epoch']), int(state['position'])
+        self._plan_epoch = None
+
+    def __len__(self) -> int:
+        return len(self._batches()) - self.position
+
+    def __iter__(self) -> Iterator[List[int]]:
+        self._iter_epoch, self._iter_start = self.epoch, self.position
+        batches = self._batches()
+        self._iter_length = len(batches) # Batch count varies per epoch; keep the one being iterated
+        yield from batches[self.position:]
+        self.epoch += 1
+        self.position = 0
+
+
+def get_resumable_sampler(loader: Any) -> Optional[Any]:
+    """Returns the loader's batch sampler or sampler if it supports state_dict/load_state_dict."""
+    for name in ('batch_sampler', 'sampler'):
+        sampler = getattr(loader, name, None)
+        if callable(getattr(sampler, 'state_dict', None)) and callable(getattr(sampler, 'load_state_dict', None)):
+            return sampler
+    return None
+
+
+def _sampler_state(sampler: Any, consumed: Optional[int], epoch_length: int) -> Dict[str, int]:
+    """Shared state_dict logic: position of the training loop within the current pass."""
+    if consumed is None:
+        return {'seed': sampler.seed, 'epoch': sampler.epoch, 'position': sampler.position}
+    epoch, position = sampler._iter_epoch, sampler._iter_start + consumed
+    if position >= epoch_length:
+        epoch, position = epoch + 1, 0
+    return {'seed': sampler.seed, 'epoch': epoch, 'position': position}
+
+
+class OffsetBatchDataset(Dataset):
+    """
+    Adapts a token dataset so a DataLoader with `batch_size=None` can fetch whole
+    batches: each "index" is a tensor of start offsets passed to `get_batch`.
+    """
+
+    def __init__(self, dataset: Any):
+        if not callable(getattr(dataset, 'get_batch', None)):
+            raise TypeError(f"{type(dataset).__name__} does not implement get_batch(starts).")
+        self.dataset = dataset
+
+    def __len__(self) -> int:
+        return len(self.dataset)
+
+    def __getitem__(self, starts: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        return self.dataset.get_batch(starts) # type: ignore[no-any-return]
+
+
+def create_random_offset_dataloader(
+    dataset: Any,
+    batch_size: int,
+    block_size: Optional[int] = None,
+    num_batches: Optional[int] = None,
+    seed: Optional[int] = None,
+    num_workers: int = 0,
+    pin_memory: bool = False,
+) -> DataLoader:
+    """
+    Builds a DataLoader that serves `(x, y)` batches gathered in one vectorized
+    operation per step instead of per-item `__getitem__` + `default_collate`.
+
+    Args:
+        dataset: A token dataset exposing `num_tokens`, `block_size` and `get_batch(starts)`.
+        batch_size: Number of sequences per batch.
+        block_size: Sequence length. Defaults to `dataset.block_size`.
+        num_batches: Batches per epoch (see RandomOffsetBatchSampler).
+        seed: Base seed for the offset generator.
+        num_workers: DataLoader worker processes.
+        pin_memory: Whether to pin gathered batches.
+
+    Returns:
+        DataLoader: Loader with `batch_size=None` whose sampler yields offset tensors.
+    """
+    block_size = block_size if block_size is not None else dataset.block_size
+    sampler = RandomOffsetBatchSampler(
+        num_tokens=dataset.num_tokens,
+        block_size=block_size,
+        batch_size=batch_size,
+        num_batches=num_batches,
+        seed=seed,
+    )
+    logger.info(
+        f"Using random-offset batch sampler for {type(dataset).__name__} "
+        f"(batch={batch_size}, block={block_size}, batches/epoch={len(sampler)}, seed={sampler.seed})."
+    )
+    # batch_size=None disables auto-collation: each sampled offset tensor is one batch
+    return DataLoader(
+        OffsetBatchDataset(dataset),
+        batch_size=None,
+        sampler=sampler,
+        num_workers=num_workers,
+        pin_memory=pin_memory,
+    )
+
+
+class DeviceBatchLoader:
+    """
+    DataLoader replacement that keeps the whole token buffer on `device`.
+
+    The tokens are copied once at construction and every batch is gathered on
+    the device from random offsets, so the `.to(device)` calls in the training
+    loop are no-ops. Offsets come from a
+    `RandomOffsetBatchSampler`, so the batch order is identical to the
+    `random_offsets` DataLoader path for the same seed. Works on CPU as well,
+    where it simply skips the DataLoader machinery.
+
+    The buffer is stored as int32, half the device memory of int64. Embedding
+    lookups and `cross_entropy` targets need int64, so each gathered batch is
+    cast once with `.long()` before it is yielded; only the [batch_size,
+    block_size + 1] batch is ever int64, and callers always receive LongTensors.
+    """
+
+    def __init__(
+        self,
+        dataset: Any,
+        batch_size: int,
+        device: Union[str, torch.device],
+        block_size: Optional[int] = None,
+        num_batches: Optional[int] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            dataset: A token dataset exposing `token_ids`, `num_tokens` and `block_size`.
+            batch_size: Number of sequences per batch.
+            device: Device that holds the tokens and receives the batches.
+            block_size: Sequence length. Defaults to `dataset.block_size`.
+            num_batches: Batches per epoch (see RandomOffsetBatchSampler).
+            seed: Base seed for the offset generator.
+        """
+        if not hasattr(dataset, 'token_ids'):
+            raise TypeError(f"{type(dataset).__name__} has no in-memory token_ids; it cannot be made device resident.")
+        self.dataset = dataset # Kept for callbacks that inspect loader.dataset (decode, vocab)
+        self.batch_size = batch_size
+        self.device = torch.device(device)
+        self.block_size = block_size if block_size is not None else dataset.block_size
+        self.sampler = RandomOffsetBatchSampler(
+            num_tokens=dataset.num_tokens,
+            block_size=self.block_size,
+            batch_size=batch_size,
+            num_batches=num_batches,
+            seed=seed,
+        )
+        self.tokens = self._to_device_tokens(dataset.token_ids, dataset.num_tokens)
+        self._block_offsets = torch.arange(self.block_size + 1, device=self.device)
+        logger.info(
+            f"Moved {self.tokens.numel():,} tokens of {type(dataset).__name__} to {self.device} "
+            f"({self.tokens.numel() * self.tokens.element_size() / 2**20:.1f} MiB); "
+            f"batch={batch_size}, block={self.block_size}, batches/epoch={len(self.sampler)}, seed={self.sampler.seed}."
+        )
+
+    def _to_device_tokens(self, token_ids: Any, num_tokens: int) -> torch.Tensor:
+        """Materializes the token buffer (tensor, array or memmap) as an int32 tensor on the device."""
+        if isinstance(token_ids, torch.Tensor):
+            tokens = token_ids[:num_tokens]
+        else:
+            tokens = torch.from_numpy(np.asarray(token_ids[:num_tokens]).astype(np.int32))
+        return tokens.to(device=self.device, dtype=torch.int32).contiguous()
+
+    def set_epoch(self, epoch: int) -> None:
+        self.sampler.set_epoch(epoch)
+
+    def __len__(self) -> int:
+        return len(self.sampler)
+
+    def __iter__(self) -> Iterator[Tuple[torch.Tensor, torch.Tensor]]:
+        for starts in self.sampler:
+            index = starts.to(self.device, non_blocking=True).unsqueeze(1) + self._block_offsets
+            blocks = self.tokens[index].long() # [B, block_size + 1]; one int32 -> int64 cast per batch
+            yield blocks[:, :-1], blocks[:, 1:]
+
+
+def normalize_sampler_config(sampler_cfg: Any) -> Optional[Dict[str, Any]]:
+    """Accepts `sampler: random_offsets` or `sampler: {type: random_offsets, seed: ...}`."""
+    if not sampler_cfg:
+        return None
+    if isinstance(sampler_cfg, str):
+        return {"type": sampler_cfg}
+    sampler_dict = dict(sampler_cfg)
+    if "type" not in sampler_dict:
+        raise ValueError(f"Sampler config must define 'type', got: {sampler_dict}")
+    return sampler_dict
@@ -0,0 +1,249 @@
+"""
+Content-addressed cache of tokenized text.
+
+Entries are raw token files (same layout as the `.bin` token store) named by a
+key that hashes everything that determines the encoded output: the source files
+(path + size + mtime, or their full contents), the tokenizer class, its special
+token configuration and its vocabulary/model file, and the storage dtype. A
+second run over the same corpus with the same tokenizer memory-maps the cached
+file instead of tokenizing again.
+
+Each entry is `<key>.bin` plus a small `<key>.json` sidecar. The sidecar's mtime
+records the last access, and the cache is trimmed to `max_bytes` by evicting
+least recently used entries.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .token_store import open_token_file, TOKEN_FILE_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_ENV_VAR = "CRAFT_TOKEN_CACHE_DIR"
+DEFAULT_CACHE_DIR = Path(os.environ.get(CACHE_DIR_ENV_VAR, "~/.cache/craft/tokens")).expanduser()
+CACHE_KEY_VERSION = 1 # Bump to invalidate every existing entry
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def _hash_file(path: Union[str, Path], digest: Any) -> None:
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+
+
+def file_fingerprint(path: Union[str, Path], hash_contents: bool = False) -> str:
+    """
+    Fingerprints a source file. By default uses (absolute path, size, mtime_ns),
+    which is O(1); with `hash_contents=True` hashes the file bytes instead, so
+    the key survives copies and touches but costs one full read.
+    """
+    path = Path(path)
+    if hash_contents:
+        digest = hashlib.sha256()
+        _hash_file(path, digest)
+        return f"sha256:{digest.hexdigest()}"
+    stat = path.stat()
+    return f"stat:{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def tokenizer_fingerprint(tokenizer: Any) -> str:
+    """
+    Hashes the parts of a tokenizer that affect its output: class, special
+    tokens/ids, BOS/EOS flags and the vocabulary (model file bytes for
+    SentencePiece, the serialized HF tokenizer, or the char vocabulary).
+    """
+    digest = hashlib.sha256()
+    tokenizer_class = type(tokenizer)
+    digest.update(f"{tokenizer_class.__module__}.{tokenizer_class.__qualname__}".encode())
+
+    special_attrs = (
+        'pad_token', 'unk_token', 'bos_token', 'eos_token',
+        'pad_id', 'unk_id', 'bos_id', 'eos_id', '_add_bos_token', '_add_eos_token',
+    )
+    specials = {name: getattr(tokenizer, name, None) for name in special_attrs}
+    digest.update(json.dumps(specials, sort_keys=True, default=str).encode())
+
+    model_file = getattr(tokenizer, 'model_file', None)
+    hf_tokenizer = getattr(tokenizer, 'tokenizer', None)
+    if model_file and os.path.isfile(model_file):
+        _hash_file(model_file, digest)
+    elif hf_tokenizer is not None and hasattr(hf_tokenizer, 'to_str'):
+        digest.update(hf_tokenizer.to_str().encode())
+    elif isinstance(getattr(tokenizer, 'char_to_idx', None), dict):
+        digest.update(json.dumps(tokenizer.char_to_idx, sort_keys=True, ensure_ascii=False).encode())
+    elif hasattr(tokenizer, 'get_vocab'):
+        digest.update(json.dumps(tokenizer.get_vocab(), sort_keys=True, ensure_ascii=False, default=str).encode())
+    else:
+        logger.warning(f"Cannot fingerprint the vocabulary of {tokenizer_class.__name__}; keying on vocab size only.")
+        digest.update(str(tokenizer.get_vocab_size()).encode())
+    return digest.hexdigest()
+
+
+class TokenCache:
+    """Directory of memory-mappable token arrays keyed by content hash, with LRU eviction."""
+
+    def __init__(self, cache_dir: Optional[Union[str, Path]] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            cache_dir: Cache directory. Defaults to $CRAFT_TOKEN_CACHE_DIR or ~/.cache/craft/tokens.
+            max_bytes: If set, least recently used entries are evicted after each store
+                       until the cache fits.
+        """
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+
+    # --- Keys --- #
+
+    def make_key(
+        self,
+        file_paths: Sequence[Union[str, Path]],
+        tokenizer: Any,
+        dtype: Union[str, np.dtype],
+        hash_contents: bool = False,
+    ) -> str:
+        """Builds the cache key for encoding `file_paths` (in order) with `tokenizer` into `dtype`."""
+        digest = hashlib.sha256()
+        digest.update(f"v{CACHE_KEY_VERSION}:{np.dtype(dtype).name}".encode())
+        for path in file_paths:
+            digest.update(file_fingerprint(path, hash_contents).encode())
+        digest.update(tokenizer_fingerprint(tokenizer).encode())
+        return digest.hexdigest()
+
+    def _paths(self, key: str) -> Dict[str, Path]:
+        return {
+            'data': self.cache_dir / f"{key}{TOKEN_FILE_SUFFIX}",
+            'meta': self.cache_dir / f"{key}.json",
+        }
+
+    # --- Lookup --- #
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the entry metadata (with 'path') on a hit and marks it as recently used."""
+        paths = self._paths(key)
+        if not (paths['data'].exists() and paths['meta'].exists()):
+            return None
+        try:
+            with open(paths['meta'], 'r', encoding='utf-8') as f:
+                entry: Dict[str, Any] = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable token cache entry {key}: {e}")
+            return None
+        os.utime(paths['meta']) # Sidecar mtime = last access for LRU
+        entry['path'] = str(paths['data'])
+        return entry
+
+    def load(self, key: str) -> Optional[np.ndarray]:
+        """Memory-maps the cached tokens for `key`, or returns None on a miss."""
+        entry = self.lookup(key)
+        if entry is None:
+            return None
+        try:
+            token_ids = open_token_file(entry['path'], entry['dtype'], entry.get('length'))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding corrupt token cache entry {key}: {e}")
+            self.remove(key)
+            return None
+        logger.info(f"Token cache hit: {key[:12]} ({len(token_ids):,} tokens)")
+        return token_ids
+
+    # --- Store --- #
+
+    def store_file(
+        self,
+        key: str,
+        token_file: Union[str, Path],
+        dtype: Union[str, np.dtype],
+        length: int,
+        info: Optional[Dict[str, Any]] = None,
+    ) -> Path:
+        """Moves an already written raw token file into the cache (atomic rename) and returns its new path."""
+        paths = self._paths(key)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        os.replace(token_file, paths['data'])
+        entry = {'key': key, 'dtype': np.dtype(dtype).name, 'length': int(length), 'created': time.time(), **(info or {})}
+        tmp_meta = paths['meta'].with_suffix(".json.tmp")
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, indent=4, default=str)
+        os.replace(tmp_meta, paths['meta'])
+        logger.info(f"Stored {length:,} tokens in token cache as {key[:12]}")
+        if self.max_bytes is not None:
+            self.evict(self.max_bytes, keep=key)
+        return paths['data']
+
+    def store_array(
+        self,
+        key: str,
+        token_ids: Any,
+        dtype: Union[str, np.dtype],
+        info: Optional[Dict[str, Any]] = None,
+    ) -> Path:
+        """Writes `token_ids` to the cache under `key` and returns the data path."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        array = np.asarray(token_ids).astype(dtype, copy=False)
+        tmp_path = self.cache_dir / f"{key}{TOKEN_FILE_SUFFIX}.tmp.{os.getpid()}"
+        array.tofile(str(tmp_path))
+        return self.store_file(key, tmp_path, dtype, len(array), info)
+
+    # --- Maintenance --- #
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Lists cache entries with 'key', 'size_bytes' and 'last_access', most recent first."""
+        if not self.cache_dir.is_dir():
+            return []
+        entries = []
+        for meta_path in self.cache_dir.glob("*.json"):
+            data_path = meta_path.with_suffix(TOKEN_FILE_SUFFIX)
+            if not data_path.exists():
+                continue
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                entry = {}
+            entry.update({
+                'key': meta_path.stem,
+                'size_bytes': data_path.stat().st_size,
+                'last_access': meta_path.stat().st_mtime,
+            })
+            entries.append(entry)
+        return sorted(entries, key=lambda e: e['last_access'], reverse=True)
+
+    def total_bytes(self) -> int:
+        return sum(entry['size_bytes'] for entry in self.entries())
+
+    def remove(self, key: str) -> None:
+        for path in self._paths(key).values():
+            if path.exists():
+                path.unlink()
+
+    def evict(self, max_bytes: int, keep: Optional[str] = None) -> List[str]:
+        """Removes least recently used entries until the cache holds at most `max_bytes`."""
+        entries = self.entries()
+        total = sum(entry['size_bytes'] for entry in entries)
+        evicted = []
+        for entry in reversed(entries): # Oldest access first
+            if total <= max_bytes:
+                break
+            if entry['key'] == keep:
+                continue
+            self.remove(entry['key'])
+            total -= entry['size_bytes']
+            evicted.append(entry['key'])
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} token cache entr{'y' if len(evicted) == 1 else 'ies'}; cache now {total:,} bytes.")
+        return evicted
+
+    def clear(self) -> int:
+        """Removes every entry; returns the number removed."""
+        entries = self.entries()
+        for entry in entries:
+            self.remove(entry['key'])
+        return len(entries)
@@ -0,0 +1,301 @@
+"""
+Raw binary token store used by `craft dataset prepare` and the memory-mapped datasets.
+
+Each split is written as a flat `.bin` file of fixed-width unsigned integers (no
+header inside the file). The information needed to open the file again (dtype,
+length, offset in the full token stream) is recorded under the `token_store`
+key of the dataset's `metadata.json`, so readers can `np.memmap` the file in O(1)
+without unpickling or copying the payload.
+
+With `compression` set, splits are written as chunk-compressed `.tkz` files
+instead (see `compressed_store.py`); `open_token_store` opens either kind.
+"""
+import os
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Protocol, Sequence, Union
+
+import numpy as np
+
+from .compressed_store import (
+    CompressedTokenArray, write_compressed_token_file, read_compressed_header,
+    COMPRESSED_FILE_SUFFIX, DEFAULT_CHUNK_TOKENS,
+)
+
+logger = logging.getLogger(__name__)
+
+TOKEN_STORE_VERSION = 1
+TOKEN_STORE_FORMAT = "raw"
+TOKEN_FILE_SUFFIX = ".bin"
+DOC_INDEX_SUFFIX = ".docs.npy" # Per-split document start offsets (int64), see preprocessing
+
+
+class TokenArray(Protocol):
+    """
+    Read-only 1-D token sequence returned by `open_token_store`: an `np.memmap`,
+    a `CompressedTokenArray` or a `ShardedTokenArray`. Slices and integer-array
+    indexing return `np.ndarray`s in the storage dtype.
+    """
+
+    @property
+    def dtype(self) -> np.dtype: ...
+
+    def __len__(self) -> int: ...
+
+    def __getitem__(self, key: Any) -> Any: ...
+
+
+def select_token_dtype(vocab_size: int) -> np.dtype:
+    """Returns the smallest unsigned dtype that can hold every id in the vocabulary."""
+    if vocab_size <= np.iinfo(np.uint8).max + 1:
+        return np.dtype(np.uint8) # Byte-level and small character vocabularies
+    if vocab_size <= np.iinfo(np.uint16).max + 1:
+        return np.dtype(np.uint16)
+    if vocab_size <= np.iinfo(np.uint32).max + 1:
+        return np.dtype(np.uint32)
+    raise ValueError(f"Vocabulary size {vocab_size} is too large for the token store.")
+
+
+def write_token_file(
+    path: Union[str, Path],
+    token_ids: np.ndarray,
+    dtype: Union[str, np.dtype],
+    offset: int = 0,
+    compression: Optional[str] = None,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+) -> Dict[str, Any]:
+    """
+    Writes token ids to a raw binary file and returns its header entry.
+
+    Args:
+        path: Destination `.bin` file (`.tkz` when compressed).
+        token_ids: 1-D array (or sequence) of token ids.
+        dtype: Storage dtype (e.g. 'uint16').
+        offset: Position of the first token of this file in the full token stream.
+        compression: Codec ('zstd', 'lz4', 'zlib' or 'auto') to write a chunk-compressed
+                     file instead of a raw one.
+        chunk_tokens: Tokens per compressed chunk.
+
+    Returns:
+        Dict[str, Any]: Header entry with 'file', 'length' and 'offset' keys
+                        (plus the codec fields for compressed files).
+    """
+    if compression:
+        return write_compressed_token_file(path, token_ids, dtype, offset=offset, codec=compression, chunk_tokens=chunk_tokens)
+    path = Path(path)
+    dtype = np.dtype(dtype)
+    array = np.asarray(token_ids)
+    if array.dtype != dtype:
+        array = array.astype(dtype)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    array.tofile(str(path))
+    logger.info(f"Wrote {len(array):,} tokens ({dtype.name}) to {path}")
+    return {"file": path.name, "length": int(len(array)), "offset": int(offset)}
+
+
+def build_token_store_header(dtype: Union[str, np.dtype], splits: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Builds the `token_store` block stored in metadata.json."""
+    return {
+        "format": TOKEN_STORE_FORMAT,
+        "version": TOKEN_STORE_VERSION,
+        "dtype": np.dtype(dtype).name,
+        "splits": splits,
+    }
+
+
+def token_file_suffix(compression: Optional[str] = None) -> str:
+    """File suffix of split files written with the given compression setting."""
+    return COMPRESSED_FILE_SUFFIX if compression else TOKEN_FILE_SUFFIX
+
+
+def shard_file_name(split_name: str, shard_index: int, suffix: str = TOKEN_FILE_SUFFIX) -> str:
+    """File name of shard `shard_index` of a split (e.g. 'train-00003.bin')."""
+    return f"{split_name}-{shard_index:05d}{suffix}"
+
+
+def write_token_shards(
+    output_dir: Union[str, Path],
+    split_name: str,
+    token_ids: np.ndarray,
+    dtype: Union[str, np.dtype],
+    shard_size: int,
+    offset: int = 0,
+    compression: Optional[str] = None,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+) -> Dict[str, Any]:
+    """
+    Writes a split as consecutive `.bin` (or compressed `.tkz`) shards of at most `shard_size` tokens.
+
+    Returns:
+        Dict[str, Any]: Split entry with the total 'length' and 'offset' and a
+                        'shards' list holding one `write_token_file` entry per shard.
+    """
+    if shard_size <= 0:
+        raise ValueError(f"shard_size must be positive, got {shard_size}.")
+    output_dir = Path(output_dir)
+    array = np.asarray(token_ids)
+    shards = []
+    for shard_index, shard_start in enumerate(range(0, len(array), shard_size)):
+        shard_path = output_dir / shard_file_name(split_name, shard_index, token_file_suffix(compression))
+        shard = array[shard_start : shard_start + shard_size]
+        shards.append(write_token_file(
+            shard_path, shard, dtype, offset=offset + shard_start, compression=compression, chunk_tokens=chunk_tokens,
+        ))
+    return {"length": int(len(array)), "offset": int(offset), "shards": shards}
+
+
+def find_split_entry(header: Dict[str, Any], file_name: str) -> Optional[Dict[str, Any]]:
+    """Finds the split (or shard) entry in a token store header that describes `file_name`."""
+    for entry in header.get("splits", {}).values():
+        if entry.get("file") == file_name:
+            return dict(entry)
+        for shard_entry in entry.get("shards", []):
+            if shard_entry.get("file") == file_name:
+                return dict(shard_entry)
+    return None
+
+
+def open_token_file(
+    path: Union[str, Path],
+    dtype: Union[str, np.dtype],
+    length: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Opens a raw token file read-only as a memory map in its native dtype.
+
+    Args:
+        path: Path to the `.bin` file.
+        dtype: Storage dtype recorded in the header.
+        length: Expected number of tokens. Validated against the file size if given.
+
+    Returns:
+        np.ndarray: A read-only `np.memmap` (or an empty array for empty files).
+    """
+    path = Path(path)
+    dtype = np.dtype(dtype)
+    file_size = os.path.getsize(path)
+    if file_size % dtype.itemsize != 0:
+        raise ValueError(f"Token file {path} has size {file_size}, not a multiple of {dtype.name} itemsize.")
+    num_tokens = file_size // dtype.itemsize
+    if length is not None and length != num_tokens:
+        raise ValueError(f"Token file {path} holds {num_tokens} tokens but the header records {length}.")
+    if num_tokens == 0:
+        # np.memmap refuses to map empty files
+        return np.empty((0,), dtype=dtype)
+    return np.memmap(str(path), dtype=dtype, mode="r", shape=(num_tokens,))
+
+
+def is_compressed_token_file(path: Union[str, Path]) -> bool:
+    return Path(path).suffix == COMPRESSED_FILE_SUFFIX
+
+
+def open_token_store(
+    path: Union[str, Path],
+    dtype: Union[str, np.dtype],
+    length: Optional[int] = None,
+) -> TokenArray:
+    """Opens a raw `.bin` file as a memory map, or a `.tkz` file as a `CompressedTokenArray`."""
+    if is_compressed_token_file(path):
+        return CompressedTokenArray(path, dtype, length)
+    return open_token_file(path, dtype, length)
+
+
+def token_file_length(path: Union[str, Path], dtype: Union[str, np.dtype]) -> int:
+    """Number of tokens in a raw or compressed token file, without reading its payload."""
+    if is_compressed_token_file(path):
+        return int(read_compressed_header(path)["length"])
+    dtype = np.dtype(dtype)
+    file_size = os.path.getsize(path)
+    if file_size % dtype.itemsize != 0:
+        raise ValueError(f"Token file {path} has size {file_size}, not a multiple of {dtype.name} itemsize.")
+    return file_size // dtype.itemsize
+
+
+class ShardedTokenArray:
+    """
+    Read-only view of several raw token files as one contiguous 1-D array.
+
+    A cumulative offset index (`offsets[i]` = global position of the first token
+    of shard i) is built from the file sizes at construction time; lookups use
+    `np.searchsorted` on it. Shards are memory-mapped lazily on first access, so
+    opening a corpus of thousands of shards costs one `stat` per file (one header
+    read for compressed `.tkz` shards, which are opened as `CompressedTokenArray`).
+
+    Supports `len()`, contiguous slices (which may span shard boundaries) and
+    integer-array indexing, which is enough for the token datasets.
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[Union[str, Path]],
+        dtype: Union[str, np.dtype],
+        lengths: Optional[Sequence[Optional[int]]] = None,
+    ):
+        """
+        Args:
+            paths: Shard files in global order.
+            dtype: Storage dtype shared by all shards.
+            lengths: Optional expected token count per shard (validated on open).
+        """
+        self.paths = [Path(p) for p in paths]
+        self.dtype = np.dtype(dtype)
+        self._expected_lengths = list(lengths) if lengths is not None else [None] * len(self.paths)
+        sizes = [token_file_length(path, self.dtype) for path in self.paths]
+        self.offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=self.offsets[1:])
+        self._maps: List[Optional[TokenArray]] = [None] * len(self.paths)
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Never pickle open memory maps (that would copy their contents); workers reopen lazily
+        state = self.__dict__.copy()
+        state["_maps"] = [None] * len(self.paths)
+        return state
+
+    def _shard(self, shard_index: int) -> TokenArray:
+        shard = self._maps[shard_index]
+        if shard is None:
+            shard = open_token_store(self.paths[shard_index], self.dtype, self._expected_lengths[shard_index])
+            self._maps[shard_index] = shard
+        return shard
+
+    def _read_span(self, start: int, stop: int) -> np.ndarray:
+        """Copies tokens [start, stop) into one array, crossing shard boundaries as needed."""
+        if stop <= start:
+            return np.empty((0,), dtype=self.dtype)
+        shard_index = int(np.searchsorted(self.offsets, start, side="right")) - 1
+        pieces = []
+        position = start
+        while position < stop:
+            shard_start = int(self.offsets[shard_index])
+            shard_stop = min(stop, int(self.offsets[shard_index + 1]))
+            if shard_stop > position:
+                pieces.append(self._shard(shard_index)[position - shard_start : shard_stop - shard_start])
+                position = shard_stop
+            shard_index += 1
+        return pieces[0].copy() if len(pieces) == 1 else np.concatenate(pieces)
+
+    def __getitem__(self, key: Any) -> Any:
+        total = len(self)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(total)
+            if step == 1:
+                return self._read_span(start, stop)
+            key = np.arange(start, stop, step)
+        if isinstance(key, (int, np.integer)):
+            position = int(key) + total if key < 0 else int(key)
+            if not 0 <= position < total:
+                raise IndexError(f"Index {key} out of bounds for {total} tokens")
+            return self._read_span(position, position + 1)[0]
+        index = np.asarray(key, dtype=np.int64)
+        flat = index.ravel()
+        if flat.size and (flat.min() < 0 or flat.max() >= total):
+            raise IndexError(f"Index out of bounds for {total} tokens")
+        shard_ids = np.searchsorted(self.offsets, flat, side="right") - 1
+        out = np.empty(flat.shape, dtype=self.dtype)
+        for shard_index in np.unique(shard_ids):
+            mask = shard_ids == shard_index
+            out[mask] = self._shard(int(shard_index))[flat[mask] - self.offsets[shard_index]]
+        return out.reshape(index.shape)
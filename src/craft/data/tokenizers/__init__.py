@@ -1,5 +1,6 @@
 from typing import Dict, Any, Union
 from .base import Tokenizer
+from .incremental import IncrementalDecoder
 from .char import CharTokenizer
 from .subword import SubwordTokenizer
 from .sentencepiece import SentencePieceTokenizer
@@ -10,6 +11,7 @@ logger = logging.getLogger(__name__) # Ensure logger is initialized
 # Define public interface
 __all__ = [
     "Tokenizer",
+    "IncrementalDecoder",
     "CharTokenizer",
     "SubwordTokenizer",
     "SentencePieceTokenizer",
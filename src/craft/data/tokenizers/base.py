@@ -1,6 +1,78 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import Dict, Any, Callable, List, Optional, Sequence, TypeVar, cast
 import logging
+import os
+
+import numpy as np
+
+from .incremental import IncrementalDecoder
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+
+def resolve_num_threads(num_threads: Optional[int] = None) -> int:
+    """Thread count for batch encode/decode: `num_threads` if set, else every core."""
+    if num_threads is not None and num_threads > 0:
+        return num_threads
+    return os.cpu_count() or 1
+
+
+def map_in_threads(fn: Callable[[_T], _R], items: Sequence[_T], num_threads: Optional[int] = None) -> List[_R]:
+    """
+    Ordered `[fn(item) for item in items]` over a thread pool. Threads only overlap
+    where `fn` releases the GIL (native tokenizer libraries); small batches run inline.
+    """
+    workers = min(resolve_num_threads(num_threads), len(items))
+    if workers <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, items))
+
+
+def apply_special_ids(
+    batch: Sequence[Sequence[int]],
+    bos_id: Optional[int],
+    eos_id: Optional[int],
+    add: bool = True,
+) -> List[List[int]]:
+    """
+    Adds (`add=True`) or strips (`add=False`) a leading `bos_id` and a trailing
+    `eos_id` on every sequence of a batch. Works on the flattened batch with array
+    operations instead of a Python loop per sequence. Sequences that already start
+    with BOS (end with EOS) do not get a second one. A None id is left alone.
+    """
+    lengths = np.fromiter((len(ids) for ids in batch), dtype=np.int64, count=len(batch))
+    flat = np.fromiter(chain.from_iterable(batch), dtype=np.int64, count=int(lengths.sum()))
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    nonempty = lengths > 0
+    if len(flat):
+        first = np.where(nonempty, flat[np.minimum(starts, len(flat) - 1)], -1)
+        last = np.where(nonempty, flat[np.maximum(ends - 1, 0)], -1)
+    else:
+        first = last = np.full(len(batch), -1, dtype=np.int64)
+    if add:
+        need_bos = (first != bos_id) if bos_id is not None else np.zeros(len(batch), dtype=bool)
+        need_eos = (last != eos_id) if eos_id is not None else np.zeros(len(batch), dtype=bool)
+        new_lengths = lengths + need_bos + need_eos
+        new_starts = np.cumsum(new_lengths) - new_lengths
+        out = np.empty(int(new_lengths.sum()), dtype=np.int64)
+        # Each original token moves by its sequence's new start (plus one if BOS is inserted)
+        out[np.arange(len(flat)) + np.repeat(new_starts + need_bos - starts, lengths)] = flat
+        out[new_starts[need_bos]] = bos_id if bos_id is not None else 0
+        out[(new_starts + new_lengths - 1)[need_eos]] = eos_id if eos_id is not None else 0
+    else:
+        has_bos = nonempty & (first == bos_id) if bos_id is not None else np.zeros(len(batch), dtype=bool)
+        has_eos = (lengths - has_bos > 0) & (last == eos_id) if eos_id is not None else np.zeros(len(batch), dtype=bool)
+        keep = np.ones(len(flat), dtype=bool)
+        keep[starts[has_bos]] = False
+        keep[(ends - 1)[has_eos]] = False
+        new_lengths = lengths - has_bos - has_eos
+        out = flat[keep]
+    return [row.tolist() for row in np.split(out, np.cumsum(new_lengths)[:-1])] if len(batch) else []
 
 class Tokenizer(ABC):
     def __init__(
@@ -59,11 +131,32 @@ class Tokenizer(ABC):
         """Encode text to token IDs."""
         pass
     
+    def encode_array(self, text: str, dtype: Any = np.int64) -> np.ndarray:
+        """Encode text to a NumPy array of token IDs. Tokenizers with a vectorized path override this."""
+        return np.asarray(self.encode(text), dtype=dtype)
+
+    def batch_encode(self, texts: Sequence[str], num_threads: Optional[int] = None) -> List[List[int]]:
+        """
+        Encode several texts. The default maps `encode` over a thread pool of
+        `num_threads` (default: every core); tokenizers with a native batch path override this.
+        """
+        return map_in_threads(self.encode, texts, num_threads)
+
     @abstractmethod
     def decode(self, ids: List[int]) -> str:
         """Decode token IDs to text."""
         pass
+
+    def batch_decode(self, batch: Sequence[Sequence[int]], num_threads: Optional[int] = None) -> List[str]:
+        """Decode several ID sequences (lists, or the rows of a 2-D array/tensor), like `batch_encode`."""
+        if hasattr(batch, 'tolist'): # np.ndarray / torch.Tensor
+            batch = batch.tolist()
+        return map_in_threads(self.decode, cast(List[List[int]], batch), num_threads)
     
+    def incremental_decoder(self, **decode_kwargs: Any) -> IncrementalDecoder:
+        """Streaming decoder emitting the new text of each generated id (see `incremental.py`)."""
+        return IncrementalDecoder(self, **decode_kwargs)
+
     @abstractmethod
     def get_vocab_size(self) -> int:
         """Get the vocabulary size."""
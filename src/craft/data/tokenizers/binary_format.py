@@ -0,0 +1,191 @@
+"""
+Compact binary tokenizer file (`tokenizer.bin`), written by `save()` next to the JSON files.
+
+Parsing a JSON vocabulary (or asking SentencePiece for every piece) costs time
+proportional to the vocabulary on every start. This file holds the same
+vocabulary as flat arrays that are memory-mapped instead of parsed. Layout:
+
+    magic (8 bytes) | header length (uint32) | JSON header | padding to 8 bytes |
+    piece offsets (uint32[vocab_size + 1]) | ids sorted by piece (uint32[vocab_size]) |
+    UTF-8 piece bytes
+
+The header holds the version, tokenizer type, config and special tokens. Piece
+`i` is `blob[offsets[i]:offsets[i + 1]]`, and piece -> id is a binary search
+over the sorted ids. `TokenizerTable` only reads the header when opened; the
+arrays are paged in by the lookups that touch them. The JSON files remain the
+human-readable export, and loaders fall back to them when this file is missing
+or older than they are.
+"""
+import json
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BINARY_FILE_NAME = "tokenizer.bin"
+BINARY_MAGIC = b"CRAFTTOK"
+BINARY_VERSION = 1
+
+_PREAMBLE = struct.Struct("<8sI") # magic, header length
+_ALIGNMENT = 8
+_INDEX_DTYPE = np.dtype("<u4")
+
+
+def write_tokenizer_binary(
+    path: Union[str, Path],
+    vocab: Mapping[int, str],
+    tokenizer_type: str,
+    config: Optional[Dict[str, Any]] = None,
+    special_tokens: Optional[Dict[str, Any]] = None,
+) -> Path:
+    """
+    Writes a `tokenizer.bin` file.
+
+    Args:
+        path: Destination file (or directory, in which case `tokenizer.bin` is written into it).
+        vocab: id -> piece mapping; ids must be exactly 0..len(vocab)-1.
+        tokenizer_type: Stored in the header (e.g. 'char', 'sentencepiece').
+        config: JSON-serializable tokenizer config stored in the header.
+        special_tokens: JSON-serializable special token names/ids stored in the header.
+
+    Returns:
+        Path: The written file.
+
+    Raises:
+        ValueError: If the ids are not contiguous from 0 or two ids share a piece.
+    """
+    path = Path(path)
+    if path.is_dir():
+        path = path / BINARY_FILE_NAME
+    vocab_size = len(vocab)
+    if sorted(vocab) != list(range(vocab_size)):
+        raise ValueError(f"Tokenizer ids must be contiguous from 0 to write {path}; got {vocab_size} ids up to {max(vocab, default=-1)}.")
+    encoded = [vocab[i].encode("utf-8") for i in range(vocab_size)]
+    if len(set(encoded)) != vocab_size:
+        raise ValueError(f"Tokenizer vocabulary has duplicate pieces; cannot write {path}.")
+
+    offsets = np.zeros(vocab_size + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(piece) for piece in encoded])
+    if offsets[-1] > np.iinfo(_INDEX_DTYPE).max:
+        raise ValueError(f"Tokenizer vocabulary is too large ({offsets[-1]} bytes) for {path}.")
+    sorted_ids = np.array(sorted(range(vocab_size), key=encoded.__getitem__), dtype=_INDEX_DTYPE)
+    header = json.dumps({
+        "version": BINARY_VERSION, "tokenizer_type": tokenizer_type, "vocab_size": vocab_size,
+        "blob_bytes": int(offsets[-1]), "config": config or {}, "special_tokens": special_tokens or {},
+    }).encode("utf-8")
+    padding = -(_PREAMBLE.size + len(header)) % _ALIGNMENT
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(_PREAMBLE.pack(BINARY_MAGIC, len(header)))
+        f.write(header)
+        f.write(b"\0" * padding)
+        f.write(offsets.astype(_INDEX_DTYPE).tobytes())
+        f.write(sorted_ids.tobytes())
+        f.write(b"".join(encoded))
+    logger.info(f"Wrote binary {tokenizer_type} tokenizer ({vocab_size} pieces) to {path}")
+    return path
+
+
+def read_tokenizer_header(path: Union[str, Path]) -> Dict[str, Any]:
+    """Reads the JSON header of a `tokenizer.bin` file."""
+    return _read_header(path)[0]
+
+
+def _read_header(path: Union[str, Path]) -> Tuple[Dict[str, Any], int]:
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) != _PREAMBLE.size:
+            raise ValueError(f"{path} is too short to be a binary tokenizer file.")
+        magic, header_length = _PREAMBLE.unpack(preamble)
+        if magic != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a binary tokenizer file (bad magic {magic!r}).")
+        header: Dict[str, Any] = json.loads(f.read(header_length).decode("utf-8"))
+    if header.get("version") != BINARY_VERSION:
+        raise ValueError(f"Unsupported binary tokenizer file version {header.get('version')} in {path}.")
+    data_position = _PREAMBLE.size + header_length
+    return header, data_position + (-data_position % _ALIGNMENT)
+
+
+def binary_file_is_fresh(path: Union[str, Path], sources: Sequence[Union[str, Path]]) -> bool:
+    """True if `path` exists and is not older than any existing file in `sources` (e.g. hand-edited JSON)."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    return all(os.stat(source).st_mtime_ns <= mtime for source in sources if os.path.exists(source))
+
+
+class TokenizerTable:
+    """
+    Read-only, memory-mapped id <-> piece tables of a `tokenizer.bin` file.
+
+    Opening reads only the header. `id_to_piece` slices the piece bytes and
+    `piece_to_id` binary-searches the sorted ids, so a lookup touches a few
+    pages instead of building the whole vocabulary as Python objects.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Args:
+            path: Path to a `tokenizer.bin` file (or the directory holding it).
+
+        Raises:
+            ValueError: If the file is not a binary tokenizer file of a supported version.
+        """
+        path = Path(path)
+        self.path = path / BINARY_FILE_NAME if path.is_dir() else path
+        self.header, data_position = _read_header(self.path)
+        self.vocab_size = int(self.header["vocab_size"])
+        self.tokenizer_type: str = self.header.get("tokenizer_type", "")
+        self.config: Dict[str, Any] = self.header.get("config", {})
+        self.special_tokens: Dict[str, Any] = self.header.get("special_tokens", {})
+        index_bytes = _INDEX_DTYPE.itemsize * (2 * self.vocab_size + 1)
+        total_bytes = index_bytes + int(self.header["blob_bytes"])
+        data = np.memmap(self.path, dtype=np.uint8, mode="r", offset=data_position, shape=(total_bytes,))
+        self.offsets = data[: _INDEX_DTYPE.itemsize * (self.vocab_size + 1)].view(_INDEX_DTYPE)
+        self.sorted_ids = data[self.offsets.nbytes : index_bytes].view(_INDEX_DTYPE)
+        self.blob = data[index_bytes:]
+
+    def __len__(self) -> int:
+        return self.vocab_size
+
+    def _piece_bytes(self, token_id: int) -> bytes:
+        return self.blob[int(self.offsets[token_id]) : int(self.offsets[token_id + 1])].tobytes()
+
+    def id_to_piece(self, token_id: int) -> Optional[str]:
+        """Piece of `token_id`, or None if it is out of range."""
+        if not 0 <= token_id < self.vocab_size:
+            return None
+        return self._piece_bytes(token_id).decode("utf-8")
+
+    def piece_to_id(self, piece: str) -> Optional[int]:
+        """Id of `piece`, or None if it is not in the vocabulary."""
+        target = piece.encode("utf-8")
+        low, high = 0, self.vocab_size
+        while low < high:
+            middle = (low + high) // 2
+            if self._piece_bytes(int(self.sorted_ids[middle])) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.vocab_size:
+            token_id = int(self.sorted_ids[low])
+            if self._piece_bytes(token_id) == target:
+                return token_id
+        return None
+
+    def pieces(self) -> List[str]:
+        """All pieces in id order (decodes the whole table)."""
+        blob = self.blob.tobytes()
+        bounds = self.offsets.tolist()
+        return [blob[start:stop].decode("utf-8") for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def vocab(self) -> Dict[str, int]:
+        """piece -> id mapping of the whole table."""
+        return {piece: token_id for token_id, piece in enumerate(self.pieces())}
@@ -1,15 +1,157 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, List, Mapping, Optional, Sequence, Tuple, Union, cast
 import os
 import json
 from collections import defaultdict
 from .base import Tokenizer
+from .binary_format import BINARY_FILE_NAME, TokenizerTable, binary_file_is_fresh, write_tokenizer_binary
+from .incremental import CharIncrementalDecoder
 import pickle
 from pathlib import Path
 import logging
 
+import numpy as np
+
 # Initialize logger at module level
 logger = logging.getLogger(__name__)
 
+
+class CharDecodeTable:
+    """
+    Array-backed id -> string lookup for character vocabularies.
+
+    `table[id]` holds the string for each id (an object array, so multi-char
+    special tokens fit), with one extra trailing slot for unknown or
+    out-of-range ids, and `special[id]` marks ids dropped when decoding with
+    `skip_special_tokens`. Decoding is one vectorized take plus a join.
+    """
+
+    def __init__(self, idx_to_char: Mapping[int, str], unknown: str = '', special_ids: Iterable[Optional[int]] = ()):
+        self.size = max(idx_to_char) + 1 if idx_to_char else 0
+        self.table = np.full(self.size + 1, unknown, dtype=object)
+        for idx, char in idx_to_char.items():
+            if idx >= 0:
+                self.table[idx] = char
+        self.special = np.zeros(self.size + 1, dtype=bool)
+        for special_id in special_ids:
+            if special_id is not None and 0 <= special_id < self.size:
+                self.special[special_id] = True
+
+    def _lookup(self, ids: Any) -> np.ndarray:
+        """Maps ids (list, array or tensor) to table positions, sending out-of-range ids to the unknown slot."""
+        if hasattr(ids, 'cpu'): # torch.Tensor
+            ids = ids.cpu().numpy()
+        positions = np.asarray(ids, dtype=np.int64)
+        return np.where((positions < 0) | (positions >= self.size), self.size, positions)
+
+    def decode(self, ids: Any, skip_special_tokens: bool = False) -> str:
+        positions = self._lookup(ids).reshape(-1)
+        if skip_special_tokens:
+            positions = positions[~self.special[positions]]
+        return ''.join(self.table.take(positions).tolist())
+
+    def batch_decode(self, ids: Any, skip_special_tokens: bool = False) -> List[str]:
+        """Decodes a [B, T] batch with a single take; returns one string per row."""
+        positions = self._lookup(ids)
+        if positions.ndim != 2:
+            raise ValueError(f"batch_decode expects a 2-D [batch, seq_len] input, got shape {positions.shape}.")
+        chars = self.table.take(positions)
+        if not skip_special_tokens:
+            return [''.join(row) for row in chars.tolist()]
+        keep = ~self.special[positions]
+        return [''.join(row[mask].tolist()) for row, mask in zip(chars, keep)]
+
+class CharEncodeTable:
+    """
+    Array-backed char -> id lookup for character vocabularies.
+
+    `bmp[codepoint]` holds the id of every single-character entry in the Basic
+    Multilingual Plane (-1 if absent); rarer astral characters go through a dict.
+    Text is turned into codepoints with one `np.frombuffer` over its UTF-32
+    bytes, so encoding is a vectorized take instead of a dict lookup per character.
+    Characters outside the vocabulary become `unknown_id`, or are dropped if it is None.
+
+    If every character of the vocabulary is below U+0100 (ASCII or Latin-1),
+    `byte_lut` is a 256-entry table and text is encoded from its one-byte
+    Latin-1 encoding instead of UTF-32 (`encode_bytes` maps raw bytes directly).
+    """
+
+    MISSING = -1
+    _BMP_SIZE = 0x10000
+
+    def __init__(self, char_to_idx: Mapping[str, int], unknown_id: Optional[int] = None):
+        self.bmp = np.full(self._BMP_SIZE, self.MISSING, dtype=np.int64)
+        self.astral: Dict[int, int] = {}
+        for char, idx in char_to_idx.items():
+            if len(char) != 1: # Multi-char special tokens never match a single character
+                continue
+            code = ord(char)
+            if code < self._BMP_SIZE:
+                self.bmp[code] = idx
+            else:
+                self.astral[code] = idx
+        self.unknown_id = unknown_id
+        is_byte_vocab = not self.astral and bool((self.bmp[256:] == self.MISSING).all())
+        self.byte_lut: Optional[np.ndarray] = self.bmp[:256].copy() if is_byte_vocab else None
+
+    @staticmethod
+    def codepoints(text: str) -> np.ndarray:
+        """uint32 codepoints of `text` (lone surrogates included, one per Python character)."""
+        return np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+
+    def _map(self, codes: np.ndarray) -> np.ndarray:
+        """Codepoints -> ids, with MISSING for characters outside the vocabulary."""
+        ids: np.ndarray = self.bmp[np.minimum(codes, self._BMP_SIZE - 1)]
+        astral = np.flatnonzero(codes >= self._BMP_SIZE)
+        if astral.size:
+            ids[astral] = [self.astral.get(int(code), self.MISSING) for code in codes[astral]]
+        return ids
+
+    def _text_ids(self, text: str) -> np.ndarray:
+        """Ids of every character of `text`, MISSING where it is outside the vocabulary."""
+        if self.byte_lut is not None:
+            try:
+                return self.byte_lut[np.frombuffer(text.encode('latin-1'), dtype=np.uint8)]
+            except UnicodeEncodeError:
+                pass # Characters above U+00FF are all missing; take the general path
+        return self._map(self.codepoints(text))
+
+    def _finish(self, ids: np.ndarray, dtype: Union[str, np.dtype]) -> np.ndarray:
+        missing = ids == self.MISSING
+        if missing.any():
+            ids = ids[~missing] if self.unknown_id is None else np.where(missing, self.unknown_id, ids)
+        return ids.astype(dtype, copy=False)
+
+    def encode(self, text: str, dtype: Union[str, np.dtype] = np.dtype(np.int64)) -> np.ndarray:
+        return self._finish(self._text_ids(text), dtype)
+
+    def encode_bytes(self, data: Union[bytes, np.ndarray], dtype: Union[str, np.dtype] = np.dtype(np.int64)) -> np.ndarray:
+        """
+        Encodes raw Latin-1 (or ASCII) bytes without decoding them to text.
+
+        Raises:
+            ValueError: If the vocabulary has characters above U+00FF.
+        """
+        if self.byte_lut is None:
+            raise ValueError("encode_bytes needs a vocabulary of characters below U+0100.")
+        codes = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray, memoryview)) else data
+        return self._finish(self.byte_lut[codes], dtype)
+
+    def batch_encode(self, texts: Sequence[str], dtype: Union[str, np.dtype] = np.dtype(np.int64)) -> List[np.ndarray]:
+        """Encodes several texts with one lookup over their concatenation; returns one array per text."""
+        if not texts:
+            return []
+        ids = self._text_ids(''.join(texts))
+        ends = np.cumsum([len(text) for text in texts])
+        missing = ids == self.MISSING
+        if missing.any():
+            if self.unknown_id is None:
+                dropped = np.concatenate([[0], np.cumsum(missing)])
+                ends = ends - dropped[ends]
+                ids = ids[~missing]
+            else:
+                ids = np.where(missing, self.unknown_id, ids)
+        return np.split(ids.astype(dtype, copy=False), ends[:-1])
+
 class CharTokenizer(Tokenizer):
     def __init__(self, **kwargs: Any):
         # **Call super().__init__ FIRST** to initialize base attributes
@@ -18,8 +160,15 @@ class CharTokenizer(Tokenizer):
 
         # Initialize CharTokenizer specific attributes
         self.vocab_file: Optional[str] = kwargs.get('vocab_file') # Store vocab file path
-        self.char_to_idx: Dict[str, int] = {}
-        self.idx_to_char: Dict[int, str] = {}
+        # Built on first encode/decode; dropped whenever a vocabulary map is assigned
+        self._encode_table: Optional[CharEncodeTable] = None
+        self._encode_table_key: Optional[Tuple[Any, ...]] = None
+        self._decode_table: Optional[CharDecodeTable] = None
+        self._decode_table_key: Optional[Tuple[Any, ...]] = None
+        # Backs the maps after loading from tokenizer.bin; they are built on first access
+        self._vocab_table: Optional[TokenizerTable] = None
+        self._char_to_idx: Optional[Dict[str, int]] = {}
+        self._idx_to_char: Optional[Dict[int, str]] = {}
         self.vocab_size: int = 0
         # unk_token_id is used directly in encode/decode, so ensure it reflects base state
         self.unk_token_id: Optional[int] = self.unk_id # Get ID from base class
@@ -89,7 +238,7 @@ class CharTokenizer(Tokenizer):
                                      ("eos_token", "eos_id")]:
              token_str = getattr(self, token_name, None)
              if token_str is not None:
-                 token_id = self.char_to_idx.get(token_str)
+                 token_id = self._char_id(token_str)
                  if token_id is not None:
                      # Update the ID attribute on the instance (which updates base)
                      setattr(self, id_name, token_id)
@@ -107,19 +256,38 @@ class CharTokenizer(Tokenizer):
     @classmethod
     # Renamed from load, added return hint
     def load_from_dir(cls, load_dir: str) -> "CharTokenizer":
-        """Load the tokenizer config and vocabulary from files in a directory."""
+        """
+        Load the tokenizer config and vocabulary from files in a directory.
+
+        Prefers tokenizer.bin when it is at least as new as the JSON files (so hand
+        edits to the JSON still take effect), then the JSON files, then the legacy pickle.
+        With tokenizer.bin only its header is read here; `char_to_idx`/`idx_to_char`
+        are built from its tables on first access (e.g. the first encode or decode).
+        """
         config_path = os.path.join(load_dir, 'tokenizer_config.json')
         vocab_path = os.path.join(load_dir, 'vocab.json')
+        binary_path = os.path.join(load_dir, BINARY_FILE_NAME)
         legacy_pickle_path = os.path.join(load_dir, 'char_tokenizer.pkl')
 
         loaded_config = None
+        loaded_table: Optional[TokenizerTable] = None
         loaded_char_map = None
         loaded_idx_map = None
         special_tokens_from_config = {}
 
         # logger = logging.getLogger(__name__) # Removed: Use module-level logger
-        # Try loading from JSON files first
-        if os.path.exists(config_path) and os.path.exists(vocab_path):
+        if binary_file_is_fresh(binary_path, [config_path, vocab_path]):
+            logger.info(f"Loading CharTokenizer from binary file: {binary_path}")
+            try:
+                loaded_table = TokenizerTable(binary_path)
+                loaded_config = dict(loaded_table.config)
+                special_tokens_from_config = dict(loaded_table.special_tokens)
+            except Exception as e:
+                logger.error(f"Error loading tokenizer from {binary_path}: {e}", exc_info=True)
+                raise IOError(f"Error loading tokenizer from {binary_path}") from e
+
+        # Then the JSON files
+        elif os.path.exists(config_path) and os.path.exists(vocab_path):
             logger.info(f"Loading CharTokenizer from JSON: {config_path}, {vocab_path}")
             try:
                 with open(config_path, 'r', encoding='utf-8') as f:
@@ -155,10 +323,10 @@ class CharTokenizer(Tokenizer):
                 f"in {load_dir}"
             )
 
-        if loaded_config is None or loaded_char_map is None or loaded_idx_map is None:
+        if loaded_config is None or (loaded_table is None and (loaded_char_map is None or loaded_idx_map is None)):
              raise RuntimeError("Failed to load tokenizer data correctly.")
 
-        vocab_size = len(loaded_char_map)
+        vocab_size = len(loaded_table) if loaded_table is not None else len(cast(Dict[str, int], loaded_char_map))
         loaded_config['vocab_size'] = vocab_size # Ensure vocab_size is in config
 
         # === Instantiate Approach ===
@@ -170,9 +338,14 @@ class CharTokenizer(Tokenizer):
         # Base __init__ will handle setting special tokens/IDs from init_args
         tokenizer = cls(**init_args)
 
-        # 3. Directly assign loaded vocabulary mappings
-        tokenizer.char_to_idx = loaded_char_map
-        tokenizer.idx_to_char = loaded_idx_map
+        # 3. Directly assign loaded vocabulary mappings (or leave them to the binary table)
+        if loaded_table is not None:
+            tokenizer._vocab_table = loaded_table
+            tokenizer._char_to_idx = None
+            tokenizer._idx_to_char = None
+        else:
+            tokenizer.char_to_idx = cast(Dict[str, int], loaded_char_map)
+            tokenizer.idx_to_char = cast(Dict[int, str], loaded_idx_map)
         tokenizer.vocab_size = vocab_size # Assign the calculated vocab size
 
         # 4. **Sync base IDs with the loaded vocabulary**
@@ -184,32 +357,121 @@ class CharTokenizer(Tokenizer):
 
         return tokenizer
 
+    @property
+    def char_to_idx(self) -> Dict[str, int]:
+        """char -> id map. Assigning it drops the encode table; edit a copy and assign it back."""
+        if self._char_to_idx is None:
+            self._char_to_idx = self._vocab_table.vocab() if self._vocab_table is not None else {}
+        return self._char_to_idx
+
+    @char_to_idx.setter
+    def char_to_idx(self, mapping: Dict[str, int]) -> None:
+        self._detach_vocab_table()
+        self._char_to_idx = mapping
+        self._encode_table = None
+
+    @property
+    def idx_to_char(self) -> Dict[int, str]:
+        """id -> char map. Assigning it drops the decode table; edit a copy and assign it back."""
+        if self._idx_to_char is None:
+            self._idx_to_char = dict(enumerate(self._vocab_table.pieces())) if self._vocab_table is not None else {}
+        return self._idx_to_char
+
+    @idx_to_char.setter
+    def idx_to_char(self, mapping: Dict[int, str]) -> None:
+        self._detach_vocab_table()
+        self._idx_to_char = mapping
+        self._decode_table = None
+
+    def _detach_vocab_table(self) -> None:
+        """Builds both maps from the binary table before one of them is replaced, then drops the table."""
+        if self._vocab_table is not None:
+            self._char_to_idx, self._idx_to_char = self.char_to_idx, self.idx_to_char
+            self._vocab_table = None
+
+    def _char_id(self, char: str) -> Optional[int]:
+        """Id of `char`, looked up in the binary table while the maps are not built yet."""
+        if self._char_to_idx is None and self._vocab_table is not None:
+            return self._vocab_table.piece_to_id(char)
+        return self.char_to_idx.get(char)
+
+    def _get_encode_table(self) -> CharEncodeTable:
+        """Returns the codepoint lookup table for the current vocabulary, building it on first use."""
+        key = (self.unk_token_id,)
+        if self._encode_table is None or self._encode_table_key != key:
+            # Unknown characters map to unk_token_id (synced with self.unk_id), or are skipped without one
+            self._encode_table = CharEncodeTable(self.char_to_idx, self.unk_token_id)
+            self._encode_table_key = key
+        return self._encode_table
+
+    @property
+    def byte_lut(self) -> Optional[np.ndarray]:
+        """256-entry byte -> id table if every character of the vocabulary is below U+0100, else None."""
+        return self._get_encode_table().byte_lut
+
     def encode(self, text: str) -> List[int]:
-        # Use self.unk_token_id which is synced with self.unk_id
-        unk = self.unk_token_id
-        encoded = []
-        for char in text:
-            idx = self.char_to_idx.get(char)
-            if idx is not None:
-                encoded.append(idx)
-            elif unk is not None:
-                encoded.append(unk)
-            # If idx is None and unk is None, skip the character
-        return encoded
-
-    def decode(self, ids: List[int]) -> str:
-        """Decode token IDs to text, handling unknown IDs."""
-        # Use self.unk_token (from base class) for unknown characters
-        unknown_char = self.unk_token if self.unk_token is not None else ''
-        # Use the instance's idx_to_char map
-        return ''.join(self.idx_to_char.get(idx, unknown_char) for idx in ids)
+        return cast(List[int], self.encode_array(text).tolist())
+
+    def encode_array(self, text: str, dtype: Union[str, np.dtype] = np.dtype(np.int64)) -> np.ndarray:
+        """Encode text straight to a NumPy array of IDs (no per-character Python objects)."""
+        return self._get_encode_table().encode(text, dtype)
+
+    def batch_encode(
+        self, texts: Sequence[str], num_threads: Optional[int] = None, *, return_tensors: Optional[str] = None
+    ) -> List[Any]:
+        """
+        Encode several texts in one vectorized pass. Returns lists of IDs, or one
+        array per text with return_tensors='np' (tensors with 'pt'). `num_threads`
+        is accepted for interface compatibility; a single pass needs no pool.
+        """
+        arrays = self._get_encode_table().batch_encode(texts)
+        if return_tensors == 'np':
+            return arrays
+        if return_tensors == 'pt':
+            import torch
+            return [torch.from_numpy(array) for array in arrays]
+        if return_tensors is not None:
+            raise ValueError(f"Unsupported return_tensors '{return_tensors}'. Expected None, 'np' or 'pt'.")
+        return [array.tolist() for array in arrays]
+
+    def _get_decode_table(self) -> CharDecodeTable:
+        """Returns the lookup table for the current vocabulary, building it on first use."""
+        special_ids = (self.pad_id, self.unk_id, self.bos_id, self.eos_id)
+        key = (special_ids, self.unk_token)
+        if self._decode_table is None or self._decode_table_key != key:
+            # Use self.unk_token (from base class) for unknown characters
+            unknown_char = self.unk_token if self.unk_token is not None else ''
+            self._decode_table = CharDecodeTable(self.idx_to_char, unknown_char, special_ids)
+            self._decode_table_key = key
+        return self._decode_table
+
+    def decode(self, ids: Union[List[int], Sequence[int], Any], skip_special_tokens: bool = False) -> str:
+        """Decode token IDs (list, array or tensor) to text, handling unknown IDs."""
+        return self._get_decode_table().decode(ids, skip_special_tokens=skip_special_tokens)
+
+    def batch_decode(self, ids: Any, num_threads: Optional[int] = None, *, skip_special_tokens: bool = False) -> List[str]:
+        """
+        Decode a [batch, seq_len] tensor or array of IDs to one string per row with
+        a single take. Ragged lists of sequences are decoded row by row.
+        """
+        table = self._get_decode_table()
+        if isinstance(ids, (list, tuple)) and (not ids or len({len(row) for row in ids}) > 1):
+            return [table.decode(row, skip_special_tokens=skip_special_tokens) for row in ids]
+        return table.batch_decode(ids, skip_special_tokens=skip_special_tokens)
+
+    def incremental_decoder(self, **decode_kwargs: Any) -> CharIncrementalDecoder:
+        """Streaming decoder; every id decodes on its own, so each step is a single lookup."""
+        return CharIncrementalDecoder(self, **decode_kwargs)
 
     def get_vocab_size(self) -> int:
         """Return the size of the vocabulary."""
         return self.vocab_size
 
     def save(self, output_dir: str) -> None:
-        """Save the tokenizer config and vocabulary to separate files."""
+        """
+        Save the tokenizer config and vocabulary to separate JSON files, plus the
+        same data as tokenizer.bin for fast loading.
+        """
         os.makedirs(output_dir, exist_ok=True)
         config_path = os.path.join(output_dir, 'tokenizer_config.json')
         vocab_path = os.path.join(output_dir, 'vocab.json')
@@ -245,6 +507,16 @@ class CharTokenizer(Tokenizer):
         with open(vocab_path, 'w', encoding='utf-8') as f:
             json.dump(self.char_to_idx, f, indent=2)
 
+        # Written last, so it is not older than the JSON files it mirrors
+        special_tokens = config_to_save.pop('special_tokens')
+        try:
+            write_tokenizer_binary(
+                os.path.join(output_dir, BINARY_FILE_NAME), self.idx_to_char, 'char',
+                config=config_to_save, special_tokens=special_tokens,
+            )
+        except ValueError as e:
+            logger.warning(f"Not writing {BINARY_FILE_NAME}: {e} The JSON files will be used when loading.")
+
     def get_special_tokens(self) -> List[str]:
         """Return a list of defined special tokens used by the tokenizer."""
         tokens = [
@@ -0,0 +1,91 @@
+"""
+Incremental (streaming) detokenization.
+
+Re-decoding the whole sequence after every generated token is O(n^2). An
+`IncrementalDecoder` instead keeps a small window of ids: the tokens already
+emitted that still give context (`prefix`), plus the tokens not yet emitted
+(`pending`). For each new id it decodes the window with and without the
+pending tokens and returns only the text difference. Each step decodes a few
+tokens, so its cost does not grow with the sequence.
+
+Decoding with one token of context handles tokenizers whose output depends on
+neighbours. For example, SentencePiece drops the leading-space marker (U+2581)
+of the first piece. A diff against the context keeps that space for every
+later word. Byte-fallback tokens that end in the middle of a UTF-8 character
+decode to U+FFFD. Those tokens stay pending until the character is complete,
+or until `max_pending` tokens show that the bytes really are invalid.
+
+Use `tokenizer.incremental_decoder()` to get the decoder suited to a tokenizer.
+"""
+import os
+from typing import Any, Iterable, List
+
+REPLACEMENT_CHAR = "\ufffd"
+DEFAULT_MAX_PENDING = 8 # > the 4 bytes of the longest UTF-8 character
+
+
+class IncrementalDecoder:
+    """
+    Emits the text added by each appended token id. For tokenizers whose decoding
+    only depends on neighbouring tokens, the concatenation of all `push` results
+    and `flush()` equals `tokenizer.decode(ids)` of all ids.
+    """
+
+    def __init__(self, tokenizer: Any, max_pending: int = DEFAULT_MAX_PENDING, **decode_kwargs: Any):
+        """
+        Args:
+            tokenizer: Any tokenizer with `decode(ids, **decode_kwargs)`.
+            max_pending: Tokens held back waiting for an incomplete UTF-8 character
+                         before their text is emitted as is.
+            **decode_kwargs: Passed to every `decode` call (e.g. skip_special_tokens).
+        """
+        self.tokenizer = tokenizer
+        self.max_pending = max_pending
+        self.decode_kwargs = decode_kwargs
+        self.reset()
+
+    def reset(self) -> None:
+        """Starts a new sequence."""
+        self._prefix: List[int] = []
+        self._pending: List[int] = []
+        self._prefix_text = ""
+
+    def _decode(self, ids: List[int]) -> str:
+        return str(self.tokenizer.decode(ids, **self.decode_kwargs)) if ids else ""
+
+    def push(self, token_id: int) -> str:
+        """Appends one id and returns the new text fragment ('' while it is held back)."""
+        self._pending.append(int(token_id))
+        text = self._decode(self._prefix + self._pending)
+        if text.endswith(REPLACEMENT_CHAR) and len(self._pending) < self.max_pending:
+            return "" # Incomplete UTF-8 character; wait for its remaining bytes
+        return self._emit(text)
+
+    def extend(self, token_ids: Iterable[int]) -> str:
+        return "".join(self.push(token_id) for token_id in token_ids)
+
+    def flush(self) -> str:
+        """Returns any held-back text (e.g. a truncated UTF-8 character) and ends the sequence."""
+        text = self._emit(self._decode(self._prefix + self._pending)) if self._pending else ""
+        self.reset()
+        return text
+
+    def _emit(self, text: str) -> str:
+        # Decoding can rewrite the context text itself (e.g. whitespace cleanup), so only
+        # the part after the longest common prefix is new; the rest was already emitted
+        fragment = text[len(os.path.commonprefix([text, self._prefix_text])):]
+        # The emitted tokens become the context of the next step
+        self._prefix = self._pending
+        self._pending = []
+        self._prefix_text = self._decode(self._prefix)
+        return fragment
+
+
+class CharIncrementalDecoder(IncrementalDecoder):
+    """Character vocabularies decode each id on its own, so no window is needed."""
+
+    def push(self, token_id: int) -> str:
+        return self._decode([int(token_id)])
+
+    def flush(self) -> str:
+        return ""
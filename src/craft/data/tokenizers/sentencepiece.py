@@ -3,12 +3,13 @@ import logging
 import os
 import tempfile
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union, cast
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union, cast
 import shutil
 
 import sentencepiece as spm # type: ignore[import-untyped]
 
-from .base import Tokenizer
+from .base import Tokenizer, apply_special_ids, resolve_num_threads
+from .binary_format import BINARY_FILE_NAME, TokenizerTable, binary_file_is_fresh, write_tokenizer_binary
 from .sentencepiece_trainer import train_sentencepiece_model # Import trainer function
 
 logger = logging.getLogger(__name__)
@@ -35,6 +36,12 @@ class SentencePieceTokenizer(Tokenizer):
         """
         Initializes the SentencePieceTokenizer by loading a pre-trained model.
 
+        If the directory also holds a `tokenizer.bin` (written by `save`) that is not
+        older than the model and metadata files, the metadata, special ids and
+        vocabulary lookups come from its header and memory-mapped tables. The JSON
+        metadata is not parsed, and the SentencePiece model is only loaded by the
+        first call that needs it (encode/decode).
+
         Args:
             model_path: Path to the *directory* containing the trained
                         'sentencepiece.model' and 'tokenizer_metadata.json' files.
@@ -43,10 +50,11 @@ class SentencePieceTokenizer(Tokenizer):
             **kwargs: Additional arguments passed to the base Tokenizer.
         """
         self.model_dir = Path(model_path)
-        self.sp_model: Optional[spm.SentencePieceProcessor] = None
+        self._sp_model: Optional[spm.SentencePieceProcessor] = None
         self.metadata: Dict[str, Any] = {}
         self.model_file = self.model_dir / self.MODEL_FILENAME
         self.metadata_file = self.model_dir / METADATA_FILENAME
+        self.vocab_table: Optional[TokenizerTable] = None
 
         loaded_special_tokens = {}
         loaded_config = {}
@@ -60,23 +68,29 @@ class SentencePieceTokenizer(Tokenizer):
              raise FileNotFoundError(f"SentencePiece metadata file not found: {self.metadata_file}")
 
         try:
-            # Load metadata first
-            with open(self.metadata_file, "r", encoding="utf-8") as f:
-                self.metadata = json.load(f)
+            binary_file = self.model_dir / BINARY_FILE_NAME
+            if binary_file_is_fresh(binary_file, [self.model_file, self.metadata_file]):
+                # save() stores the metadata in the header; the model is loaded on first use
+                self.vocab_table = TokenizerTable(binary_file)
+                self.metadata = dict(self.vocab_table.config)
+                logger.info(f"Loaded SentencePiece metadata and vocabulary tables from: {binary_file}")
+            else:
+                with open(self.metadata_file, "r", encoding="utf-8") as f:
+                    self.metadata = json.load(f)
                 logger.info(f"Loaded SentencePiece metadata from: {self.metadata_file}")
-                # Extract info needed for base class and self
-                loaded_config['vocab_size'] = self.metadata.get('vocab_size')
-                loaded_special_tokens = self.metadata.get('special_tokens_map', {}) # Use the saved map
-                # Determine add_bos/eos primarily from metadata, allow override
-                # Look for explicit flags saved during training (if added to metadata later)
-                meta_add_bos = self.metadata.get("add_bos_as_control", False)
-                meta_add_eos = self.metadata.get("add_eos_as_control", False)
-                self._add_bos_token = add_bos_token if add_bos_token is not None else meta_add_bos
-                self._add_eos_token = add_eos_token if add_eos_token is not None else meta_add_eos
-
-            # Load SentencePiece model
-            self.sp_model = spm.SentencePieceProcessor(str(self.model_file))
-            logger.info(f"Loaded SentencePiece model from: {self.model_file}")
+                # Load SentencePiece model
+                self.sp_model = spm.SentencePieceProcessor(str(self.model_file))
+                logger.info(f"Loaded SentencePiece model from: {self.model_file}")
+
+            # Extract info needed for base class and self
+            loaded_config['vocab_size'] = self.metadata.get('vocab_size')
+            loaded_special_tokens = self.metadata.get('special_tokens_map', {}) # Use the saved map
+            # Determine add_bos/eos primarily from metadata, allow override
+            # Look for explicit flags saved during training (if added to metadata later)
+            meta_add_bos = self.metadata.get("add_bos_as_control", False)
+            meta_add_eos = self.metadata.get("add_eos_as_control", False)
+            self._add_bos_token = add_bos_token if add_bos_token is not None else meta_add_bos
+            self._add_eos_token = add_eos_token if add_eos_token is not None else meta_add_eos
 
         except Exception as e:
             logger.error(f"Failed to load SentencePiece model or metadata from {self.model_dir}: {e}")
@@ -98,13 +112,34 @@ class SentencePieceTokenizer(Tokenizer):
         self._sync_vocab_from_sp_model()
 
 
+    @property
+    def sp_model(self) -> Optional[spm.SentencePieceProcessor]:
+        """The SentencePiece processor; loaded on first access when the tokenizer was opened from tokenizer.bin."""
+        if self._sp_model is None and self.vocab_table is not None:
+            self._sp_model = spm.SentencePieceProcessor(str(self.model_file))
+            logger.info(f"Loaded SentencePiece model from: {self.model_file}")
+            if self._sp_model.get_piece_size() != len(self.vocab_table):
+                logger.warning(f"Ignoring {self.vocab_table.path}: it has {len(self.vocab_table)} pieces, the model has {self._sp_model.get_piece_size()}.")
+                self.vocab_table = None
+                self._sync_vocab_from_sp_model()
+        return self._sp_model
+
+    @sp_model.setter
+    def sp_model(self, sp_model: Optional[spm.SentencePieceProcessor]) -> None:
+        self._sp_model = sp_model
+
     def _sync_vocab_from_sp_model(self) -> None:
-        """Updates internal vocab mappings from the loaded sp_model and metadata."""
-        if not self.sp_model:
+        """
+        Updates internal vocab mappings from the loaded sp_model and metadata, or from
+        the binary vocab table (and its special ids) without loading the model.
+        """
+        table = self.vocab_table
+        if table is None and not self._sp_model:
              raise RuntimeError("SentencePiece model (sp_model) is not loaded.")
+        sp_model = cast(spm.SentencePieceProcessor, self._sp_model) # Only used without a table
 
         # Cast the result of get_piece_size
-        self.vocab_size = cast(int, self.sp_model.get_piece_size())
+        self.vocab_size = len(table) if table is not None else cast(int, sp_model.get_piece_size())
         
         # Get the special tokens map either from loaded metadata or the base class defaults
         current_special_map: Dict[str, str] = self.special_tokens_map # Map initialized by base class
@@ -122,21 +157,35 @@ class SentencePieceTokenizer(Tokenizer):
         # Add others if defined (e.g., mask, cls, sep)
         # ...
 
-        # Get IDs from the loaded SP model
-        self.unk_token_id = self.sp_model.unk_id() if self.sp_model.unk_id() != -1 else None
-        self.bos_token_id = self.sp_model.bos_id() if self.sp_model.bos_id() != -1 else None
-        self.eos_token_id = self.sp_model.eos_id() if self.sp_model.eos_id() != -1 else None
-        self.pad_token_id = self.sp_model.pad_id() if self.sp_model.pad_id() != -1 else None
-
-        # Rebuild vocab mappings using SP model directly
-        self.idx_to_token = {i: self.sp_model.id_to_piece(i) for i in range(self.vocab_size)}
-        self.token_to_idx = {v: k for k, v in self.idx_to_token.items()}
+        if table is not None:
+            # IDs saved in the binary header (taken from the SP model by save())
+            for role in ("unk", "bos", "eos", "pad"):
+                setattr(self, f"{role}_token_id", table.special_tokens.get(f"{role}_id"))
+        else:
+            # Get IDs from the loaded SP model
+            self.unk_token_id = sp_model.unk_id() if sp_model.unk_id() != -1 else None
+            self.bos_token_id = sp_model.bos_id() if sp_model.bos_id() != -1 else None
+            self.eos_token_id = sp_model.eos_id() if sp_model.eos_id() != -1 else None
+            self.pad_token_id = sp_model.pad_id() if sp_model.pad_id() != -1 else None
+
+        # Rebuild vocab mappings using SP model directly. With a binary vocab table the
+        # maps only hold the special token entries below, and other lookups use the table.
+        if table is not None:
+            self.idx_to_token: Dict[int, str] = {}
+            self.token_to_idx: Dict[str, int] = {}
+        else:
+            self.idx_to_token = {i: sp_model.id_to_piece(i) for i in range(self.vocab_size)}
+            self.token_to_idx = {v: k for k, v in self.idx_to_token.items()}
 
         # Verify/log special token IDs match expectations from the map
         for role, token in current_special_map.items():
              if token:
                  try:
-                     sp_id = self.sp_model.piece_to_id(token)
+                     if table is not None:
+                         table_id = table.piece_to_id(token)
+                         sp_id = table_id if table_id is not None else -1
+                     else:
+                         sp_id = sp_model.piece_to_id(token)
                      assigned_id = getattr(self, f"{role}_token_id", None)
                      # Log if the role ID doesn't match SP's ID for that token string
                      # This shouldn't happen if training args were set correctly, but good check.
@@ -215,39 +264,25 @@ class SentencePieceTokenizer(Tokenizer):
                   stripped_ids = stripped_ids[:-1]
              return stripped_ids
 
-    def batch_encode(self, texts: List[str], add_special_tokens: bool = True) -> List[List[int]]:
-        """Encodes a batch of texts into token IDs."""
-        # SentencePiece processor has encode method that takes list
+    def batch_encode(
+        self, texts: Sequence[str], num_threads: Optional[int] = None, add_special_tokens: bool = True
+    ) -> List[List[int]]:
+        """
+        Encodes a batch of texts into token IDs in SentencePiece's native thread pool
+        (`num_threads`, default every core). BOS/EOS follow `encode`, applied to the whole batch at once.
+        """
+        if isinstance(num_threads, bool):
+            # Calls from before num_threads existed pass add_special_tokens second: batch_encode(texts, False)
+            add_special_tokens = num_threads
+            num_threads = None
         if not self.sp_model:
             raise RuntimeError("SentencePiece model not loaded.")
-        
-        encoded_batch = self.sp_model.encode(texts)
-        
-        # Apply add_special_tokens logic to each sequence in the batch
-        processed_batch = []
-        for encoded_ids in encoded_batch:
-             bos_id = self.bos_token_id
-             eos_id = self.eos_token_id
-             if add_special_tokens:
-                 final_ids = []
-                 if self._add_bos_token and bos_id is not None:
-                     if not encoded_ids or encoded_ids[0] != bos_id:
-                         final_ids.append(bos_id)
-                 final_ids.extend(encoded_ids)
-                 if self._add_eos_token and eos_id is not None:
-                     if not encoded_ids or encoded_ids[-1] != eos_id:
-                          final_ids.append(eos_id)
-                 processed_batch.append(final_ids)
-             else:
-                 stripped_ids = encoded_ids
-                 if self._add_bos_token and bos_id is not None and stripped_ids and stripped_ids[0] == bos_id:
-                     stripped_ids = stripped_ids[1:]
-                 if self._add_eos_token and eos_id is not None and stripped_ids and stripped_ids[-1] == eos_id:
-                     stripped_ids = stripped_ids[:-1]
-                 processed_batch.append(stripped_ids)
-                 
-        return processed_batch
-
+        encoded_batch = self.sp_model.encode(list(texts), num_threads=resolve_num_threads(num_threads))
+        bos_id = self.bos_token_id if self._add_bos_token else None
+        eos_id = self.eos_token_id if self._add_eos_token else None
+        if bos_id is None and eos_id is None:
+            return cast(List[List[int]], encoded_batch)
+        return apply_special_ids(encoded_batch, bos_id, eos_id, add=add_special_tokens)
 
     def decode(self, token_ids: List[int]) -> str:
         """Decodes token IDs back into text."""
@@ -257,17 +292,26 @@ class SentencePieceTokenizer(Tokenizer):
         # Cast the result
         return cast(str, self.sp_model.decode(token_ids))
 
-    def batch_decode(self, list_of_token_ids: List[List[int]]) -> List[str]:
-         """Decodes a batch of token ID lists back into text."""
-         if not self.sp_model:
-             raise RuntimeError("SentencePiece model not loaded.")
-         # Cast the result
-         return cast(List[str], self.sp_model.decode(list_of_token_ids))
+    def batch_decode(self, list_of_token_ids: Sequence[Sequence[int]], num_threads: Optional[int] = None) -> List[str]:
+        """Decodes a batch of token ID lists (or a 2-D array/tensor) in SentencePiece's native thread pool."""
+        if not self.sp_model:
+            raise RuntimeError("SentencePiece model not loaded.")
+        if hasattr(list_of_token_ids, 'tolist'): # np.ndarray / torch.Tensor
+            list_of_token_ids = list_of_token_ids.tolist()
+        if len(list_of_token_ids) == 0:
+            return [] # sp_model.decode([]) would decode one empty sequence
+        # Cast the result
+        return cast(List[str], self.sp_model.decode(list(list_of_token_ids), num_threads=resolve_num_threads(num_threads)))
 
     # --- Vocab Methods --- #
     def get_vocab(self) -> Dict[str, int]:
         """Returns the vocabulary mapping tokens to their IDs."""
         # Ensure token_to_idx is populated correctly by __init__ / _sync_vocab_from_sp_model
+        if self.vocab_table is not None:
+            pieces = self.vocab_table.pieces()
+            for token_id, token in self.idx_to_token.items(): # Special token overrides replace the piece of their id
+                pieces[token_id] = token
+            return {piece: token_id for token_id, piece in enumerate(pieces)}
         if not self.token_to_idx:
             raise RuntimeError("Vocab mappings not initialized")
         return self.token_to_idx.copy()
@@ -279,12 +323,18 @@ class SentencePieceTokenizer(Tokenizer):
     def token_to_id(self, token: str) -> Optional[int]:
         """Converts a token string to its ID."""
         # Use the internal map which is synced with SP model and handles special tokens
-        return self.token_to_idx.get(token)
+        token_id = self.token_to_idx.get(token)
+        if token_id is None and self.vocab_table is not None:
+            token_id = self.vocab_table.piece_to_id(token)
+        return token_id
 
     def id_to_token(self, token_id: int) -> Optional[str]:
         """Converts a token ID back to its string representation."""
         # Ensure idx_to_token is populated correctly
-        return self.idx_to_token.get(token_id)
+        token = self.idx_to_token.get(token_id)
+        if token is None and self.vocab_table is not None:
+            token = self.vocab_table.id_to_piece(token_id)
+        return token
 
     # --- Save Method --- #
     def save(self, output_dir: Union[str, Path], **kwargs: Any) -> None:
@@ -293,6 +343,8 @@ class SentencePieceTokenizer(Tokenizer):
 
          This method primarily copies the existing model file and saves a new
          metadata file containing configuration used by this Tokenizer class instance.
+         The vocabulary and metadata are also written to `tokenizer.bin`, which
+         later loads use for vocabulary lookups.
 
          Args:
              output_dir: Directory to save the tokenizer files.
@@ -336,6 +388,26 @@ class SentencePieceTokenizer(Tokenizer):
              # Should saving fail if metadata fails? Maybe not critical.
              logger.warning("Tokenizer metadata saving failed, but model file was copied.")
 
+         # Written last, so it is not older than the model and metadata files
+         vocab: Optional[Dict[int, str]] = None
+         if self.vocab_table is not None:
+             # Every id resolves through the binary table, so the model is not loaded
+             vocab = dict(enumerate(self.vocab_table.pieces()))
+             vocab.update(self.idx_to_token) # Special token overrides
+         elif self.sp_model:
+             vocab = {i: self.id_to_token(i) or self.sp_model.id_to_piece(i) for i in range(self.vocab_size)}
+         if vocab is not None:
+             special_tokens = {
+                 f"{role}_id": getattr(self, f"{role}_token_id", None) for role in ("pad", "unk", "bos", "eos")
+             }
+             try:
+                 write_tokenizer_binary(
+                     output_dir / BINARY_FILE_NAME, vocab, 'sentencepiece',
+                     config=save_metadata, special_tokens=special_tokens,
+                 )
+             except ValueError as e:
+                 logger.warning(f"Not writing {BINARY_FILE_NAME}: {e}")
+
     # Config property (optional but can be useful)
     @property
     def config(self) -> Dict[str, Any]:
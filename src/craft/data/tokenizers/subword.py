@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Optional, Union, cast
+from typing import Dict, Any, List, Optional, Sequence, Union, cast
 import os
 # Alias the tokenizer library's Tokenizer to avoid name clash with our base class
 from tokenizers import Tokenizer as HFTokenizer # type: ignore[import-untyped]
@@ -100,6 +100,20 @@ class SubwordTokenizer(Tokenizer): # Inherit from our base Tokenizer
             logger.exception(f"Error during encoding text: '{text[:50]}...'")
             raise RuntimeError("Encoding failed") from e
     
+    def batch_encode(self, texts: Sequence[str], num_threads: Optional[int] = None) -> List[List[int]]:
+        """Encode several texts with `encode_batch`, which runs in the library's native thread pool.
+
+        `num_threads` is accepted for interface compatibility; the pool size is set by the
+        `RAYON_NUM_THREADS` environment variable (default: every core).
+        """
+        if self.tokenizer is None:
+            raise RuntimeError("Tokenizer not initialized. Call train() or load() first.")
+        try:
+            return [encoding.ids for encoding in self.tokenizer.encode_batch(list(texts))]
+        except Exception as e:
+            logger.exception(f"Error during batch encoding of {len(texts)} texts")
+            raise RuntimeError("Encoding failed") from e
+
     def decode(self, token_ids: List[int], skip_special_tokens: bool = True) -> str:
         """Decode token IDs to text.
 
@@ -118,6 +132,20 @@ class SubwordTokenizer(Tokenizer): # Inherit from our base Tokenizer
             logger.exception(f"Error during decoding IDs: '{token_ids[:10]}...'")
             raise RuntimeError("Decoding failed") from e
     
+    def batch_decode(
+        self, batch: Sequence[Sequence[int]], num_threads: Optional[int] = None, *, skip_special_tokens: bool = True
+    ) -> List[str]:
+        """Decode several ID sequences (lists, or a 2-D array/tensor) with `decode_batch`; see `batch_encode`."""
+        if self.tokenizer is None:
+            raise RuntimeError("Tokenizer not initialized. Call train() or load() first.")
+        if hasattr(batch, 'tolist'): # np.ndarray / torch.Tensor
+            batch = batch.tolist()
+        try:
+            return cast(List[str], self.tokenizer.decode_batch(list(batch), skip_special_tokens=skip_special_tokens))
+        except Exception as e:
+            logger.exception(f"Error during batch decoding of {len(batch)} sequences")
+            raise RuntimeError("Decoding failed") from e
+
     def get_vocab_size(self) -> int:
         """Get the vocabulary size."""
         if self.tokenizer:
@@ -7,7 +7,7 @@ enabling a consistent interface regardless of modality.
 from abc import ABC, abstractmethod
 import logging
 import os
-from typing import Any, Dict, List, Optional, Tuple, Union, Type
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, Type
 
 import torch
 import torch.nn as nn
@@ -166,7 +166,8 @@ class GenerativeModel(Model):
         top_p: Optional[float] = None,
         repetition_penalty: float = 1.0,
         eos_token_id: Optional[int] = None,
-        verbose: bool = False
+        verbose: bool = False,
+        on_token: Optional[Callable[[torch.Tensor], None]] = None,
     ) -> torch.Tensor:
         """
         Generates sequences based on input_ids.
@@ -180,6 +181,7 @@ class GenerativeModel(Model):
             repetition_penalty: Penalty applied to repeated tokens (1.0 = no penalty).
             eos_token_id: ID of the end-of-sequence token to stop generation.
             verbose: Log progress.
+            on_token: Optional callback receiving the tokens appended at each step (shape [batch_size]).
 
         Returns:
             Tensor containing the input_ids plus the generated tokens.
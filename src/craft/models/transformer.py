@@ -4,7 +4,7 @@ Transformer model implementation for character-level language modeling.
 """
 import math
 import logging
-from typing import Optional, Tuple, Union, Dict, Any, cast
+from typing import Callable, Optional, Tuple, Union, Dict, Any, cast
 
 import torch
 import torch.nn as nn
@@ -153,13 +153,33 @@ class TransformerModel(LanguageModel):
         # mask = torch.triu(torch.ones((sz, sz), device=device, dtype=torch.bool), diagonal=1)
         return mask
     
-    def forward(self, x: torch.Tensor, targets: Optional[torch.Tensor] = None) -> Union[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
+    def _generate_document_mask(self, segment_ids: torch.Tensor) -> torch.Tensor:
+        """
+        Block-diagonal causal mask for packed sequences: a position attends only to
+        earlier positions of the same document (equal segment id).
+        Returns a bool mask of shape [batch_size, seq_len, seq_len] (True = masked).
+        """
+        seq_len = segment_ids.size(1)
+        future = torch.ones((seq_len, seq_len), dtype=torch.bool, device=segment_ids.device).triu(diagonal=1)
+        return (segment_ids.unsqueeze(2) != segment_ids.unsqueeze(1)) | future # [B, L, L]
+
+    def forward(
+        self,
+        x: torch.Tensor,
+        targets: Optional[torch.Tensor] = None,
+        segment_ids: Optional[torch.Tensor] = None,
+        attention_mask: Optional[torch.Tensor] = None,
+    ) -> Union[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
         """
         Forward pass of the TransformerModel.
         
         Args:
             x: Input token indices of shape [batch_size, seq_len]
             targets: Optional target token indices for loss calculation [batch_size, seq_len]
+            segment_ids: Optional document ids per position [batch_size, seq_len] for packed
+                         sequences; attention is then restricted to the same document.
+            attention_mask: Optional [batch_size, seq_len] mask from PadCollate (1 = token,
+                            0 = padding); padded positions are never attended to.
             
         Returns:
             Logits [batch_size, seq_len, vocab_size], or (Logits, Loss) if targets are provided.
@@ -180,13 +200,25 @@ class TransformerModel(LanguageModel):
         x = self.dropout(tok_emb + pos_emb) # type: ignore[index] # [batch_size, seq_len, d_model]
         
         # Create attention mask for the decoder (used as src_mask for EncoderLayer)
-        attn_mask = self._generate_square_subsequent_mask(sz=seq_len, device=x.device, dtype=x.dtype)
+        if segment_ids is not None:
+            # nn.MultiheadAttention only takes per-head 3D masks, so the bool mask is
+            # repeated once per forward and shared by all layers
+            attn_mask = self._generate_document_mask(segment_ids).repeat_interleave(self.config.n_head, dim=0)
+        else:
+            attn_mask = self._generate_square_subsequent_mask(sz=seq_len, device=x.device, dtype=x.dtype)
+        # Key padding mask of the same type as attn_mask; padding is on the right, so
+        # every query still sees at least its own sequence's first token
+        key_padding_mask = None
+        if attention_mask is not None:
+            key_padding_mask = attention_mask == 0
+            if attn_mask.dtype != torch.bool:
+                key_padding_mask = torch.zeros(attention_mask.shape, dtype=x.dtype, device=x.device).masked_fill(key_padding_mask, float('-inf'))
 
         # Pass input through the transformer layers
         output = x
         for layer in self.transformer_layers:
              # Pass attn_mask to src_mask argument
-             output = layer(output, src_mask=attn_mask) # <-- APPLY EACH LAYER
+             output = layer(output, src_mask=attn_mask, src_key_padding_mask=key_padding_mask) # <-- APPLY EACH LAYER
 
         # Apply final layer norm
         output = self.layer_norm(output) # <-- APPLY FINAL NORM
@@ -212,7 +244,8 @@ class TransformerModel(LanguageModel):
         top_p: Optional[float] = None,
         repetition_penalty: float = 1.0,
         eos_token_id: Optional[int] = None,
-        verbose: bool = False
+        verbose: bool = False,
+        on_token: Optional[Callable[[torch.Tensor], None]] = None,
     ) -> torch.Tensor:
         """
         Generates sequences using the autoregressive_generate utility function.
@@ -226,6 +259,7 @@ class TransformerModel(LanguageModel):
             repetition_penalty: Penalty applied to repeated tokens (1.0 = no penalty).
             eos_token_id: ID of the end-of-sequence token to stop generation.
             verbose: Log progress within the generation utility.
+            on_token: Optional callback receiving the tokens appended at each step (shape [batch_size]).
 
         Returns:
             Tensor containing the input_ids plus the generated tokens.
@@ -243,5 +277,6 @@ class TransformerModel(LanguageModel):
             top_p=top_p,
             repetition_penalty=repetition_penalty,
             eos_token_id=eos_token_id,
-            verbose=verbose
+            verbose=verbose,
+            on_token=on_token,
         )
\ No newline at end of file
@@ -48,6 +48,7 @@ class TrainingState(BaseModel):
     config: Optional[Dict[str, Any]] = None # Full experiment config
     tensorboard_log_dir: Optional[str] = None # Path to TB logs for linking
     callbacks_state: Optional[Dict[str, Any]] = None # State from callbacks
+    sampler_state_dict: Optional[Dict[str, Any]] = None # Train sampler position (seed, epoch, position)
 
     # Allow extra fields if needed, though prefer explicit definition
     model_config = ConfigDict(extra='allow')
@@ -0,0 +1,91 @@
+"""
+Sequence-length curriculum.
+
+`SequenceLengthWarmup` trains on short sequences first and grows them to the
+full block size over the first `warmup_steps` optimizer steps. Attention cost
+is quadratic in sequence length, so the early steps, where the model mostly
+learns local statistics, become much cheaper.
+
+The schedule is applied to batches as they come out of the loader, so it works
+with any token dataset (`PickledDataset`, `MemmapTokenDataset`, sharded stores,
+random-offset batches). Each `[B, T]` row is cut into `T // L` consecutive
+chunks of the scheduled length `L`, giving a `[B * (T // L), L]` batch. Inputs
+and targets stay aligned and the number of tokens per step stays constant:
+the batch grows as sequences shrink. Tokens past the last full chunk of a row
+(`T % L`) are dropped for that step.
+"""
+import logging
+from typing import Any, Dict, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class SequenceLengthWarmup:
+    """Linear short-to-long sequence length schedule over optimizer steps."""
+
+    def __init__(self, start_length: int, warmup_steps: int, multiple_of: int = 8):
+        """
+        Args:
+            start_length: Sequence length at step 0.
+            warmup_steps: Steps over which the length grows linearly to the batch's full length.
+            multiple_of: Scheduled lengths are rounded down to a multiple of this
+                         (keeps matmul shapes friendly and limits recompilation).
+        """
+        if start_length <= 0 or warmup_steps < 0 or multiple_of <= 0:
+            raise ValueError(
+                f"Invalid sequence length warmup: start_length={start_length}, "
+                f"warmup_steps={warmup_steps}, multiple_of={multiple_of}."
+            )
+        self.start_length = start_length
+        self.warmup_steps = warmup_steps
+        self.multiple_of = multiple_of
+
+    def length_at(self, step: int, full_length: int) -> int:
+        """Scheduled sequence length at optimizer step `step` for batches of `full_length` tokens."""
+        if step >= self.warmup_steps or self.start_length >= full_length:
+            return full_length
+        length = self.start_length + (full_length - self.start_length) * step / self.warmup_steps
+        length = int(length) // self.multiple_of * self.multiple_of
+        return max(min(self.start_length, full_length), min(length, full_length))
+
+    def is_active(self, step: int) -> bool:
+        return step < self.warmup_steps
+
+    def apply(
+        self,
+        step: int,
+        inputs: torch.Tensor,
+        targets: torch.Tensor,
+        model_kwargs: Dict[str, Any],
+    ) -> Tuple[torch.Tensor, torch.Tensor, Dict[str, Any]]:
+        """
+        Reshapes a batch to the scheduled length. Per-position tensors in
+        `model_kwargs` (segment_ids, attention_mask) are cut the same way; chunks
+        made only of padding are dropped.
+        """
+        full_length = inputs.size(1)
+        length = self.length_at(step, full_length)
+        if length >= full_length:
+            return inputs, targets, model_kwargs
+        usable = full_length // length * length
+
+        def _chunk(tensor: torch.Tensor) -> torch.Tensor:
+            return tensor[:, :usable].reshape(-1, length)
+
+        inputs, targets = _chunk(inputs), _chunk(targets)
+        model_kwargs = {
+            key: _chunk(value) if isinstance(value, torch.Tensor) and value.dim() == 2 and value.size(1) == full_length else value
+            for key, value in model_kwargs.items()
+        }
+        attention_mask = model_kwargs.get('attention_mask')
+        if isinstance(attention_mask, torch.Tensor):
+            keep = attention_mask.sum(dim=1) > 0
+            if not bool(keep.all()):
+                inputs, targets = inputs[keep], targets[keep]
+                model_kwargs = {
+                    key: value[keep] if isinstance(value, torch.Tensor) and value.size(0) == len(keep) else value
+                    for key, value in model_kwargs.items()
+                }
+        return inputs, targets, model_kwargs
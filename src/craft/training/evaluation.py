@@ -10,50 +10,156 @@ import torch
 import torch.nn.functional as F
 import logging
 import time
-from typing import Dict, Any, Optional, List
+import numpy as np
+from typing import Dict, Any, Iterable, Optional, List, Sized, cast
+from torch.utils.data import DataLoader, IterableDataset, Subset
 from tqdm import tqdm
 
 class Evaluator:
-    """Handles model evaluation on validation data."""
+    """
+    Handles model evaluation on validation data.
+
+    With `max_batches` and/or `max_tokens` set, each evaluation scores a fixed
+    validation subset instead of the whole split. For map-style datasets the
+    subset's sample indices are drawn once from `subset_seed` and reused, so
+    every evaluation sees the same samples and losses are comparable across
+    steps. Loaders without per-sample indexing (streaming datasets, custom
+    batch samplers) stop after the budget instead. Every `full_eval_every`-th
+    evaluation (or `evaluate(full=True)`) still sweeps the complete split.
+    """
     
     def __init__(
         self,
         model: torch.nn.Module,
         val_dataloader: torch.utils.data.DataLoader,
         device: torch.device,
-        config: Dict[str, Any],
+        config: Optional[Dict[str, Any]] = None,
         use_amp: bool = False,
-        callbacks: Optional[List[Any]] = None
+        callbacks: Optional[List[Any]] = None,
+        max_batches: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        full_eval_every: int = 0,
+        subset_seed: int = 0,
     ):
         self.model = model
         self.val_dataloader = val_dataloader
         self.device = device
-        self.config = config
+        self.config = config if config is not None else {}
         self.use_amp = use_amp
         self.callbacks = callbacks if callbacks is not None else []
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.max_batches = max_batches
+        self.max_tokens = max_tokens
+        self.full_eval_every = full_eval_every
+        self.subset_seed = subset_seed
+        self.num_evaluations = 0
+        self._subset_loader: Optional[Iterable[Any]] = None # Built on the first budgeted evaluation
+        self._subset_built = False
+
+    @property
+    def has_budget(self) -> bool:
+        return bool(self.max_batches or self.max_tokens)
+
+    def _subset_indices(self) -> Optional[List[int]]:
+        """
+        Picks the fixed validation subset: a seeded permutation of the split cut at
+        `max_batches * batch_size` samples and at `max_tokens` tokens (per-sample
+        `lengths` if the dataset has them, else `block_size` per sample). Returns
+        None when the split cannot be indexed or already fits the budget.
+        """
+        dataset = getattr(self.val_dataloader, 'dataset', None)
+        batch_size = getattr(self.val_dataloader, 'batch_size', None)
+        if dataset is None or isinstance(dataset, IterableDataset) or batch_size is None:
+            return None
+        num_samples = len(dataset)
+        order = np.random.default_rng(self.subset_seed).permutation(num_samples)
+        limit = num_samples
+        if self.max_batches:
+            limit = min(limit, self.max_batches * batch_size)
+        if self.max_tokens:
+            lengths = getattr(dataset, 'lengths', None)
+            if lengths is not None:
+                cumulative = np.cumsum(np.asarray(lengths)[order])
+                limit = min(limit, max(1, int(np.searchsorted(cumulative, self.max_tokens, side='right'))))
+            elif getattr(dataset, 'block_size', None):
+                limit = min(limit, max(1, self.max_tokens // dataset.block_size))
+            else:
+                return None
+        if limit >= num_samples:
+            return None
+        return sorted(order[:limit].tolist()) # Sorted: sequential reads over the subset
+
+    def _get_subset_loader(self) -> Optional[Iterable[Any]]:
+        """Builds (once) a loader over the fixed validation subset, mirroring the val loader's settings."""
+        if not self._subset_built:
+            self._subset_built = True
+            indices = self._subset_indices()
+            if indices is not None:
+                loader = self.val_dataloader
+                self._subset_loader = DataLoader(
+                    Subset(loader.dataset, indices),
+                    batch_size=loader.batch_size,
+                    shuffle=False,
+                    num_workers=loader.num_workers,
+                    collate_fn=loader.collate_fn,
+                    pin_memory=loader.pin_memory,
+                )
+                self.logger.info(f"Validation subset: {len(indices):,} of {len(cast(Sized, loader.dataset)):,} samples (seed {self.subset_seed}), reused by every budgeted evaluation.")
+        return self._subset_loader
 
-    def evaluate(self) -> Dict[str, float]:
-        """Evaluates the model on the validation set."""
+    def evaluate(self, full: Optional[bool] = None) -> Dict[str, float]:
+        """
+        Evaluates the model on the validation set.
+
+        Args:
+            full: Force (True) or skip (False) a complete sweep of the split. By default the
+                  full split is used when no budget is set and on every `full_eval_every`-th call.
+        """
         if self.val_dataloader is None:
             self.logger.info("No validation dataloader provided, skipping evaluation.")
             return {}
-            
-        self.logger.info("Starting evaluation...")
+
+        self.num_evaluations += 1
+        if full is None:
+            full = not self.has_budget or (self.full_eval_every > 0 and self.num_evaluations % self.full_eval_every == 0)
+        loader: Iterable[Any] = self.val_dataloader
+        # Budget enforced while iterating when the split cannot be subset by index
+        batch_limit: Optional[int] = None
+        token_limit: Optional[int] = None
+        if not full:
+            subset_loader = self._get_subset_loader()
+            if subset_loader is not None:
+                loader = subset_loader
+            else:
+                batch_limit, token_limit = self.max_batches, self.max_tokens
+
+        self.logger.info("Starting evaluation..." if full else "Starting evaluation on the fixed validation budget...")
         self.model.eval()
         total_loss = 0.0
-        total_batches = len(self.val_dataloader)
+        try:
+            total_batches: Optional[int] = len(loader) # type: ignore[arg-type]
+        except TypeError:
+            total_batches = None # Streaming (IterableDataset) loaders have no length
+        if batch_limit is not None:
+            total_batches = min(total_batches, batch_limit) if total_batches is not None else batch_limit
         eval_start_time = time.time()
         total_tokens = 0
 
-        progress_bar = tqdm(self.val_dataloader, total=total_batches, desc="Evaluating")
+        progress_bar = tqdm(loader, total=total_batches, desc="Evaluating")
 
+        batches_seen = 0
         with torch.no_grad():
             for batch in progress_bar:
+                if (batch_limit is not None and batches_seen >= batch_limit) or (token_limit is not None and total_tokens >= token_limit):
+                    break
+                batches_seen += 1
                 # Unpack batch based on type
+                model_kwargs: Dict[str, Any] = {}
                 if isinstance(batch, dict):
                     inputs = batch.get('input_ids')
                     targets = batch.get('labels')
+                    # Remaining tensors (e.g. segment_ids) are passed to the model as keyword arguments
+                    model_kwargs = {k: v.to(self.device, non_blocking=True) for k, v in batch.items() if k not in ('input_ids', 'labels')}
                 elif isinstance(batch, (list, tuple)) and len(batch) == 2:
                     inputs, targets = batch
                 else:
@@ -74,15 +180,17 @@ class Evaluator:
                 # Model forward pass
                 # Forward pass with AMP
                 with torch.amp.autocast(device_type=self.device.type, enabled=self.use_amp):
-                    outputs = self.model(inputs)
-                    loss = F.cross_entropy(outputs.view(-1, outputs.size(-1)), targets.view(-1))
+                    outputs = self.model(inputs, **model_kwargs)
+                    loss = F.cross_entropy(outputs.view(-1, outputs.size(-1)), targets.view(-1), ignore_index=-1) # Ignore padding
 
                 if not (torch.isnan(loss).any() or torch.isinf(loss).any()):
                     total_loss += loss.item()
-                    total_tokens += inputs.numel()
+                    total_tokens += int((targets != -1).sum()) # Padded positions are not counted
                 else:
                     self.logger.warning("NaN/Inf detected during evaluation. Skipping batch.")
 
+        if total_batches is None or batch_limit is not None or token_limit is not None:
+            total_batches = batches_seen
         avg_loss = total_loss / total_batches if total_batches > 0 else 0.0
         eval_time = time.time() - eval_start_time
         tokens_per_sec = total_tokens / eval_time if eval_time > 0 else 0
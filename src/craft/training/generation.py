@@ -9,15 +9,63 @@ It supports various sampling strategies like greedy, temperature, top-k, and top
 import torch
 import logging
 import time  # Import the time module
-from typing import Dict, List, Any, Optional, Union
+from typing import Callable, Dict, List, Any, Optional, Union
 from unittest.mock import MagicMock
 from ..data.tokenizers.base import Tokenizer
+from ..data.tokenizers.incremental import IncrementalDecoder
 from torch.utils.data import Dataset # Import Dataset
 from omegaconf import DictConfig
 
 from ..models.base import Model
 from ..data.base import BaseDataset # Import BaseDataset
 
+class _TextStreamer:
+    """
+    model.generate `on_token` callback for streaming. Each sequence gets an
+    IncrementalDecoder primed with the prompt (context only, not reported), and
+    its new text is passed to `on_text(index, fragment)` until its EOS token.
+    """
+
+    def __init__(
+        self, tokenizer: Any, prompt_ids: List[int], eos_token_id: Optional[int], on_text: Callable[[int, str], None]
+    ):
+        self.tokenizer = tokenizer
+        self.prompt_ids = prompt_ids
+        self.eos_token_id = eos_token_id
+        self.on_text = on_text
+        self.decoders: Dict[int, IncrementalDecoder] = {}
+        self.finished: set = set()
+
+    def _decoder(self, index: int) -> IncrementalDecoder:
+        decoder = self.decoders.get(index)
+        if decoder is None:
+            factory = getattr(self.tokenizer, 'incremental_decoder', None)
+            decoder = factory() if callable(factory) else IncrementalDecoder(self.tokenizer)
+            decoder.extend(self.prompt_ids)
+            self.decoders[index] = decoder
+        return decoder
+
+    def __call__(self, tokens: torch.Tensor) -> None:
+        for index, token_id in enumerate(tokens.reshape(-1).tolist()):
+            if index in self.finished:
+                continue
+            decoder = self._decoder(index)
+            fragment = decoder.push(token_id)
+            if token_id == self.eos_token_id:
+                self.finished.add(index)
+                fragment += decoder.flush()
+            if fragment:
+                self.on_text(index, fragment)
+
+    def finish(self) -> None:
+        """Reports text still held back (e.g. an incomplete UTF-8 character) once generation ends."""
+        for index, decoder in self.decoders.items():
+            if index not in self.finished:
+                fragment = decoder.flush()
+                if fragment:
+                    self.on_text(index, fragment)
+
+
 class TextGenerator:
     """Generates text using a trained model."""
 
@@ -77,6 +125,7 @@ class TextGenerator:
         length_penalty: float = 1.0,
         no_repeat_ngram_size: int = 0,
         early_stopping: bool = True,
+        on_text: Optional[Callable[[int, str], None]] = None,
         **kwargs: Any
     ) -> List[str]:
         """Generate text using the model's built-in .generate() method.
@@ -95,6 +144,9 @@ class TextGenerator:
             length_penalty: Exponential penalty to the length (1.0 means no penalty).
             no_repeat_ngram_size: If set > 0, all ngrams of that size can only occur once.
             early_stopping: Whether to stop generation when EOS is produced.
+            on_text: Optional streaming callback, called with (sequence index, new text) as
+                tokens are generated. Each sequence is detokenized incrementally, so streaming
+                costs O(1) per token. Requires a tokenizer and a model.generate that accepts on_token.
             **kwargs: Additional keyword arguments passed directly to model.generate().
 
         Returns:
@@ -256,6 +308,13 @@ class TextGenerator:
                  generation_kwargs["eos_token_id"] = eff_eos_token_id
                  
             self.logger.info(f"Calling model.generate() with config: {generation_kwargs}")
+            streamer: Optional[_TextStreamer] = None
+            if on_text is not None:
+                if tokenizer_to_use is None:
+                    self.logger.warning("Streaming needs a tokenizer; on_text will not be called.")
+                else:
+                    streamer = _TextStreamer(tokenizer_to_use, input_ids[0].tolist(), eff_eos_token_id, on_text)
+                    generation_kwargs["on_token"] = streamer
 
             # --- Generate sequences --- #
             start_time = time.time()
@@ -269,6 +328,8 @@ class TextGenerator:
                     input_ids=input_ids_tensor, # type: ignore[operator]
                     **generation_kwargs 
                 )
+                if streamer is not None:
+                    streamer.finish()
                 self.logger.debug(f"Model output tensor shape: {outputs.shape}")
 
                 # outputs includes the prompt; extract only the generated part
@@ -286,7 +347,16 @@ class TextGenerator:
             # --- Decoding --- #
             generated_texts = []
 
-            for ids in generated_ids_list:
+            if isinstance(self.tokenizer, Tokenizer) and len(generated_ids_list) > 1:
+                # Decode every sequence in one batch_decode call (native batch path or thread pool)
+                try:
+                    generated_texts = [text.strip() for text in self.tokenizer.batch_decode(generated_ids_list)]
+                except Exception as e:
+                    self.logger.warning(f"batch_decode failed ({e}); decoding sequences one by one.")
+                    generated_texts = []
+            pending_ids = [] if generated_texts else generated_ids_list
+
+            for ids in pending_ids:
                 # Decode, handling potential errors
                 generated_text = "[Decoding Error]" # Default value
                 decoded_successfully = False
@@ -23,7 +23,7 @@ import inspect # For checking function signatures
 import time
 import hashlib
 import torch.amp # Add import for torch.amp
-from torch.utils.data import Dataset
+from torch.utils.data import Dataset, IterableDataset, Sampler
 
 # Ensure relative imports work correctly within the package
 try:
@@ -31,6 +31,12 @@ try:
     from .evaluation import Evaluator
     from .callbacks import CallbackList, Callback
     from ..data.tokenizers.base import Tokenizer
+    from ..data.samplers import (
+        SAMPLER_RANDOM_OFFSETS, DeviceBatchLoader, ResumableRandomSampler, TokenBudgetBatchSampler, WeightedMixtureSampler,
+        create_random_offset_dataloader, normalize_sampler_config,
+    )
+    from ..data.datasets.mixture_dataset import MixtureDataset
+    from ..data.collate import PadCollate
     from ..utils.common import setup_device
 except ImportError:
     # Handle cases where the script might be run directly or structure changes
@@ -171,7 +177,7 @@ def _instantiate_single_dataloader(
                       init_args = {"tokenizer": tokenizer}
                  else:
                       init_args = {}
-
+                 dataset_instance = instantiate(dataset_cfg, **init_args)
             except Exception as e_dataset:
                  logger.error(f"Failed to instantiate dataset for split '{split}': {e_dataset}", exc_info=True)
                  return None # Cannot proceed without dataset
@@ -183,7 +189,62 @@ def _instantiate_single_dataloader(
 
 
         # --- Instantiate DataLoader ---
-        if dataloader_cfg and dataloader_cfg.get('_target_'):
+        dataloader_instance: Union[DataLoader, DeviceBatchLoader]
+        # Split-level sampler overrides the data-level one (e.g. `sampler: random_offsets`)
+        sampler_cfg = normalize_sampler_config(split_cfg_node.get('sampler', data_cfg_node.get('sampler')))
+        device_resident = split_cfg_node.get('device_resident', data_cfg_node.get('device_resident', False))
+        max_tokens = split_cfg_node.get('max_tokens', data_cfg_node.get('max_tokens'))
+        if max_tokens and getattr(dataset_instance, 'lengths', None) is None:
+            logger.warning(f"max_tokens is set but {type(dataset_instance).__name__} has no per-sample `lengths`; batching by batch_size for '{split}'.")
+            max_tokens = None
+        if device_resident and split != 'train':
+            logger.warning(f"device_resident is only supported for the train split; using a regular DataLoader for '{split}'.")
+        if device_resident and split == 'train':
+            if sampler_cfg and sampler_cfg['type'] != SAMPLER_RANDOM_OFFSETS:
+                raise ValueError(f"device_resident requires the '{SAMPLER_RANDOM_OFFSETS}' sampler, got '{sampler_cfg['type']}'.")
+            if dataloader_cfg and dataloader_cfg.get('_target_'):
+                logger.warning(f"Ignoring explicit dataloader config for split '{split}' because device_resident is set.")
+            dataloader_instance = DeviceBatchLoader(
+                dataset_instance,
+                batch_size=data_cfg_node.get('batch_size', 1),
+                device=device,
+                num_batches=(sampler_cfg or {}).get('num_batches'),
+                seed=(sampler_cfg or {}).get('seed'),
+            )
+        elif sampler_cfg and split == 'train':
+            if sampler_cfg['type'] != SAMPLER_RANDOM_OFFSETS:
+                raise ValueError(f"Unknown sampler type '{sampler_cfg['type']}' for split '{split}'.")
+            if dataloader_cfg and dataloader_cfg.get('_target_'):
+                logger.warning(f"Ignoring explicit dataloader config for split '{split}' because a batch sampler is configured.")
+            dataloader_instance = create_random_offset_dataloader(
+                dataset_instance,
+                batch_size=data_cfg_node.get('batch_size', 1),
+                num_batches=sampler_cfg.get('num_batches'),
+                seed=sampler_cfg.get('seed'),
+                num_workers=data_cfg_node.get('num_workers', 0),
+                pin_memory=(device.type == 'cuda'),
+            )
+        elif max_tokens:
+            # Variable-length samples: length-bucketed batches capped by padded token count
+            if dataloader_cfg and dataloader_cfg.get('_target_'):
+                logger.warning(f"Ignoring explicit dataloader config for split '{split}' because max_tokens is set.")
+            budget_cfg = split_cfg_node.get('token_budget_sampler') or {}
+            batch_sampler = TokenBudgetBatchSampler(
+                dataset_instance.lengths, # type: ignore[attr-defined]
+                max_tokens=max_tokens,
+                pool_size=budget_cfg.get('pool_size', 4096),
+                max_batch_size=budget_cfg.get('max_batch_size'),
+                shuffle=(split == 'train'),
+                seed=budget_cfg.get('seed'),
+            )
+            logger.info(f"Batching split '{split}' by token budget (max_tokens={max_tokens}, {len(batch_sampler)} batches).")
+            dataloader_instance = DataLoader(
+                dataset=dataset_instance, batch_sampler=batch_sampler,
+                collate_fn=getattr(dataset_instance, 'collate_fn', None) or PadCollate(),
+                num_workers=data_cfg_node.get('num_workers', 0),
+                pin_memory=(device.type == 'cuda'),
+            )
+        elif dataloader_cfg and dataloader_cfg.get('_target_'):
             # Use explicit dataloader config
             dataloader_params_any = OmegaConf.to_container(dataloader_cfg, resolve=True)
             # Ensure it's a Dict[str, Any]
@@ -198,8 +259,8 @@ def _instantiate_single_dataloader(
             dataloader_params.setdefault('num_workers', data_cfg_node.get('num_workers', 0))
             dataloader_params.setdefault('pin_memory', (device.type == 'cuda')) # Default based on device
 
-            # Shuffle logic: default True for train, False otherwise
-            if split == 'train':
+            # Shuffle logic: default True for train, False otherwise (never for streaming datasets)
+            if split == 'train' and not isinstance(dataset_instance, IterableDataset):
                 dataloader_params.setdefault('shuffle', True)
             else:
                 dataloader_params.setdefault('shuffle', False)
@@ -216,12 +277,24 @@ def _instantiate_single_dataloader(
             # No explicit dataloader config, wrap dataset in default torch.utils.data.DataLoader
             batch_size = data_cfg_node.get('batch_size', 1)
             num_workers = data_cfg_node.get('num_workers', 0)
-            shuffle = (split == 'train')
+            # IterableDataset yields its own order; DataLoader rejects shuffle=True for it
+            shuffle = (split == 'train') and not isinstance(dataset_instance, IterableDataset)
             pin_memory = (device.type == 'cuda')
+            # Shuffle through a resumable sampler so checkpoints can restore the data position
+            sampler: Optional[Sampler] = None
+            if split == 'train' and isinstance(dataset_instance, MixtureDataset):
+                # Draw from each source at its configured weight instead of shuffling the concatenation
+                mixture_cfg = split_cfg_node.get('mixture_sampler') or {}
+                sampler = WeightedMixtureSampler.from_dataset(
+                    dataset_instance, num_samples=mixture_cfg.get('num_samples'), seed=mixture_cfg.get('seed'),
+                )
+            elif shuffle:
+                sampler = ResumableRandomSampler(dataset_instance)
             logger.info(f"Wrapping dataset for split '{split}' in default DataLoader (batch={batch_size}, workers={num_workers}, shuffle={shuffle}, pin_memory={pin_memory}).")
             dataloader_instance = DataLoader(
                 dataset=dataset_instance, batch_size=batch_size,
-                num_workers=num_workers, shuffle=shuffle,
+                num_workers=num_workers, sampler=sampler,
+                collate_fn=getattr(dataset_instance, 'collate_fn', None), # e.g. padding for variable-length samples
                 pin_memory=pin_memory
             )
 
@@ -456,9 +529,14 @@ def initialize_evaluator(
     val_dataloader: Optional[DataLoader],
     device: torch.device,
     use_amp: bool,
-    callbacks: CallbackList # Pass CallbackList obj
+    callbacks: CallbackList, # Pass CallbackList obj
+    eval_budget: Optional[Dict[str, Any]] = None,
 ) -> Optional[Evaluator]:
-    """Instantiates the evaluator if configured and validation dataloader exists."""
+    """
+    Instantiates the evaluator if configured and validation dataloader exists.
+    `eval_budget` (max_batches / max_tokens / full_eval_every from the training config)
+    fills in budget keys the evaluation config does not set itself.
+    """
     if not val_dataloader:
         logger.info("No validation dataloader provided, Evaluator will not be instantiated.")
         return None
@@ -470,12 +548,15 @@ def initialize_evaluator(
         if not isinstance(eval_params_any, dict):
             raise TypeError("Resolved evaluator config is not a dictionary.")
         eval_params: Dict[str, Any] = cast(Dict[str, Any], eval_params_any)
+        for key, value in (eval_budget or {}).items():
+            if value is not None:
+                eval_params.setdefault(key, value)
 
         logger.info(f"Instantiating evaluator ({eval_params.get('_target_', 'N/A')})...")
         evaluator_instance = instantiate(
             eval_params,
             model=model,
-            dataloader=val_dataloader,
+            val_dataloader=val_dataloader,
             device=device,
             use_amp=use_amp,
             # Pass the inner list of callbacks if Evaluator expects List[Callback]
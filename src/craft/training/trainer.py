@@ -34,6 +34,7 @@ from .callbacks.sample_generation import SampleGenerationCallback
 from .generation import TextGenerator
 from .progress import ProgressTracker
 from ..data.tokenizers.base import Tokenizer
+from ..data.samplers import get_resumable_sampler
 from ..config.schemas import TrainingConfig, DataConfig, AnyModelConfig, ExperimentConfig, LanguageModelConfig, CheckpointingConfig
 from ..utils.logging import setup_logging, force_flush_logs, format_time
 from ..utils.common import set_seed, setup_device
@@ -156,6 +157,7 @@ class Trainer:
         self.total_train_time = 0.0
         self._stop_training = False
         self._just_resumed_trigger_eval = False
+        self.sampler_restored = False # True once a checkpoint restored the train sampler position
 
         # --- Component Initialization (using helpers) ---
         try:
@@ -225,7 +227,12 @@ class Trainer:
                 val_dataloader=self.val_dataloader,
                 device=self.device,
                 use_amp=self.config.use_amp,
-                callbacks=self.callbacks # Pass CallbackList instance
+                callbacks=self.callbacks, # Pass CallbackList instance
+                eval_budget={
+                    'max_batches': self.config.eval_max_batches,
+                    'max_tokens': self.config.eval_max_tokens,
+                    'full_eval_every': self.config.full_eval_every or None,
+                },
             )
 
             self._just_resumed_trigger_eval = False
@@ -310,6 +317,11 @@ class Trainer:
             config=serializable_config,
             tensorboard_log_dir=tb_log_dir,
             callbacks_state=callbacks_state,
+            # Count the batches the loop consumed: loader workers run ahead of it, and max_steps can end a pass early
+            sampler_state_dict=(
+                self.training_loop._sampler_state_dict(self.training_loop.batches_consumed)
+                if getattr(self, 'training_loop', None) else None
+            ),
             # Include last eval metrics if available?
             metrics=getattr(self, 'current_val_metrics', None), # Save last known eval metrics
             # Tokenizer path is handled by CheckpointManager during save now
@@ -353,6 +365,14 @@ class Trainer:
             self.best_val_metric = loaded_state.best_val_metric # Load best metric
             self.logger.info(f"Resuming from Epoch: {self.epoch}, Global Step: {self.global_step}, Best Val Metric: {self.best_val_metric}")
 
+            # --- Load Data Position ---
+            # A resumable sampler starts at the next unseen batch, so no batches are skipped by iteration
+            sampler = get_resumable_sampler(self.train_dataloader)
+            if loaded_state.sampler_state_dict and sampler is not None:
+                sampler.load_state_dict(loaded_state.sampler_state_dict) # type: ignore[union-attr]
+                self.sampler_restored = True
+                self.logger.info(f"Restored train sampler position: {loaded_state.sampler_state_dict}")
+
             # --- Load Callback State ---
             # Callbacks state is handled by CheckpointManager.load_checkpoint internally now
 
@@ -380,6 +400,7 @@ class Trainer:
         self.epoch = 0
         self.global_step = 0
         self.best_val_metric = None
+        self.sampler_restored = False
         # Reset optimizer/scheduler/scaler states?
         # This is tricky. If resume fails, we might want to start fresh.
         # However, components are already initialized. Restarting their state
@@ -541,7 +562,8 @@ class Trainer:
                     current_epoch=epoch,
                     global_step=self.global_step, # Pass current global step
                     progress=self.progress, # Pass progress tracker
-                    loaded_global_step=start_step if epoch == start_epoch else None # Pass resume step for first epoch
+                    # Pass resume step for first epoch, unless the sampler already starts at the next unseen batch
+                    loaded_global_step=start_step if epoch == start_epoch and not self.sampler_restored else None
                 )
 
                 # Sync global step from progress tracker after epoch simulation
@@ -37,7 +37,10 @@ from .callbacks.base import Callback # Added import
 from ..models.base import GenerativeModel # Import base model for type hinting
 from .progress import ProgressTracker  # Import ProgressTracker
 from .checkpointing import CheckpointManager, TrainingState # Import CheckpointManager and TrainingState
+from ..data.samplers import get_resumable_sampler
 from craft.config.schemas import TrainingConfig
+from ..data.prefetch import PrefetchLoader
+from .curriculum import SequenceLengthWarmup
 
 # Helper to safely get learning rate
 def get_current_lr(optimizer: Optional[torch.optim.Optimizer]) -> Optional[float]:
@@ -82,6 +85,10 @@ class TrainingLoop:
         self.train_dataloader = train_dataloader
         self.device = device
         self.config = config # Store Pydantic TrainingConfig
+        # Overlap collation and host-to-device copies with compute
+        self.prefetch_loader: Optional[PrefetchLoader] = (
+            PrefetchLoader(train_dataloader, device, depth=config.prefetch_depth) if config.prefetch_depth > 0 else None
+        )
         self.scheduler = scheduler
 
         # Access parameters from config
@@ -91,6 +98,11 @@ class TrainingLoop:
         self.log_interval = config.log_interval
         self.save_interval = config.save_interval if config.save_interval is not None else 0
         self.max_steps = config.max_steps
+        warmup_cfg = config.seq_len_warmup
+        self.seq_len_warmup: Optional[SequenceLengthWarmup] = (
+            SequenceLengthWarmup(warmup_cfg.start_length, warmup_cfg.warmup_steps, warmup_cfg.multiple_of)
+            if warmup_cfg is not None and warmup_cfg.warmup_steps > 0 else None
+        )
 
         # Handle callbacks: Use provided CallbackList or create one
         if isinstance(callbacks, CallbackList):
@@ -105,8 +117,17 @@ class TrainingLoop:
 
         # Time tracking for interval-based actions
         self.last_time_based_save = time.time()
+        # Batches taken from the train loader in the current pass (None before the first epoch)
+        self.batches_consumed: Optional[int] = None
 
-    def _prepare_training_state(self, epoch: int, global_step: int) -> TrainingState:
+    def _sampler_state_dict(self, batches_consumed: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Returns the train (batch) sampler's position if it is resumable (see ResumableRandomSampler)."""
+        sampler = get_resumable_sampler(self.train_dataloader)
+        if sampler is None:
+            return None
+        return cast(Dict[str, Any], sampler.state_dict(batches_consumed, getattr(self.train_dataloader, 'batch_size', None)))
+
+    def _prepare_training_state(self, epoch: int, global_step: int, batches_consumed: Optional[int] = None) -> TrainingState:
         """Gathers component states and creates a TrainingState object."""
         model_state = self.model.state_dict()
         optimizer_state = self.optimizer.state_dict() if self.optimizer else None
@@ -138,6 +159,7 @@ class TrainingLoop:
             config=serializable_config,
             tensorboard_log_dir=tb_log_dir,
             callbacks_state=callbacks_state,
+            sampler_state_dict=self._sampler_state_dict(batches_consumed),
             # TODO: Consider how best_val_metric is managed and potentially saved
         )
         # Removed assert self.checkpoint_manager is not None, as it might be optional
@@ -177,7 +199,10 @@ class TrainingLoop:
         epoch_loss_total = 0.0
         num_optimizer_steps_in_epoch = 0 # Tracks optimizer steps within this epoch
         epoch_start_time = time.time()
-        steps_per_epoch = len(self.train_dataloader)
+        try:
+            steps_per_epoch: Optional[int] = len(self.train_dataloader)
+        except TypeError:
+            steps_per_epoch = None # Streaming (IterableDataset) loaders have no length
         self.optimizer.zero_grad(set_to_none=True) # Reset gradients at epoch start
 
         # Get max_steps and log_interval from config safely
@@ -187,7 +212,9 @@ class TrainingLoop:
         # Batch skipping logic for resuming
         resume_batch_offset = -1
         is_resuming_this_epoch = False
-        if loaded_global_step is not None and current_epoch == (loaded_global_step // steps_per_epoch):
+        if loaded_global_step is not None and steps_per_epoch is None:
+            self.logger.warning("Train dataloader has no length (streaming dataset); resuming restarts the data stream instead of skipping batches.")
+        elif loaded_global_step is not None and steps_per_epoch and current_epoch == (loaded_global_step // steps_per_epoch):
             resume_batch_offset = loaded_global_step % steps_per_epoch
             self.logger.info(f"Resuming epoch {current_epoch+1} from batch offset {resume_batch_offset + 1}/{steps_per_epoch} (global step {loaded_global_step + 1})")
             is_resuming_this_epoch = True
@@ -198,7 +225,8 @@ class TrainingLoop:
         # Start the progress tracker if it wasn't already started
         if progress.start_time is None:
             progress.start()
-        iterator = enumerate(self.train_dataloader)
+        iterator = enumerate(self.prefetch_loader if self.prefetch_loader is not None else self.train_dataloader)
+        self.batches_consumed = 0
 
         batch_idx = -1 # Initialize batch_idx before the loop
         # --- Batch Loop ---
@@ -209,6 +237,7 @@ class TrainingLoop:
                 if max_steps is not None and current_effective_step >= max_steps:
                      self.logger.info(f"Max steps ({max_steps}) reached at step {current_effective_step}. Stopping epoch before batch {batch_idx}.")
                      break # Exit batch loop
+                self.batches_consumed = batch_idx + 1
 
                 # Handle resuming mid-epoch by skipping processed batches
                 if is_resuming_this_epoch and batch_idx <= resume_batch_offset:
@@ -221,21 +250,34 @@ class TrainingLoop:
                 current_global_step = global_step + num_optimizer_steps_in_epoch
 
                 # --- Callback: On Step Begin (triggered before forward/backward) ---
-                step_logs: Dict[str, Any] = {"batch_size": len(batch[0]) if isinstance(batch, (list, tuple)) and len(batch) > 0 else 1} # Example batch size
+                # Dict batches carry 'input_ids'/'labels'; their other keys (e.g. segment_ids) go to the model
+                if isinstance(batch, dict):
+                    batch_inputs, batch_targets = batch['input_ids'], batch['labels']
+                    model_kwargs = {k: v for k, v in batch.items() if k not in ('input_ids', 'labels')}
+                else:
+                    batch_inputs, batch_targets = batch[0], batch[1]
+                    model_kwargs = {}
+                if self.seq_len_warmup is not None and self.seq_len_warmup.is_active(current_global_step):
+                    # Short-to-long curriculum: same tokens per step, shorter rows
+                    batch_inputs, batch_targets, model_kwargs = self.seq_len_warmup.apply(current_global_step, batch_inputs, batch_targets, model_kwargs)
+                step_logs: Dict[str, Any] = {"batch_size": len(batch_inputs)}
+                if self.seq_len_warmup is not None:
+                    step_logs["seq_len"] = batch_inputs.size(1)
                 self._callback_on_step_begin(batch_idx, current_global_step, step_logs)
 
                 batch_start_time = time.time()
 
                 # --- Data Transfer (moved inside try block) ---
-                inputs = batch[0].to(self.device, non_blocking=True)
-                targets = batch[1].to(self.device, non_blocking=True)
+                inputs = batch_inputs.to(self.device, non_blocking=True)
+                targets = batch_targets.to(self.device, non_blocking=True)
+                model_kwargs = {k: v.to(self.device, non_blocking=True) for k, v in model_kwargs.items()}
 
                 # --- Forward Pass ---
                 # Use appropriate context manager for AMP
                 amp_context = torch.amp.autocast(device_type=self.device.type, dtype=torch.bfloat16 if self.device.type == 'cuda' and torch.cuda.is_bf16_supported() else torch.float16, enabled=self.use_amp)
                 with amp_context:
                     # Assume model returns logits or (logits, loss) or dict with loss
-                    output = self.model(inputs)
+                    output = self.model(inputs, **model_kwargs)
                     loss: Optional[torch.Tensor] = None
                     logits: Optional[torch.Tensor] = None
                     # Check output type and extract/calculate loss
@@ -339,6 +381,10 @@ class TrainingLoop:
                         step_logs['samples_per_sec'] = samples_per_sec
                         step_logs['step_time_s'] = step_time_taken
                         step_logs.update(get_cuda_memory_stats(self.device))
+                        if self.prefetch_loader is not None:
+                            # A depth near 0 means the loop is waiting on data
+                            step_logs['data_queue_depth'] = self.prefetch_loader.queue_depth
+                            step_logs['data_starved_fetches'] = self.prefetch_loader.starved_fetches
 
                         # Update progress tracker
                         progress.update(loss=float(avg_loss_window), step=current_global_step)
@@ -353,7 +399,7 @@ class TrainingLoop:
                 if self._should_save_checkpoint(current_global_step, time.time()):
                     self.logger.info(f"Interval reached. Saving checkpoint at global step {current_global_step}...")
                     # Prepare state and filename
-                    state_to_save = self._prepare_training_state(epoch=current_epoch, global_step=current_global_step)
+                    state_to_save = self._prepare_training_state(epoch=current_epoch, global_step=current_global_step, batches_consumed=batch_idx + 1)
                     if self.checkpoint_manager:
                          # Generate filename using checkpoint manager's prefix
                          filename = f"{self.checkpoint_manager.checkpoint_prefix}_epoch_{state_to_save.epoch}_step_{state_to_save.global_step}.pt"
@@ -387,7 +433,7 @@ class TrainingLoop:
         # We need the sum of losses for the steps taken. `epoch_loss_total` is sum over batches.
         # Let's stick to averaging over batches for now, acknowledging potential inaccuracy if loop breaks early.
         num_batches_processed = batch_idx + 1 # Assuming batch_idx is the index of the last processed batch (or last attempted)
-        if max_steps is not None and (global_step + num_optimizer_steps_in_epoch) >= max_steps:
+        if steps_per_epoch is None or (max_steps is not None and (global_step + num_optimizer_steps_in_epoch) >= max_steps):
              # If max_steps caused early exit, adjust num_batches_processed?
              # num_batches_processed might be 1 more than actually contributed to steps if break happened before step
              # Let's use num_optimizer_steps * accumulation_steps as a proxy for processed batches leading to steps? No, too complex.
@@ -3,7 +3,7 @@ Text generation utilities for language models.
 """
 import torch
 import logging
-from typing import Optional, Union, List, Tuple, Any
+from typing import Callable, Optional, Union, List, Tuple, Any
 from ..models.base import Model
 
 import torch.nn as nn
@@ -96,7 +96,8 @@ def autoregressive_generate(
     eos_token_id: Optional[int] = None,
     # Add max_seq_length explicitly if not reliably available on model?
     # max_seq_length: Optional[int] = None, 
-    verbose: bool = False
+    verbose: bool = False,
+    on_token: Optional[Callable[[torch.Tensor], None]] = None,
 ) -> torch.Tensor:
     """
     Performs standard autoregressive text generation with sampling.
@@ -112,6 +113,8 @@ def autoregressive_generate(
         repetition_penalty: Penalty applied to repeated tokens (1.0 = no penalty).
         eos_token_id: ID of the end-of-sequence token to stop generation.
         verbose: Log progress.
+        on_token: Optional callback receiving the tokens appended at each step
+                  (shape [batch_size]), e.g. to stream them through an IncrementalDecoder.
 
     Returns:
         Tensor containing the input_ids plus the generated tokens.
@@ -218,6 +221,8 @@ def autoregressive_generate(
             placeholder_token = torch.zeros_like(next_token) # Use 0 as placeholder for stopped seqs
             token_to_append = torch.where(not_stopped_mask, next_token, placeholder_token)
             generated_tokens = torch.cat([generated_tokens, token_to_append], dim=1)
+            if on_token is not None:
+                on_token(token_to_append.squeeze(-1))
 
             # Update stop generation flags based on EOS
             if eos_token_id is not None:
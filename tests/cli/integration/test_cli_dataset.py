@@ -116,7 +116,7 @@ def test_cli_dataset_prepare_char(sample_input_file, tmp_output_dir):
         with open(tmp_output_dir / "train.pkl", "rb") as f:
             train_data = pickle.load(f)
         assert isinstance(train_data, np.ndarray), "Train data is not a numpy array"
-        assert train_data.dtype == np.uint16 # Char processor uses uint16
+        assert train_data.dtype == np.uint8 # Char processor stores small vocabularies as uint8
     except Exception as e:
         pytest.fail(f"Failed to load or validate train.pkl: {e}")
 
@@ -125,7 +125,7 @@ def test_prepare_char_success(test_data_dir: Path):
     with open(train_pkl, 'rb') as f:
         train_data = pickle.load(f)
     assert isinstance(train_data, np.ndarray)
-    assert train_data.dtype == np.uint16 # As saved by char_processor
+    assert train_data.dtype == np.uint8 # As saved by char_processor (vocab <= 256)
     assert len(train_data) > 0
 
     with open(val_pkl, 'rb') as f:
@@ -464,4 +464,59 @@ def test_prepare_invalid_type(test_data_dir: Path):
     assert not output_dir.exists()
 
 # --- TODO: Add more tests --- #
-# (Potentially add tests for edge cases like empty input file if needed)
\ No newline at end of file
+# (Potentially add tests for edge cases like empty input file if needed)
+
+# --- Token cache commands ---
+
+@pytest.fixture
+def token_cache_dir(tmp_path: Path) -> Path:
+    """A token cache with two entries plus files that are not cache entries."""
+    from craft.data.token_cache import TokenCache
+    cache = TokenCache(tmp_path / "token_cache")
+    cache.store_array("a" * 64, np.arange(10), np.uint16, info={'tokenizer': 'CharTokenizer', 'sources': ['a.txt']})
+    cache.store_array("b" * 64, np.arange(5), np.uint16, info={'tokenizer': 'CharTokenizer', 'sources': ['b.txt']})
+    (cache.cache_dir / "notes.txt").write_text("keep me")
+    (cache.cache_dir / ("c" * 64 + ".json")).write_text("{}") # Sidecar without data: not an entry
+    return cache.cache_dir
+
+
+def test_cache_info_lists_entries(token_cache_dir: Path):
+    result = runner.invoke(dataset_app, ["cache-info", "--cache-dir", str(token_cache_dir)])
+    assert result.exit_code == 0, result.output
+    assert f"Token cache: {token_cache_dir}" in result.output
+    assert "aaaaaaaaaaaa" in result.output and "bbbbbbbbbbbb" in result.output and "cccccccccccc" not in result.output
+    assert "a.txt" in result.output and "10 tokens" in result.output
+    assert "Total: 2 entries" in result.output
+
+
+def test_cache_info_reads_env_var(token_cache_dir: Path):
+    result = runner.invoke(dataset_app, ["cache-info"], env={"CRAFT_TOKEN_CACHE_DIR": str(token_cache_dir)})
+    assert result.exit_code == 0, result.output
+    assert "Total: 2 entries" in result.output
+
+
+def test_cache_clear_removes_only_entries(token_cache_dir: Path):
+    result = runner.invoke(dataset_app, ["cache-clear"], env={"CRAFT_TOKEN_CACHE_DIR": str(token_cache_dir)})
+    assert result.exit_code == 0, result.output
+    assert "Removed 2 entries" in result.output
+    assert sorted(path.name for path in token_cache_dir.iterdir()) == ["c" * 64 + ".json", "notes.txt"]
+
+
+def test_cache_clear_max_size_evicts_least_recently_used(token_cache_dir: Path):
+    os.utime(token_cache_dir / ("a" * 64 + ".json"), (0, 0)) # Oldest access
+    result = runner.invoke(dataset_app, ["cache-clear", "--cache-dir", str(token_cache_dir), "--max-size-mb", "0.00001"])
+    assert result.exit_code == 0, result.output
+    assert "Evicted 1 entries" in result.output
+    assert not (token_cache_dir / ("a" * 64 + ".bin")).exists() and (token_cache_dir / ("b" * 64 + ".bin")).exists()
+
+
+@pytest.mark.parametrize("make_dir", [False, True])
+def test_cache_commands_on_missing_or_empty_dir(tmp_path: Path, make_dir: bool):
+    cache_dir = tmp_path / "no_cache"
+    if make_dir:
+        cache_dir.mkdir()
+    info = runner.invoke(dataset_app, ["cache-info", "--cache-dir", str(cache_dir)])
+    assert info.exit_code == 0 and "(empty)" in info.output
+    cleared = runner.invoke(dataset_app, ["cache-clear", "--cache-dir", str(cache_dir)])
+    assert cleared.exit_code == 0 and "Removed 0 entries" in cleared.output
+    assert cache_dir.exists() == make_dir # Nothing is created
@@ -61,19 +61,19 @@ def test_processor_success_defaults(sample_input_file, temp_data_dir):
     with open(train_path, "rb") as f:
         train_data = pickle.load(f)
     assert isinstance(train_data, np.ndarray)
-    assert train_data.dtype == np.uint16
+    assert train_data.dtype == np.uint8
     assert len(train_data) > 0
 
     with open(val_path, "rb") as f:
         val_data = pickle.load(f)
     assert isinstance(val_data, np.ndarray)
-    assert val_data.dtype == np.uint16
+    assert val_data.dtype == np.uint8
     assert len(val_data) > 0
 
     with open(test_path, "rb") as f:
         test_data = pickle.load(f)
     assert isinstance(test_data, np.ndarray)
-    assert test_data.dtype == np.uint16
+    assert test_data.dtype == np.uint8
     assert len(test_data) > 0
 
     # Check tokenizer loading and basic properties
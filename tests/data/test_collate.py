@@ -0,0 +1,111 @@
+"""
+Tests for padding collation, token-budget batching and per-document datasets.
+"""
+import json
+
+import numpy as np
+import pytest
+import torch
+from omegaconf import OmegaConf
+
+from craft.data.collate import IGNORE_INDEX, PadCollate, pad_collate
+from craft.data.datasets.document_dataset import DocumentDataset
+from craft.data.samplers import TokenBudgetBatchSampler, get_resumable_sampler
+from craft.data.token_store import build_token_store_header, write_token_file
+from craft.training.initialization import _instantiate_single_dataloader
+
+
+@pytest.fixture
+def document_store(tmp_path):
+    """Writes three packed documents of 5, 1 and 9 tokens plus their boundary index."""
+    lengths = [5, 1, 9]
+    token_ids = np.arange(sum(lengths), dtype=np.uint16)
+    entry = write_token_file(tmp_path / "train.bin", token_ids, "uint16")
+    np.save(tmp_path / "train.docs.npy", np.array([0, 5, 6], dtype=np.int64))
+    metadata = {'vocab_size': 50, 'token_store': build_token_store_header("uint16", {'train': entry})}
+    with open(tmp_path / "metadata.json", "w") as f:
+        json.dump(metadata, f)
+    return tmp_path / "train.bin"
+
+
+def test_pad_collate_pads_and_masks():
+    samples = [(torch.tensor([1, 2, 3]), torch.tensor([2, 3, 4])), (torch.tensor([5]), torch.tensor([6]))]
+    batch = pad_collate(samples)
+    assert batch['input_ids'].tolist() == [[1, 2, 3], [5, 0, 0]]
+    assert batch['labels'].tolist() == [[2, 3, 4], [6, IGNORE_INDEX, IGNORE_INDEX]]
+    assert batch['attention_mask'].tolist() == [[1, 1, 1], [1, 0, 0]]
+
+
+def test_pad_collate_accepts_dict_samples():
+    samples = [{'input_ids': torch.tensor([1, 2]), 'labels': torch.tensor([2, 3])}]
+    batch = PadCollate(pad_id=9)(samples)
+    assert batch['input_ids'].tolist() == [[1, 2]]
+
+
+def test_token_budget_batches_respect_budget():
+    lengths = np.random.default_rng(0).integers(1, 64, size=500)
+    sampler = TokenBudgetBatchSampler(lengths, max_tokens=256, pool_size=64, seed=3)
+    batches = list(sampler)
+    assert sorted(i for batch in batches for i in batch) == list(range(500))
+    for batch in batches:
+        assert len(batch) * max(lengths[batch]) <= 256
+    # Sorting within pools keeps padding well below that of random batches
+    padded = sum(len(batch) * max(lengths[batch]) for batch in batches)
+    assert padded < 1.25 * lengths.sum()
+
+
+def test_token_budget_max_batch_size_and_long_samples():
+    sampler = TokenBudgetBatchSampler([1] * 10 + [100], max_tokens=50, max_batch_size=4, shuffle=False)
+    batches = list(sampler)
+    assert max(len(batch) for batch in batches) == 4
+    assert [10] in batches # Over-budget sample still forms its own batch
+
+
+def test_token_budget_resume_matches_uninterrupted():
+    lengths = np.arange(1, 200)
+    full = list(TokenBudgetBatchSampler(lengths, max_tokens=400, pool_size=50, seed=1))
+
+    sampler = TokenBudgetBatchSampler(lengths, max_tokens=400, pool_size=50, seed=1)
+    iterator = iter(sampler)
+    seen = [next(iterator) for _ in range(3)]
+    state = sampler.state_dict(batches_consumed=3)
+
+    resumed = TokenBudgetBatchSampler(lengths, max_tokens=400, pool_size=50, seed=99)
+    resumed.load_state_dict(state)
+    assert len(resumed) == len(full) - 3
+    assert seen + list(resumed) == full
+
+
+def test_get_resumable_sampler_prefers_batch_sampler():
+    batch_sampler = TokenBudgetBatchSampler([3, 4, 5], max_tokens=8)
+    loader = torch.utils.data.DataLoader(list(range(3)), batch_sampler=batch_sampler)
+    assert get_resumable_sampler(loader) is batch_sampler
+    assert get_resumable_sampler(torch.utils.data.DataLoader(list(range(3)))) is None
+
+
+def test_document_dataset_one_sample_per_document(document_store):
+    dataset = DocumentDataset(str(document_store), max_length=6)
+    # The 1-token document has no (input, target) pair; the 9-token one is truncated
+    assert len(dataset) == 2
+    assert dataset.lengths.tolist() == [4, 6]
+    x, y = dataset[1]
+    assert x.tolist() == [6, 7, 8, 9, 10, 11]
+    assert y.tolist() == [7, 8, 9, 10, 11, 12]
+    with pytest.raises(IndexError):
+        dataset[2]
+
+
+def test_max_tokens_dataloader_from_config(document_store):
+    split_cfg = OmegaConf.create({
+        'dataset': {'_target_': 'craft.data.datasets.document_dataset.DocumentDataset', 'file_path': str(document_store), 'max_length': 8},
+        'max_tokens': 16,
+        'token_budget_sampler': {'seed': 0},
+    })
+    data_cfg = OmegaConf.create({'batch_size': 4, 'num_workers': 0})
+    loader = _instantiate_single_dataloader(split_cfg, data_cfg, 'train', torch.device('cpu'))
+    assert isinstance(loader.batch_sampler, TokenBudgetBatchSampler)
+    batches = list(loader)
+    assert sum(int(b['attention_mask'].sum()) for b in batches) == 4 + 8
+    for batch in batches:
+        assert batch['input_ids'].numel() <= 16
+        assert (batch['labels'][batch['attention_mask'] == 0] == IGNORE_INDEX).all()
@@ -0,0 +1,136 @@
+"""
+Tests for chunk-compressed token files (`.tkz`) and the datasets reading them.
+"""
+import json
+import pickle
+
+import numpy as np
+import pytest
+import torch
+
+from craft.data.compressed_store import (
+    CompressedTokenArray, available_codecs, read_compressed_header, resolve_codec, write_compressed_token_file,
+)
+from craft.data.datasets.memmap_dataset import MemmapTokenDataset
+from craft.data.datasets.sharded_dataset import ShardedTokenDataset
+from craft.data.preprocessing import write_split_token_files
+from craft.data.token_store import (
+    build_token_store_header, open_token_store, write_token_file, write_token_shards,
+)
+
+
+@pytest.fixture
+def token_ids():
+    # Low-entropy ids like real text: a small alphabet inside a uint16 store
+    return np.random.default_rng(0).integers(0, 60, size=1003).astype(np.uint16)
+
+
+@pytest.fixture
+def compressed_file(tmp_path, token_ids):
+    entry = write_compressed_token_file(tmp_path / "train.tkz", token_ids, "uint16", codec="zlib", chunk_tokens=100)
+    return tmp_path / "train.tkz", entry
+
+
+def test_write_entry_and_header(compressed_file, token_ids):
+    path, entry = compressed_file
+    assert entry['file'] == "train.tkz" and entry['length'] == len(token_ids)
+    assert entry['codec'] == "zlib" and entry['chunk_tokens'] == 100
+    assert entry['compressed_bytes'] < token_ids.nbytes
+    header = read_compressed_header(path)
+    assert header['dtype'] == "uint16" and header['length'] == len(token_ids)
+
+
+def test_compressed_array_reads(compressed_file, token_ids):
+    array = CompressedTokenArray(compressed_file[0], "uint16", len(token_ids))
+    assert len(array) == len(token_ids) and array.num_chunks == 11
+    np.testing.assert_array_equal(array[:], token_ids)
+    np.testing.assert_array_equal(array[95:312], token_ids[95:312]) # Spans three chunks
+    np.testing.assert_array_equal(array[::7], token_ids[::7])
+    assert array[-1] == token_ids[-1]
+    index = np.array([[0, 99, 100], [500, 1001, 1002]])
+    np.testing.assert_array_equal(array[index], token_ids[index])
+    with pytest.raises(IndexError):
+        array[np.array([len(token_ids)])]
+
+
+def test_compressed_array_decompresses_only_touched_chunks(compressed_file):
+    array = CompressedTokenArray(compressed_file[0], cache_chunks=2)
+    array[150:160]
+    assert list(array._cache) == [1]
+    array[250:410] # Chunks 2-4; the cache keeps the two most recent
+    assert list(array._cache) == [3, 4]
+    array[320]
+    assert list(array._cache) == [4, 3]
+
+
+def test_compressed_array_validates_header(compressed_file):
+    with pytest.raises(ValueError):
+        CompressedTokenArray(compressed_file[0], "uint32")
+    with pytest.raises(ValueError):
+        CompressedTokenArray(compressed_file[0], length=5)
+
+
+def test_compressed_array_pickles_without_cache(compressed_file, token_ids):
+    array = CompressedTokenArray(compressed_file[0])
+    array[0:10]
+    restored = pickle.loads(pickle.dumps(array))
+    assert len(restored._cache) == 0
+    np.testing.assert_array_equal(restored[0:10], token_ids[0:10])
+
+
+@pytest.mark.parametrize("codec", available_codecs())
+def test_every_available_codec_round_trips(tmp_path, token_ids, codec):
+    write_compressed_token_file(tmp_path / "x.tkz", token_ids, "uint16", codec=codec, chunk_tokens=64)
+    np.testing.assert_array_equal(CompressedTokenArray(tmp_path / "x.tkz")[:], token_ids)
+
+
+def test_resolve_codec():
+    assert resolve_codec("auto") == available_codecs()[0]
+    assert resolve_codec("zlib") == "zlib"
+    with pytest.raises(ValueError):
+        resolve_codec("brotli")
+
+
+def test_open_token_store_dispatches_on_suffix(tmp_path, token_ids):
+    write_token_file(tmp_path / "raw.bin", token_ids, "uint16")
+    write_token_file(tmp_path / "packed.tkz", token_ids, "uint16", compression="zlib")
+    assert isinstance(open_token_store(tmp_path / "raw.bin", "uint16"), np.memmap)
+    assert isinstance(open_token_store(tmp_path / "packed.tkz", "uint16"), CompressedTokenArray)
+
+
+def _write_metadata(directory, entry):
+    metadata = {'vocab_size': 60, 'token_store': build_token_store_header("uint16", {'train': entry})}
+    with open(directory / "metadata.json", "w") as f:
+        json.dump(metadata, f)
+
+
+def test_memmap_dataset_reads_compressed_file(compressed_file, token_ids):
+    path, entry = compressed_file
+    _write_metadata(path.parent, entry)
+    dataset = MemmapTokenDataset(str(path), block_size=8)
+    assert isinstance(dataset.token_ids, CompressedTokenArray)
+    x, y = dataset[12]
+    assert x.dtype == torch.long
+    assert x.tolist() == token_ids[96:104].tolist() and y.tolist() == token_ids[97:105].tolist()
+    xb, _ = dataset.get_batch(torch.tensor([0, 990]))
+    assert xb[1].tolist() == token_ids[990:998].tolist()
+
+
+def test_sharded_dataset_reads_compressed_shards(tmp_path, token_ids):
+    entry = write_token_shards(tmp_path, "train", token_ids, "uint16", shard_size=300, compression="zlib", chunk_tokens=64)
+    _write_metadata(tmp_path, entry)
+    assert [s['file'] for s in entry['shards']][0] == "train-00000.tkz"
+    dataset = ShardedTokenDataset(str(tmp_path), block_size=10)
+    x, _ = dataset[29] # Tokens 290..300 cross the first shard boundary
+    assert x.tolist() == token_ids[290:300].tolist()
+
+
+def test_write_split_token_files_compressed(tmp_path, token_ids):
+    token_ids.tofile(tmp_path / "all.bin")
+    output_paths, splits, _ = write_split_token_files(
+        tmp_path / "all.bin", "uint16", tmp_path / "out", (0.8, 0.1, 0.1),
+        write_pickle=False, compression="zlib", chunk_tokens=128,
+    )
+    assert output_paths['train'].endswith("train.tkz")
+    assert splits['val']['codec'] == "zlib" and splits['val']['offset'] == 802
+    np.testing.assert_array_equal(CompressedTokenArray(output_paths['val'])[:], token_ids[802:902])
@@ -127,11 +127,27 @@ class TestPickledDataset:
         last_idx = len(dataset) - 1
         if last_idx >= 0:
              x, y = dataset[last_idx]
-             expected_x = torch.tensor(expected_tokens[last_idx : last_idx + block_size], dtype=torch.long)
-             expected_y = torch.tensor(expected_tokens[last_idx + 1 : last_idx + block_size + 1], dtype=torch.long)
+             # idx is a window index: the window starts at idx * stride (stride defaults to block_size)
+             start = last_idx * dataset.stride
+             expected_x = torch.tensor(expected_tokens[start : start + block_size], dtype=torch.long)
+             expected_y = torch.tensor(expected_tokens[start + 1 : start + block_size + 1], dtype=torch.long)
              assert torch.equal(x, expected_x)
              assert torch.equal(y, expected_y)
 
+    def test_stride(self, pickled_dataset_setup):
+        """Test overlapping windows with an explicit stride."""
+        file_path, _, block_size, expected_tokens, _ = pickled_dataset_setup
+        dataset = PickledDataset(str(file_path), block_size, stride=2)
+        # 20 tokens, block 5 -> starts 0, 2, ..., 14
+        assert len(dataset) == (len(expected_tokens) - block_size - 1) // 2 + 1
+        x, y = dataset[3]
+        assert torch.equal(x, torch.tensor(expected_tokens[6:11], dtype=torch.long))
+        assert torch.equal(y, torch.tensor(expected_tokens[7:12], dtype=torch.long))
+        with pytest.raises(IndexError):
+            dataset[len(dataset)]
+        with pytest.raises(ValueError):
+            PickledDataset(str(file_path), block_size, stride=0)
+
     def test_decode(self, pickled_dataset_setup):
         """Test decode method."""
         file_path, _, block_size, _, idx_to_char = pickled_dataset_setup
@@ -0,0 +1,78 @@
+"""
+Tests for the precomputed dataset statistics index (`stats.npz` / DatasetIndex).
+"""
+import json
+
+import numpy as np
+import pytest
+
+from craft.data.char_processor import process_char_data
+from craft.data.dataset_index import DatasetIndex, count_unigrams
+from craft.data.datasets.memmap_dataset import MemmapTokenDataset
+
+
+@pytest.fixture
+def prepared_dir(tmp_path):
+    input_path = tmp_path / "input.jsonl"
+    docs = ["abc", "aab", "cab cab"] * 10
+    input_path.write_text("".join(json.dumps({"text": d}) + "\n" for d in docs), encoding="utf-8")
+    out_dir = tmp_path / "out"
+    process_char_data(str(input_path), str(out_dir), splits=(0.8, 0.1, 0.1), write_pickle=False, doc_format="jsonl", shard_size=40)
+    DatasetIndex.clear_cache()
+    return out_dir, docs
+
+
+def test_count_unigrams_in_chunks(monkeypatch):
+    monkeypatch.setattr("craft.data.dataset_index._COUNT_CHUNK", 3)
+    assert count_unigrams(np.array([0, 2, 2, 1, 2, 0, 2], dtype=np.uint16), 4).tolist() == [2, 1, 4, 0]
+    # Ids past the vocabulary still get counted
+    assert count_unigrams(np.array([5]), 2).tolist() == [0, 0, 0, 0, 0, 1]
+
+
+def test_index_serves_prepare_statistics(prepared_dir):
+    out_dir, docs = prepared_dir
+    index = DatasetIndex.open(out_dir)
+    metadata = json.loads((out_dir / "metadata.json").read_text())
+    assert metadata['stats_index'] == "stats.npz"
+    assert index.vocab_size == metadata['vocab_size']
+    assert index.split_sizes == metadata['split_sizes']
+    assert index.total_tokens == sum(len(d) + 1 for d in docs)
+
+    counts = index.unigram_counts()
+    assert len(counts) == index.vocab_size
+    assert counts.sum() == index.total_tokens
+    assert counts[metadata['eos_id']] == len(docs)
+    assert sum(index.unigram_counts(split).sum() for split in index.splits) == counts.sum()
+    assert index.unigram_frequencies('train').sum() == pytest.approx(1.0)
+
+    assert index.shard_lengths('train').sum() == index.split_sizes['train']
+    assert len(index.shard_lengths('train')) == -(-index.split_sizes['train'] // 40)
+    assert index.doc_starts('train')[0] == 0
+    assert index.num_documents() == len(docs)
+
+
+def test_index_is_cached_until_metadata_changes(prepared_dir):
+    out_dir, _ = prepared_dir
+    index = DatasetIndex.open(out_dir)
+    assert DatasetIndex.open(str(out_dir)) is index
+    metadata = json.loads((out_dir / "metadata.json").read_text())
+    metadata['vocab_size'] += 1
+    (out_dir / "metadata.json").write_text(json.dumps(metadata))
+    assert DatasetIndex.open(out_dir).vocab_size == index.vocab_size + 1
+
+
+def test_datasets_share_the_index(prepared_dir):
+    out_dir, _ = prepared_dir
+    first = MemmapTokenDataset(str(out_dir / "train-00000.bin"), block_size=4)
+    second = MemmapTokenDataset(str(out_dir / "train-00001.bin"), block_size=4)
+    assert first.get_metadata() is second.get_metadata()
+    assert first.get_index().unigram_counts('train').sum() == first.get_index().split_sizes['train']
+
+
+def test_index_without_stats(tmp_path):
+    (tmp_path / "metadata.json").write_text(json.dumps({'vocab_size': 5, 'split_sizes': {'train': 7}}))
+    index = DatasetIndex.open(tmp_path)
+    assert not index.has_stats and index.split_sizes == {'train': 7}
+    assert index.doc_starts('train') is None
+    with pytest.raises(FileNotFoundError):
+        index.unigram_counts()
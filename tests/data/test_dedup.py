@@ -0,0 +1,105 @@
+"""
+Tests for exact / MinHash deduplication in the prepare pipeline.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from craft.data.char_processor import process_char_data
+from craft.data.dedup import DedupHasher, Deduplicator
+from craft.data.preprocessing import (
+    CharEncoder, collect_char_vocab, encode_documents_to_token_file, encode_file_to_token_file,
+)
+
+BASE = "the quick brown fox jumps over the lazy dog while the cat sleeps on the warm mat by the door " * 3
+
+
+def _jaccard_estimate(hasher, a, b):
+    return float(np.mean(hasher.minhash(a) == hasher.minhash(b)))
+
+
+def test_minhash_estimates_similarity():
+    hasher = DedupHasher(num_perm=256, bands=16, ngram=3)
+    near = BASE.replace("lazy", "sleepy", 1)
+    assert _jaccard_estimate(hasher, BASE, BASE) == 1.0
+    assert _jaccard_estimate(hasher, BASE, near) > 0.6
+    assert _jaccard_estimate(hasher, BASE, "completely different words make up this other text entirely") < 0.1
+
+
+def test_hasher_is_deterministic_across_instances():
+    a, b = DedupHasher(seed=3), DedupHasher(seed=3)
+    exact_a, bands_a, chars = a([BASE, "x"])
+    exact_b, bands_b, _ = b([BASE, "x"])
+    np.testing.assert_array_equal(exact_a, exact_b)
+    np.testing.assert_array_equal(bands_a, bands_b)
+    assert chars.tolist() == [len(BASE), 1]
+
+
+def test_hasher_rejects_bad_bands():
+    with pytest.raises(ValueError):
+        DedupHasher(num_perm=100, bands=16)
+    with pytest.raises(ValueError):
+        DedupHasher(method="fuzzy")
+
+
+@pytest.mark.parametrize("method, expected_keep", [
+    ("exact", [True, True, False, True]),
+    ("minhash", [True, True, False, False]),
+])
+def test_deduplicator_filter(method, expected_keep):
+    dedup = Deduplicator(method, ngram=3)
+    texts = [BASE, "an unrelated sentence about something else entirely", BASE, BASE.replace("lazy", "sleepy", 1)]
+    keep = dedup.filter(dedup.hasher(texts))
+    assert keep.tolist() == expected_keep
+    report = dedup.report()
+    assert report['units'] == 4 and report['removed'] == expected_keep.count(False)
+    assert report['removed_fraction'] == pytest.approx(expected_keep.count(False) / 4)
+
+
+@pytest.fixture
+def jsonl_file(tmp_path):
+    path = tmp_path / "docs.jsonl"
+    docs = ["first doc", "second", "a third, longer document"] * 20
+    path.write_text("".join(json.dumps({"text": d}) + "\n" for d in docs), encoding="utf-8")
+    return path, docs
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_encode_documents_drops_duplicates(jsonl_file, tmp_path, num_workers):
+    path, docs = jsonl_file
+    char_to_idx = {ch: i for i, ch in enumerate(collect_char_vocab(path, texts=docs))}
+    eos_id = len(char_to_idx)
+    dedup = Deduplicator("exact")
+    n, doc_starts = encode_documents_to_token_file(
+        path, tmp_path / "all.bin", CharEncoder(char_to_idx, "uint16"), "uint16", eos_id, "jsonl",
+        num_workers=num_workers, chunk_chars=50, dedup=dedup,
+    )
+    expected = [i for d in docs[:3] for i in [char_to_idx[ch] for ch in d] + [eos_id]]
+    np.testing.assert_array_equal(np.fromfile(tmp_path / "all.bin", dtype=np.uint16), expected)
+    assert n == len(expected) and doc_starts.tolist() == [0, 10, 17]
+    assert dedup.removed == len(docs) - 3
+
+
+def test_encode_file_drops_repeated_windows(tmp_path):
+    path = tmp_path / "input.txt"
+    block = "".join(f"line {i}\n" for i in range(10))
+    path.write_text(block * 5 + "tail\n", encoding="utf-8")
+    char_to_idx = {ch: i for i, ch in enumerate(collect_char_vocab(path))}
+    dedup = Deduplicator("exact", window_chars=len(block))
+    n = encode_file_to_token_file(path, tmp_path / "all.bin", CharEncoder(char_to_idx, "uint16"), "uint16", dedup=dedup)
+    assert n == len(block) + len("tail\n")
+    assert dedup.removed == 4
+
+
+def test_process_char_data_records_dedup(jsonl_file, tmp_path):
+    path, docs = jsonl_file
+    out_dir = tmp_path / "out"
+    process_char_data(
+        str(path), str(out_dir), splits=(0.8, 0.1, 0.1), write_pickle=False, doc_format="jsonl",
+        dedup=Deduplicator("minhash"),
+    )
+    metadata = json.loads((out_dir / "metadata.json").read_text())
+    assert metadata['dedup']['method'] == "minhash"
+    assert metadata['dedup']['removed_fraction'] == pytest.approx(57 / 60)
+    assert metadata['num_documents'] == 3
@@ -0,0 +1,90 @@
+import json
+import pytest
+import torch
+import numpy as np
+from pathlib import Path
+
+from craft.data.token_store import (
+    select_token_dtype,
+    write_token_file,
+    build_token_store_header,
+    open_token_file,
+)
+from craft.data.datasets.memmap_dataset import MemmapTokenDataset
+from craft.data.char_processor import process_char_data
+
+
+@pytest.fixture
+def memmap_dataset_setup(tmp_path):
+    """Writes a small raw token file plus a metadata.json header."""
+    token_ids = np.arange(20, dtype=np.uint16)
+    entry = write_token_file(tmp_path / "train.bin", token_ids, "uint16")
+    metadata = {
+        'vocab_size': 50,
+        'token_store': build_token_store_header("uint16", {'train': entry}),
+    }
+    with open(tmp_path / "metadata.json", "w") as f:
+        json.dump(metadata, f)
+    return tmp_path / "train.bin", token_ids
+
+
+def test_select_token_dtype():
+    assert select_token_dtype(100) == np.uint8
+    assert select_token_dtype(256) == np.uint8
+    assert select_token_dtype(257) == np.uint16
+    assert select_token_dtype(65536) == np.uint16
+    assert select_token_dtype(65537) == np.uint32
+
+
+def test_open_token_file_length_mismatch(memmap_dataset_setup):
+    file_path, token_ids = memmap_dataset_setup
+    with pytest.raises(ValueError):
+        open_token_file(file_path, "uint16", length=len(token_ids) + 1)
+
+
+def test_memmap_dataset_keeps_native_dtype(memmap_dataset_setup):
+    file_path, token_ids = memmap_dataset_setup
+    dataset = MemmapTokenDataset(str(file_path), block_size=5)
+    assert isinstance(dataset.token_ids, np.memmap)
+    assert dataset.token_ids.dtype == np.uint16
+    assert len(dataset) == (len(token_ids) - 1) // 5
+    assert dataset.vocab_size == 50
+
+
+def test_memmap_dataset_getitem(memmap_dataset_setup):
+    file_path, token_ids = memmap_dataset_setup
+    dataset = MemmapTokenDataset(str(file_path), block_size=5)
+    x, y = dataset[0]
+    assert x.dtype == torch.long
+    assert torch.equal(x, torch.arange(0, 5))
+    assert torch.equal(y, torch.arange(1, 6))
+    with pytest.raises(IndexError):
+        dataset[len(dataset)]
+
+
+def test_memmap_dataset_requires_dtype(tmp_path):
+    np.arange(10, dtype=np.uint16).tofile(tmp_path / "data.bin")
+    with pytest.raises(ValueError):
+        MemmapTokenDataset(str(tmp_path / "data.bin"), block_size=4)
+    dataset = MemmapTokenDataset(str(tmp_path / "data.bin"), block_size=4, dtype="uint16")
+    assert len(dataset.token_ids) == 10
+
+
+def test_process_char_data_writes_token_store(tmp_path):
+    input_path = tmp_path / "input.txt"
+    input_path.write_text("hello world, hello craft\n" * 20, encoding='utf-8')
+    output_dir = tmp_path / "out"
+    process_char_data(str(input_path), str(output_dir), write_pickle=False)
+
+    assert not (output_dir / "train.pkl").exists()
+    with open(output_dir / "metadata.json", encoding='utf-8') as f:
+        metadata = json.load(f)
+    header = metadata['token_store']
+    assert header['dtype'] == np.dtype(select_token_dtype(metadata['vocab_size'])).name == 'uint8'
+    assert header['splits']['train']['file'] == 'train.bin'
+    assert header['splits']['val']['offset'] == header['splits']['train']['length']
+
+    dataset = MemmapTokenDataset(str(output_dir / "train.bin"), block_size=8)
+    assert len(dataset.token_ids) == metadata['split_sizes']['train']
+    x, _ = dataset[1]
+    assert torch.equal(x, torch.from_numpy(dataset.token_ids[8:16].astype(np.int64)))
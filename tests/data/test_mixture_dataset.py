@@ -0,0 +1,68 @@
+"""
+Tests for MixtureDataset and WeightedMixtureSampler.
+"""
+import pickle
+
+import numpy as np
+import pytest
+import torch
+
+from craft.data.datasets.mixture_dataset import MixtureDataset
+from craft.data.samplers import WeightedMixtureSampler
+
+
+@pytest.fixture
+def source_files(tmp_path):
+    paths = []
+    for name, start, count in (("a", 0, 41), ("b", 1000, 81)):
+        path = tmp_path / name / "train.pkl"
+        path.parent.mkdir()
+        with open(path, "wb") as f:
+            pickle.dump(list(range(start, start + count)), f)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def mixture(source_files):
+    sources = [
+        {"weight": 3, "dataset": {"_target_": "craft.data.datasets.pickled_dataset.PickledDataset", "file_path": source_files[0]}},
+        {"weight": 1, "dataset": {"_target_": "craft.data.datasets.pickled_dataset.PickledDataset", "file_path": source_files[1]}},
+    ]
+    return MixtureDataset(sources, block_size=8)
+
+
+def test_mixture_concatenates_sources(mixture):
+    assert mixture.weights == [0.75, 0.25]
+    assert mixture.source_lengths == [5, 10]
+    assert mixture.offsets == [0, 5]
+    assert len(mixture) == 15
+    assert mixture.locate(5) == (1, 0)
+    x, _ = mixture[5]
+    assert int(x[0]) == 1000
+    with pytest.raises(IndexError):
+        mixture[15]
+
+
+def test_mixture_rejects_mismatched_block_size(source_files):
+    from craft.data.datasets.pickled_dataset import PickledDataset
+    sources = [{"dataset": PickledDataset(source_files[0], block_size=8)}, {"dataset": PickledDataset(source_files[1], block_size=4)}]
+    with pytest.raises(ValueError, match="block_size"):
+        MixtureDataset(sources)
+
+
+def test_weighted_sampler_follows_weights(mixture):
+    sampler = WeightedMixtureSampler.from_dataset(mixture, num_samples=20000, seed=0)
+    indices = np.array(list(sampler))
+    assert indices.min() >= 0 and indices.max() < len(mixture)
+    from_first = np.mean(indices < mixture.offsets[1])
+    assert abs(from_first - 0.75) < 0.02
+
+
+def test_weighted_sampler_resumes_mid_epoch():
+    sampler = WeightedMixtureSampler([100, 50], [0.5, 0.5], num_samples=WeightedMixtureSampler.CHUNK_SIZE + 10, seed=4)
+    full = list(sampler)
+    resumed = WeightedMixtureSampler([100, 50], [0.5, 0.5], num_samples=len(full))
+    resumed.load_state_dict({'seed': 4, 'epoch': 0, 'position': len(full) - 20})
+    assert list(resumed) == full[-20:]
+    assert sampler.state_dict() == {'seed': 4, 'epoch': 1, 'position': 0}
@@ -0,0 +1,75 @@
+"""
+Tests for the background prefetching loader.
+"""
+import threading
+
+import pytest
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+from craft.data.prefetch import PrefetchLoader, move_to_device
+
+
+@pytest.fixture
+def loader():
+    data = torch.arange(40).view(20, 2)
+    return DataLoader(TensorDataset(data, data + 1), batch_size=4)
+
+
+def test_prefetch_preserves_order_and_length(loader):
+    prefetched = PrefetchLoader(loader, "cpu", depth=2)
+    assert len(prefetched) == len(loader) == 5
+    for (x, y), (ref_x, ref_y) in zip(prefetched, loader):
+        assert torch.equal(x, ref_x) and torch.equal(y, ref_y)
+    assert prefetched.dataset is loader.dataset # Attributes pass through
+    assert 0 <= prefetched.queue_depth <= 2
+
+
+def test_prefetch_stops_cleanly_on_early_exit(loader):
+    prefetched = PrefetchLoader(loader, "cpu", depth=1)
+    for i, _ in enumerate(prefetched):
+        if i == 1:
+            break
+    assert len(list(prefetched)) == 5 # Re-iterable after an early break
+
+
+def test_prefetch_does_not_count_warm_up_fetch_as_starved():
+    produced = threading.Event()
+
+    class Source:
+        def __iter__(self):
+            yield torch.zeros(1) # Usually not queued yet when the pass starts
+            yield torch.ones(1)
+            yield torch.ones(1)
+            produced.set()
+
+    prefetched = PrefetchLoader(Source(), "cpu", depth=4)
+    for _ in range(2):
+        iterator = iter(prefetched)
+        next(iterator)
+        assert produced.wait(timeout=5.0)
+        next(iterator), next(iterator)
+        iterator.close()
+        produced.clear()
+    assert prefetched.starved_fetches == 0
+
+
+def test_prefetch_propagates_loader_errors():
+    def failing():
+        yield torch.zeros(1)
+        raise RuntimeError("boom")
+
+    class Failing:
+        def __iter__(self):
+            return failing()
+
+    with pytest.raises(RuntimeError, match="boom"):
+        list(PrefetchLoader(Failing(), "cpu"))
+
+
+def test_move_to_device_handles_nested_batches():
+    batch = {"input_ids": torch.ones(2), "extra": (torch.zeros(1), "tag")}
+    moved = move_to_device(batch, torch.device("cpu"))
+    assert moved["extra"][1] == "tag" and torch.equal(moved["input_ids"], torch.ones(2))
+    with pytest.raises(ValueError):
+        PrefetchLoader([], "cpu", depth=0)
@@ -0,0 +1,191 @@
+"""
+Tests for chunked / parallel tokenization used by `craft dataset prepare`.
+"""
+import json
+
+import numpy as np
+import pytest
+import sentencepiece as spm
+import torch
+
+from craft.data.char_processor import process_char_data
+from craft.data.datasets.memmap_dataset import MemmapTokenDataset
+from craft.data.tokenizers.char import CharEncodeTable, CharTokenizer
+from craft.data.tokenizers.sentencepiece import METADATA_FILENAME, SentencePieceTokenizer
+from craft.data.preprocessing import (
+    CharEncoder,
+    SentencePieceEncoder,
+    ascii_char_vocab,
+    collect_char_vocab,
+    count_bytes,
+    encode_documents_to_token_file,
+    encode_file_to_token_file,
+    iter_documents,
+    iter_line_chunks,
+    write_split_token_files,
+)
+
+
+@pytest.fixture
+def text_file(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text("".join(f"line {i}: héllo wörld\n" for i in range(200)) + "no trailing newline", encoding="utf-8")
+    return path
+
+
+def test_iter_line_chunks_are_line_aligned(text_file):
+    chunks = list(iter_line_chunks(text_file, chunk_chars=64))
+    assert "".join(chunks) == text_file.read_text(encoding="utf-8")
+    assert len(chunks) > 1
+    assert all(chunk.endswith("\n") for chunk in chunks[:-1])
+
+
+@pytest.mark.parametrize("num_workers", [1, 3])
+def test_encode_file_matches_direct_encoding(text_file, tmp_path, num_workers):
+    chars = collect_char_vocab(text_file, chunk_chars=64)
+    char_to_idx = {ch: i for i, ch in enumerate(chars)}
+    out_path = tmp_path / "all.bin"
+    n = encode_file_to_token_file(
+        text_file, out_path, CharEncoder(char_to_idx, "uint16"), "uint16",
+        num_workers=num_workers, chunk_chars=64, prefix_ids=[0], suffix_ids=[1],
+    )
+    expected = [0] + [char_to_idx[ch] for ch in text_file.read_text(encoding="utf-8")] + [1]
+    assert n == len(expected)
+    np.testing.assert_array_equal(np.fromfile(out_path, dtype=np.uint16), expected)
+
+
+def test_iter_line_chunks_cuts_long_lines_at_spaces(tmp_path):
+    path = tmp_path / "long.txt"
+    path.write_text(" ".join(["word"] * 100), encoding="utf-8")
+    chunks = list(iter_line_chunks(path, chunk_chars=16))
+    assert "".join(chunks) == path.read_text(encoding="utf-8")
+    assert len(chunks) > 1 and all(chunk.endswith(" ") for chunk in chunks[:-1])
+
+
+def test_sentencepiece_chunked_encoding_matches_single_pass(tmp_path):
+    text = "".join(f"the quick brown fox {i} jumps over the lazy dog\n" for i in range(100))
+    text += " ".join(["a long line without breaks"] * 40) + "\nend"
+    input_path = tmp_path / "input.txt"
+    input_path.write_text(text, encoding="utf-8")
+    model_dir = tmp_path / "sp"
+    model_dir.mkdir()
+    spm.SentencePieceTrainer.train(
+        input=str(input_path), model_prefix=str(model_dir / "sentencepiece"),
+        vocab_size=60, model_type="bpe", character_coverage=1.0,
+    )
+    (model_dir / METADATA_FILENAME).write_text(json.dumps({"vocab_size": 60, "special_tokens_map": {}}))
+    tokenizer = SentencePieceTokenizer(str(model_dir))
+    out_path = tmp_path / "all.bin"
+    # Many line-aligned chunks, and the long line is cut at spaces
+    encode_file_to_token_file(
+        input_path, out_path, SentencePieceEncoder(model_dir, "uint16", tokenizer=tokenizer), "uint16", chunk_chars=64,
+    )
+    assert np.fromfile(out_path, dtype=np.uint16).tolist() == tokenizer.encode(text, add_special_tokens=False)
+
+
+def test_ascii_byte_path_matches_text_path(tmp_path):
+    path = tmp_path / "ascii.txt"
+    path.write_text("".join(f"line {i}: hello world\n" for i in range(200)), encoding="utf-8")
+    chars = ascii_char_vocab(count_bytes(path, chunk_bytes=100))
+    assert chars == collect_char_vocab(path)
+    char_to_idx = {ch: i for i, ch in enumerate(chars)}
+    lut = CharEncodeTable(char_to_idx).byte_lut
+    n_text = encode_file_to_token_file(path, tmp_path / "text.bin", CharEncoder(char_to_idx, "uint8"), "uint8", chunk_chars=64)
+    n_bytes = encode_file_to_token_file(path, tmp_path / "bytes.bin", None, "uint8", chunk_chars=64, byte_lut=lut)
+    assert n_text == n_bytes == path.stat().st_size
+    np.testing.assert_array_equal(np.fromfile(tmp_path / "bytes.bin", dtype=np.uint8), np.fromfile(tmp_path / "text.bin", dtype=np.uint8))
+    with pytest.raises(KeyError):
+        encode_file_to_token_file(path, tmp_path / "x.bin", None, "uint8", byte_lut=CharEncodeTable({'l': 0}).byte_lut)
+
+
+def test_ascii_char_vocab_rejects_non_ascii_and_crlf(text_file, tmp_path):
+    assert ascii_char_vocab(count_bytes(text_file)) is None # UTF-8 'é'
+    crlf = tmp_path / "crlf.txt"
+    crlf.write_bytes(b"a\r\nb\r\n")
+    assert ascii_char_vocab(count_bytes(crlf)) is None
+
+
+def test_write_split_token_files(tmp_path):
+    token_file = tmp_path / "all.bin"
+    np.arange(100, dtype=np.uint16).tofile(token_file)
+    paths, entries, sizes = write_split_token_files(token_file, "uint16", tmp_path, (0.8, 0.1, 0.1), pickle_dtype=np.int32)
+    assert sizes == {'train': 80, 'val': 10, 'test': 10}
+    assert entries['val']['offset'] == 80
+    np.testing.assert_array_equal(np.fromfile(tmp_path / "test.bin", dtype=np.uint16), np.arange(90, 100))
+    assert paths['train'].endswith("train.pkl")
+
+
+def test_process_char_data_parallel_matches_serial(text_file, tmp_path):
+    serial_dir, parallel_dir = tmp_path / "serial", tmp_path / "parallel"
+    process_char_data(str(text_file), str(serial_dir), write_pickle=False)
+    process_char_data(str(text_file), str(parallel_dir), write_pickle=False, num_workers=2, chunk_chars=100)
+    for split in ("train", "val", "test"):
+        assert (serial_dir / f"{split}.bin").read_bytes() == (parallel_dir / f"{split}.bin").read_bytes()
+    assert not list(parallel_dir.glob("*.tmp"))
+
+
+def test_process_char_data_ascii_input_is_stored_as_uint8(tmp_path):
+    path = tmp_path / "ascii.txt"
+    text = "".join(f"line {i}: hello world\n" for i in range(100))
+    path.write_text(text, encoding="utf-8")
+    out_dir = tmp_path / "out"
+    process_char_data(str(path), str(out_dir), write_pickle=False)
+    metadata = json.loads((out_dir / "metadata.json").read_text())
+    assert metadata['token_store']['dtype'] == "uint8"
+    tokenizer = CharTokenizer.load_from_dir(str(out_dir / "tokenizer"))
+    ids = np.concatenate([np.fromfile(out_dir / f"{split}.bin", dtype=np.uint8) for split in ("train", "val", "test")])
+    assert len(ids) == len(text) and tokenizer.decode(ids.tolist()) == text
+
+
+@pytest.fixture
+def jsonl_file(tmp_path):
+    path = tmp_path / "docs.jsonl"
+    docs = ["first doc", "second", "a third, longer document"] * 20
+    path.write_text("".join(json.dumps({"text": d}) + "\n" for d in docs), encoding="utf-8")
+    return path, docs
+
+
+def test_iter_documents_formats(jsonl_file, tmp_path):
+    path, docs = jsonl_file
+    assert list(iter_documents(path, "jsonl")) == docs
+    delimited = tmp_path / "docs.txt"
+    delimited.write_text("one\ntwo lines\n\nthree\n\n\n\nfour", encoding="utf-8")
+    assert list(iter_documents(delimited, "delimited", chunk_chars=4)) == ["one\ntwo lines", "three", "four"]
+    with pytest.raises(ValueError):
+        list(iter_documents(path, "csv"))
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_encode_documents_packs_with_eos(jsonl_file, tmp_path, num_workers):
+    path, docs = jsonl_file
+    char_to_idx = {ch: i for i, ch in enumerate(collect_char_vocab(path, texts=docs))}
+    eos_id = len(char_to_idx)
+    out_path = tmp_path / "all.bin"
+    n, doc_starts = encode_documents_to_token_file(
+        path, out_path, CharEncoder(char_to_idx, "uint16"), "uint16", eos_id, "jsonl",
+        num_workers=num_workers, chunk_chars=50,
+    )
+    expected = [i for d in docs for i in [char_to_idx[ch] for ch in d] + [eos_id]]
+    np.testing.assert_array_equal(np.fromfile(out_path, dtype=np.uint16), expected)
+    assert n == len(expected) and len(doc_starts) == len(docs)
+    assert all(expected[s - 1] == eos_id for s in doc_starts[1:])
+
+
+def test_process_char_documents_writes_segments(jsonl_file, tmp_path):
+    path, docs = jsonl_file
+    out_dir = tmp_path / "out"
+    process_char_data(str(path), str(out_dir), splits=(0.8, 0.1, 0.1), write_pickle=False, doc_format="jsonl")
+    metadata = json.loads((out_dir / "metadata.json").read_text())
+    assert metadata['num_documents'] == len(docs)
+    assert metadata['token_store']['splits']['train']['doc_index'] == "train.docs.npy"
+
+    dataset = MemmapTokenDataset(str(out_dir / "train.bin"), block_size=16, return_segments=True)
+    sample = dataset[1]
+    assert set(sample) == {'input_ids', 'labels', 'segment_ids'}
+    eos = metadata['eos_id']
+    # The segment id increases right after every EOS inside the block
+    tokens = sample['input_ids'].tolist()
+    expected_segments = np.cumsum([0] + [int(t == eos) for t in tokens[:-1]])
+    assert sample['segment_ids'].tolist() == expected_segments.tolist()
+    batch = dataset.get_batch(torch.tensor([16, 0]))
+    assert torch.equal(batch['segment_ids'][0], sample['segment_ids'])
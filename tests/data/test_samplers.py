@@ -0,0 +1,160 @@
+"""
+Tests for the vectorized random-offset batch sampler.
+"""
+import pickle
+
+import pytest
+import torch
+from omegaconf import OmegaConf
+
+from craft.data.datasets.pickled_dataset import PickledDataset
+from craft.data.samplers import (
+    DeviceBatchLoader,
+    ResumableRandomSampler,
+    RandomOffsetBatchSampler,
+    create_random_offset_dataloader,
+    normalize_sampler_config,
+)
+from craft.training.initialization import _instantiate_single_dataloader
+
+
+@pytest.fixture
+def token_dataset(tmp_path):
+    file_path = tmp_path / "train.pkl"
+    with open(file_path, "wb") as f:
+        pickle.dump(list(range(100)), f)
+    return PickledDataset(str(file_path), block_size=8)
+
+
+def test_sampler_is_deterministic_per_seed():
+    a = list(RandomOffsetBatchSampler(num_tokens=100, block_size=8, batch_size=4, seed=123))
+    b = list(RandomOffsetBatchSampler(num_tokens=100, block_size=8, batch_size=4, seed=123))
+    assert len(a) == len(b) == (99 // 8) // 4
+    assert all(torch.equal(x, y) for x, y in zip(a, b))
+    assert all(int(x.max()) <= 100 - 8 - 1 for x in a)
+
+
+def test_sampler_advances_epoch():
+    sampler = RandomOffsetBatchSampler(num_tokens=1000, block_size=8, batch_size=16, seed=0)
+    first = torch.cat(list(sampler))
+    second = torch.cat(list(sampler))
+    assert sampler.epoch == 2
+    assert not torch.equal(first, second)
+    sampler.set_epoch(0)
+    assert torch.equal(torch.cat(list(sampler)), first)
+
+
+def test_get_batch_matches_getitem_slices(token_dataset):
+    starts = torch.tensor([0, 5, 91])
+    x, y = token_dataset.get_batch(starts)
+    assert x.shape == y.shape == (3, 8)
+    for row, start in enumerate(starts.tolist()):
+        assert torch.equal(x[row], token_dataset.token_ids[start : start + 8])
+        assert torch.equal(y[row], token_dataset.token_ids[start + 1 : start + 9])
+    with pytest.raises(IndexError):
+        token_dataset.get_batch(torch.tensor([92]))
+
+
+def test_random_offset_dataloader_yields_batches(token_dataset):
+    loader = create_random_offset_dataloader(token_dataset, batch_size=4, num_batches=3, seed=7)
+    batches = list(loader)
+    assert len(loader) == 3 and len(batches) == 3
+    x, y = batches[0]
+    assert x.shape == (4, 8) and x.dtype == torch.long
+    assert torch.equal(x[:, 1:], y[:, :-1])
+
+
+def test_normalize_sampler_config():
+    assert normalize_sampler_config(None) is None
+    assert normalize_sampler_config("random_offsets") == {"type": "random_offsets"}
+    assert normalize_sampler_config({"type": "random_offsets", "seed": 1})["seed"] == 1
+    with pytest.raises(ValueError):
+        normalize_sampler_config({"seed": 1})
+
+
+def test_instantiate_dataloader_with_sampler_config(token_dataset):
+    split_cfg = OmegaConf.create({
+        "dataset": {
+            "_target_": "craft.data.datasets.pickled_dataset.PickledDataset",
+            "file_path": str(token_dataset.file_path),
+            "block_size": 8,
+        },
+        "sampler": {"type": "random_offsets", "seed": 3},
+    })
+    data_cfg = OmegaConf.create({"batch_size": 2, "num_workers": 0})
+    loader = _instantiate_single_dataloader(split_cfg, data_cfg, "train", torch.device("cpu"))
+    assert isinstance(loader.sampler, RandomOffsetBatchSampler)
+    assert loader.sampler.seed == 3
+    x, _ = next(iter(loader))
+    assert x.shape == (2, 8)
+
+
+def test_device_batch_loader_matches_dataloader_path(token_dataset):
+    loader = DeviceBatchLoader(token_dataset, batch_size=4, device="cpu", num_batches=3, seed=7)
+    reference = create_random_offset_dataloader(token_dataset, batch_size=4, num_batches=3, seed=7)
+    assert len(loader) == 3
+    for (x, y), (ref_x, ref_y) in zip(loader, reference):
+        assert x.dtype == y.dtype == torch.long and x.device.type == "cpu" # Stored as int32, yielded as int64
+        assert torch.equal(x, ref_x) and torch.equal(y, ref_y)
+    assert loader.dataset is token_dataset
+
+
+def test_instantiate_device_resident_dataloader(token_dataset):
+    split_cfg = OmegaConf.create({
+        "dataset": {
+            "_target_": "craft.data.datasets.pickled_dataset.PickledDataset",
+            "file_path": str(token_dataset.file_path),
+            "block_size": 8,
+        },
+    })
+    data_cfg = OmegaConf.create({"batch_size": 2, "device_resident": True, "sampler": {"type": "random_offsets", "seed": 3}})
+    loader = _instantiate_single_dataloader(split_cfg, data_cfg, "train", torch.device("cpu"))
+    assert isinstance(loader, DeviceBatchLoader)
+    assert loader.sampler.seed == 3
+    x, _ = next(iter(loader))
+    assert x.shape == (2, 8)
+
+
+def test_resumable_sampler_restarts_at_saved_position():
+    sampler = ResumableRandomSampler(range(10), seed=5)
+    full = list(sampler)
+    assert sorted(full) == list(range(10))
+
+    sampler.set_epoch(0)
+    iterator = iter(sampler)
+    [next(iterator) for _ in range(6)] # Indices fetched ahead of the training loop
+    state = sampler.state_dict(batches_consumed=2, batch_size=2)
+    assert state == {'seed': 5, 'epoch': 0, 'position': 4}
+
+    resumed = ResumableRandomSampler(range(10), seed=0)
+    resumed.load_state_dict(state)
+    assert len(resumed) == 6
+    assert list(resumed) == full[4:]
+    assert resumed.state_dict() == {'seed': 5, 'epoch': 1, 'position': 0}
+
+
+def test_random_offset_sampler_state_round_trip():
+    sampler = RandomOffsetBatchSampler(num_tokens=1000, block_size=8, batch_size=4, num_batches=6, seed=1)
+    full = list(sampler)
+    resumed = RandomOffsetBatchSampler(num_tokens=1000, block_size=8, batch_size=4, num_batches=6)
+    resumed.load_state_dict({'seed': 1, 'epoch': 0, 'position': 4})
+    tail = list(resumed)
+    assert len(tail) == 2
+    assert all(torch.equal(a, b) for a, b in zip(tail, full[4:]))
+    # Consuming the last batch rolls the state over to the next epoch
+    sampler.set_epoch(0)
+    list(sampler)
+    assert sampler.state_dict(batches_consumed=6) == {'seed': 1, 'epoch': 1, 'position': 0}
+
+
+def test_random_offset_sampler_state_of_abandoned_pass():
+    sampler = RandomOffsetBatchSampler(num_tokens=1000, block_size=8, batch_size=4, num_batches=6, seed=2)
+    full = list(sampler)
+    sampler.set_epoch(0)
+    iterator = iter(sampler)
+    [next(iterator) for _ in range(4)] # Pass ended early (e.g. max_steps) after 3 batches, one prefetched
+    state = sampler.state_dict(batches_consumed=3)
+    assert state == {'seed': 2, 'epoch': 0, 'position': 3}
+    resumed = RandomOffsetBatchSampler(num_tokens=1000, block_size=8, batch_size=4, num_batches=6)
+    resumed.load_state_dict(state)
+    assert all(torch.equal(a, b) for a, b in zip(list(resumed), full[3:]))
@@ -0,0 +1,72 @@
+"""
+Tests for sharded token storage and ShardedTokenDataset.
+"""
+import json
+
+import numpy as np
+import pytest
+import torch
+
+from craft.data.char_processor import process_char_data
+from craft.data.datasets.sharded_dataset import ShardedTokenDataset, resolve_shard_paths
+from craft.data.token_store import ShardedTokenArray, build_token_store_header, write_token_shards
+
+
+@pytest.fixture
+def sharded_setup(tmp_path):
+    """Writes 23 tokens as shards of 5 tokens plus a metadata.json header."""
+    token_ids = np.arange(23, dtype=np.uint16)
+    entry = write_token_shards(tmp_path, "train", token_ids, "uint16", shard_size=5)
+    metadata = {'vocab_size': 50, 'token_store': build_token_store_header("uint16", {'train': entry})}
+    with open(tmp_path / "metadata.json", "w") as f:
+        json.dump(metadata, f)
+    return tmp_path, token_ids, entry
+
+
+def test_write_token_shards_entry(sharded_setup):
+    tmp_path, token_ids, entry = sharded_setup
+    assert entry['length'] == len(token_ids)
+    assert [s['length'] for s in entry['shards']] == [5, 5, 5, 5, 3]
+    assert [s['offset'] for s in entry['shards']] == [0, 5, 10, 15, 20]
+    assert [p.name for p in resolve_shard_paths(str(tmp_path / "train-*.bin"))] == [s['file'] for s in entry['shards']]
+
+
+def test_sharded_array_spans_boundaries(sharded_setup):
+    tmp_path, token_ids, _ = sharded_setup
+    array = ShardedTokenArray(resolve_shard_paths(str(tmp_path)), "uint16")
+    assert len(array) == len(token_ids)
+    assert array._maps == [None] * 5  # Nothing mapped until first access
+    np.testing.assert_array_equal(array[3:17], token_ids[3:17])
+    assert array[-1] == token_ids[-1]
+    index = np.array([[0, 4, 5], [19, 20, 22]])
+    np.testing.assert_array_equal(array[index], token_ids[index])
+    with pytest.raises(IndexError):
+        array[np.array([23])]
+
+
+def test_sharded_dataset_blocks(sharded_setup):
+    tmp_path, token_ids, _ = sharded_setup
+    dataset = ShardedTokenDataset(str(tmp_path / "train-*.bin"), block_size=6)
+    assert len(dataset) == (len(token_ids) - 6 - 1) // 6 + 1
+    x, y = dataset[1]  # tokens 6..12 cross the shard boundary at 10
+    assert x.dtype == torch.long
+    assert x.tolist() == list(range(6, 12)) and y.tolist() == list(range(7, 13))
+    xb, yb = dataset.get_batch(torch.tensor([2, 14]))
+    assert xb[1].tolist() == list(range(14, 20))
+
+
+def test_sharded_dataset_missing_shards(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ShardedTokenDataset(str(tmp_path / "train-*.bin"), block_size=4)
+
+
+def test_process_char_data_writes_shards(tmp_path):
+    input_file = tmp_path / "input.txt"
+    input_file.write_text("the quick brown fox jumps over the lazy dog " * 10, encoding="utf-8")
+    output_dir = tmp_path / "out"
+    output_paths = process_char_data(str(input_file), str(output_dir), write_pickle=False, shard_size=64)
+    metadata = json.loads((output_dir / "metadata.json").read_text())
+    train_entry = metadata['token_store']['splits']['train']
+    assert len(train_entry['shards']) == -(-train_entry['length'] // 64)
+    dataset = ShardedTokenDataset(output_paths['train'], block_size=16)
+    assert dataset.num_tokens == train_entry['length']
@@ -0,0 +1,63 @@
+"""
+Tests for StreamingTextDataset (chunked, worker-sharded lazy tokenization).
+"""
+import pytest
+import torch
+from unittest.mock import patch, MagicMock
+
+from craft.data.datasets.streaming_text_dataset import StreamingTextDataset
+from craft.data.tokenizers.char import CharTokenizer
+
+
+@pytest.fixture
+def char_tokenizer():
+    chars = sorted(set("abcdefghijklmnopqrstuvwxyz \n"))
+    tokenizer = CharTokenizer()
+    tokenizer.char_to_idx = {ch: i for i, ch in enumerate(chars)}
+    tokenizer.idx_to_char = {i: ch for i, ch in enumerate(chars)}
+    tokenizer.vocab_size = len(chars)
+    return tokenizer
+
+
+@pytest.fixture
+def text_files(tmp_path):
+    first = tmp_path / "a.txt"
+    second = tmp_path / "b.txt"
+    first.write_text("".join(f"line {chr(97 + i % 26)} of the first file\n" for i in range(40)), encoding="utf-8")
+    second.write_text("".join(f"second file line {chr(97 + i % 26)}\n" for i in range(25)), encoding="utf-8")
+    return [str(first), str(second)]
+
+
+def _all_tokens(tokenizer, files):
+    return tokenizer.encode("".join(open(f, encoding="utf-8").read() for f in files))
+
+
+def test_stream_matches_full_tokenization(char_tokenizer, text_files):
+    block_size = 16
+    dataset = StreamingTextDataset(text_files, block_size, char_tokenizer, chunk_size=50)
+    blocks = list(dataset)
+    expected = torch.tensor(_all_tokens(char_tokenizer, text_files))
+    assert len(blocks) == (len(expected) - 1) // block_size
+    for i, (x, y) in enumerate(blocks):
+        start = i * block_size
+        assert torch.equal(x, expected[start : start + block_size])
+        assert torch.equal(y, expected[start + 1 : start + block_size + 1])
+
+
+@pytest.mark.parametrize("num_workers", [2, 3, 7])
+def test_worker_ranges_cover_every_line_once(char_tokenizer, text_files, num_workers):
+    dataset = StreamingTextDataset(text_files, 8, char_tokenizer, chunk_size=37)
+    pieces = []
+    for worker_id in range(num_workers):
+        info = MagicMock(num_workers=num_workers, id=worker_id)
+        with patch("craft.data.datasets.streaming_text_dataset.get_worker_info", return_value=info):
+            for path, start, end in dataset._worker_ranges():
+                pieces.append(("".join(dataset._iter_text_chunks(path, start, end)), path))
+    for path in text_files:
+        text = "".join(piece for piece, piece_path in pieces if piece_path == path)
+        assert text == open(path, encoding="utf-8").read()
+
+
+def test_missing_files_raise(char_tokenizer, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        StreamingTextDataset([str(tmp_path / "missing.txt")], 8, char_tokenizer)
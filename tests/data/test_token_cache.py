@@ -0,0 +1,68 @@
+"""
+Tests for the content-addressed tokenization cache.
+"""
+import os
+
+import numpy as np
+import pytest
+import torch
+from unittest.mock import patch
+
+from craft.data.datasets.text_dataset import TextDataset
+from craft.data.token_cache import TokenCache, file_fingerprint, tokenizer_fingerprint
+from craft.data.tokenizers.char import CharTokenizer
+
+
+@pytest.fixture
+def char_tokenizer():
+    chars = sorted(set("abcdefghijklmnopqrstuvwxyz \n"))
+    tokenizer = CharTokenizer()
+    tokenizer.char_to_idx = {ch: i for i, ch in enumerate(chars)}
+    tokenizer.idx_to_char = {i: ch for i, ch in enumerate(chars)}
+    tokenizer.vocab_size = len(chars)
+    return tokenizer
+
+
+def test_key_changes_with_file_and_tokenizer(tmp_path, char_tokenizer):
+    text_file = tmp_path / "a.txt"
+    text_file.write_text("hello world\n", encoding="utf-8")
+    cache = TokenCache(tmp_path / "cache")
+    key = cache.make_key([text_file], char_tokenizer, "uint16")
+    assert key == cache.make_key([text_file], char_tokenizer, "uint16")
+    assert key != cache.make_key([text_file], char_tokenizer, "uint32")
+
+    other = CharTokenizer()
+    other.char_to_idx = {**char_tokenizer.char_to_idx, "z": 99}
+    assert tokenizer_fingerprint(other) != tokenizer_fingerprint(char_tokenizer)
+
+    before = file_fingerprint(text_file)
+    text_file.write_text("hello world, changed\n", encoding="utf-8")
+    os.utime(text_file, ns=(0, 10**9))
+    assert file_fingerprint(text_file) != before
+    assert file_fingerprint(text_file, hash_contents=True).startswith("sha256:")
+
+
+def test_store_load_and_lru_eviction(tmp_path):
+    cache = TokenCache(tmp_path / "cache")
+    assert cache.load("missing") is None
+    cache.store_array("a", np.arange(100), "uint16")
+    cache.store_array("b", np.arange(100), "uint16")
+    os.utime(cache.cache_dir / "a.json", (1, 1)) # 'a' is least recently used
+    np.testing.assert_array_equal(cache.load("b"), np.arange(100))
+
+    assert cache.evict(max_bytes=200) == ["a"]
+    assert [entry['key'] for entry in cache.entries()] == ["b"]
+    assert cache.clear() == 1
+    assert cache.total_bytes() == 0
+
+
+def test_text_dataset_cache_hit_skips_tokenization(tmp_path, char_tokenizer):
+    text_file = tmp_path / "input.txt"
+    text_file.write_text("the quick brown fox jumps over the lazy dog\n" * 5, encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+    first = TextDataset([str(text_file)], block_size=8, tokenizer=char_tokenizer, cache_dir=str(cache_dir))
+    assert len(TokenCache(cache_dir).entries()) == 1
+
+    with patch.object(CharTokenizer, "encode", side_effect=AssertionError("should not tokenize")):
+        second = TextDataset([str(text_file)], block_size=8, tokenizer=char_tokenizer, cache_dir=str(cache_dir))
+    assert torch.equal(first.token_ids, second.token_ids)
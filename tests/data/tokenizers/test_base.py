@@ -7,7 +7,7 @@ import json
 from pathlib import Path
 from abc import ABC
 
-from craft.data.tokenizers.base import Tokenizer
+from craft.data.tokenizers.base import Tokenizer, apply_special_ids, map_in_threads
 
 # --- Fixtures ---
 
@@ -235,4 +235,25 @@ def test_concrete_tokenizer_encode_decode(concrete_tokenizer_class):
     # Test decoding unknown id
     decoded_bad_id = tokenizer.decode([0, 99, 1])
     # 0 -> 'a', 99 -> unk_token ("<unk>"), 1 -> 'b'
-    assert decoded_bad_id == "a<unk>b" 
\ No newline at end of file
+    assert decoded_bad_id == "a<unk>b" 
+
+
+def test_default_batch_encode_decode_match_single(concrete_tokenizer_class):
+    tokenizer = concrete_tokenizer_class()
+    texts = ["ab", "", "ba", "abc"] * 5
+    assert tokenizer.batch_encode(texts, num_threads=4) == [tokenizer.encode(t) for t in texts]
+    batch = [[0, 1], [], [1, 1, 0]]
+    assert tokenizer.batch_decode(batch, num_threads=2) == [tokenizer.decode(ids) for ids in batch]
+
+
+def test_map_in_threads_keeps_order():
+    assert map_in_threads(lambda x: x * 2, list(range(50)), num_threads=8) == [x * 2 for x in range(50)]
+    assert map_in_threads(len, [], num_threads=8) == []
+
+
+def test_apply_special_ids():
+    batch = [[5, 6], [], [1, 7], [7, 2], [1]]
+    assert apply_special_ids(batch, bos_id=1, eos_id=2) == [[1, 5, 6, 2], [1, 2], [1, 7, 2], [1, 7, 2], [1, 2]]
+    assert apply_special_ids(batch, bos_id=1, eos_id=None) == [[1, 5, 6], [1], [1, 7], [1, 7, 2], [1]]
+    assert apply_special_ids(batch, bos_id=1, eos_id=2, add=False) == [[5, 6], [], [7], [7], []]
+    assert apply_special_ids([], bos_id=1, eos_id=2) == []
@@ -0,0 +1,99 @@
+"""
+Tests for the binary tokenizer file (tokenizer.bin).
+"""
+import json
+import os
+
+import pytest
+
+from craft.data.tokenizers.binary_format import (
+    BINARY_FILE_NAME, TokenizerTable, read_tokenizer_header, write_tokenizer_binary,
+)
+from craft.data.tokenizers.char import CharTokenizer
+
+PIECES = ["<unk>", "▁the", "a", "é", "▁", "<0xE2>", "zebra", "€uro"]
+
+
+@pytest.fixture
+def table_path(tmp_path):
+    return write_tokenizer_binary(
+        tmp_path, dict(enumerate(PIECES)), "sentencepiece",
+        config={"model_type": "bpe"}, special_tokens={"unk_id": 0},
+    )
+
+
+def test_round_trip(table_path):
+    assert table_path.name == BINARY_FILE_NAME
+    table = TokenizerTable(table_path.parent)
+    assert len(table) == len(PIECES)
+    assert table.pieces() == PIECES
+    assert table.vocab() == {piece: i for i, piece in enumerate(PIECES)}
+    assert table.tokenizer_type == "sentencepiece"
+    assert table.config == {"model_type": "bpe"} and table.special_tokens == {"unk_id": 0}
+
+
+def test_lookups(table_path):
+    table = TokenizerTable(table_path)
+    for i, piece in enumerate(PIECES):
+        assert table.id_to_piece(i) == piece
+        assert table.piece_to_id(piece) == i
+    assert table.id_to_piece(len(PIECES)) is None and table.id_to_piece(-1) is None
+    assert table.piece_to_id("missing") is None and table.piece_to_id("") is None
+
+
+def test_empty_vocab(tmp_path):
+    table = TokenizerTable(write_tokenizer_binary(tmp_path, {}, "char"))
+    assert len(table) == 0 and table.pieces() == [] and table.piece_to_id("a") is None
+
+
+def test_header_and_errors(table_path, tmp_path):
+    header = read_tokenizer_header(table_path)
+    assert header["version"] == 1 and header["vocab_size"] == len(PIECES)
+    with pytest.raises(ValueError, match="contiguous"):
+        write_tokenizer_binary(tmp_path / "gap.bin", {0: "a", 2: "b"}, "char")
+    with pytest.raises(ValueError, match="duplicate"):
+        write_tokenizer_binary(tmp_path / "dup.bin", {0: "a", 1: "a"}, "char")
+    bad = tmp_path / "bad.bin"
+    bad.write_bytes(b"NOTATOKENIZER" * 2)
+    with pytest.raises(ValueError, match="bad magic"):
+        TokenizerTable(bad)
+
+
+def _trained_char_tokenizer(tmp_path):
+    text_file = tmp_path / "train.txt"
+    text_file.write_text("hello wörld\n", encoding="utf-8")
+    tokenizer = CharTokenizer(unk_token="<unk>")
+    tokenizer.train(str(text_file), str(tmp_path / "tok"))
+    return tokenizer, tmp_path / "tok"
+
+
+def test_char_tokenizer_loads_from_binary(tmp_path):
+    tokenizer, save_dir = _trained_char_tokenizer(tmp_path)
+    assert (save_dir / BINARY_FILE_NAME).is_file()
+    os.remove(save_dir / "vocab.json") # Binary file alone is enough
+    loaded = CharTokenizer.load_from_dir(str(save_dir))
+    # Only the header is read; special ids are looked up in the mapped tables
+    assert loaded._char_to_idx is None and loaded._idx_to_char is None
+    assert loaded.get_vocab_size() == tokenizer.get_vocab_size()
+    assert loaded.unk_id == tokenizer.unk_id and loaded.eos_id == tokenizer.eos_id
+    assert loaded.encode("hello wörld") == tokenizer.encode("hello wörld")
+    assert loaded.char_to_idx == tokenizer.char_to_idx and loaded.idx_to_char == tokenizer.idx_to_char
+
+
+def test_char_tokenizer_replacing_one_map_keeps_the_other(tmp_path):
+    tokenizer, save_dir = _trained_char_tokenizer(tmp_path)
+    loaded = CharTokenizer.load_from_dir(str(save_dir))
+    loaded.char_to_idx = dict(tokenizer.char_to_idx)
+    assert loaded.idx_to_char == tokenizer.idx_to_char
+
+
+def test_char_tokenizer_prefers_newer_json(tmp_path):
+    tokenizer, save_dir = _trained_char_tokenizer(tmp_path)
+    vocab_path = save_dir / "vocab.json"
+    vocab = json.loads(vocab_path.read_text(encoding="utf-8"))
+    vocab["!"] = len(vocab)
+    vocab_path.write_text(json.dumps(vocab), encoding="utf-8")
+    binary_mtime = os.stat(save_dir / BINARY_FILE_NAME).st_mtime_ns
+    os.utime(vocab_path, ns=(binary_mtime + 10**9, binary_mtime + 10**9)) # Hand-edited after save
+    loaded = CharTokenizer.load_from_dir(str(save_dir))
+    assert loaded.get_vocab_size() == tokenizer.get_vocab_size() + 1
@@ -7,7 +7,10 @@ import json
 import pickle
 from pathlib import Path
 
-from craft.data.tokenizers.char import CharTokenizer
+import numpy as np
+import torch
+
+from craft.data.tokenizers.char import CharEncodeTable, CharTokenizer
 
 # --- Fixtures ---
 
@@ -291,4 +294,74 @@ def test_char_tokenizer_decode_unknown_id_with_unk(temp_text_file_for_tokenizer,
     
     decoded = tokenizer.decode([h_id, unknown_id, h_id])
     # Expect the custom UNK token string
-    assert decoded == f"h{custom_unk}h" 
\ No newline at end of file
+    assert decoded == f"h{custom_unk}h" 
+def test_char_tokenizer_batch_decode_matches_decode(temp_text_file_for_tokenizer, tmp_path):
+    """batch_decode of a [B, T] tensor equals decoding each row."""
+    tokenizer = CharTokenizer(unk_token='<unk>')
+    tokenizer.train(temp_text_file_for_tokenizer, str(tmp_path / "batch_decode_test"))
+    rows = [tokenizer.encode("hello"), tokenizer.encode("world")]
+    batch = torch.tensor(rows)
+    assert tokenizer.batch_decode(batch) == ["hello", "world"]
+    assert tokenizer.decode(batch[0]) == "hello"
+
+    eos_row = torch.tensor([rows[0] + [tokenizer.eos_id]])
+    assert tokenizer.batch_decode(eos_row) == ["hello<eos>"]
+    assert tokenizer.batch_decode(eos_row, skip_special_tokens=True) == ["hello"]
+    with pytest.raises(ValueError):
+        tokenizer.batch_decode(batch[0])
+
+
+def test_char_tokenizer_encode_array_matches_dict_lookup():
+    chars = sorted(set("abc é€\n")) + ["😀"]
+    tokenizer = CharTokenizer(unk_token='<unk>')
+    tokenizer.char_to_idx = {ch: i for i, ch in enumerate(chars + ['<unk>'])}
+    tokenizer.idx_to_char = {i: ch for ch, i in tokenizer.char_to_idx.items()}
+    tokenizer._sync_special_ids_with_vocab()
+    text = "abc é€😀 xyz🙂\n"
+    expected = [tokenizer.char_to_idx.get(ch, tokenizer.unk_token_id) for ch in text]
+    array = tokenizer.encode_array(text)
+    assert array.dtype == np.int64 and array.tolist() == expected
+    assert tokenizer.encode(text) == expected
+    assert tokenizer.encode_array(text, dtype=np.uint16).dtype == np.uint16
+
+
+def test_char_tokenizer_batch_encode():
+    tokenizer = CharTokenizer(unk_token=None)
+    tokenizer.char_to_idx = {ch: i for i, ch in enumerate("abc")}
+    tokenizer._sync_special_ids_with_vocab()
+    texts = ["abc", "", "xa", "zz", "cab"]
+    # Without an UNK token, unknown characters are dropped from their own row only
+    assert tokenizer.batch_encode(texts) == [tokenizer.encode(t) for t in texts] == [[0, 1, 2], [], [0], [], [2, 0, 1]]
+    tensors = tokenizer.batch_encode(["ab", "c"], return_tensors='pt')
+    assert [t.tolist() for t in tensors] == [[0, 1], [2]]
+    assert tokenizer.batch_encode([]) == []
+    with pytest.raises(ValueError):
+        tokenizer.batch_encode(["a"], return_tensors='tf')
+
+
+def test_char_encode_table_rebuilds_on_vocab_change():
+    tokenizer = CharTokenizer(unk_token=None)
+    tokenizer.char_to_idx = {'a': 0}
+    tokenizer._sync_special_ids_with_vocab()
+    assert tokenizer.encode("ab") == [0]
+    tokenizer.char_to_idx = {'a': 0, 'b': 1}
+    assert tokenizer.encode("ab") == [0, 1]
+    # A same-sized replacement (whose id may be reused) must not hit the old tables
+    tokenizer.idx_to_char = {0: 'a', 1: 'b'}
+    assert tokenizer.decode([1, 0]) == "ba"
+    tokenizer.char_to_idx = {'b': 0, 'a': 1}
+    tokenizer.idx_to_char = {0: 'b', 1: 'a'}
+    assert tokenizer.encode("ab") == [1, 0]
+    assert tokenizer.decode([1, 0]) == "ab"
+
+
+def test_char_encode_table_byte_lut():
+    table = CharEncodeTable({ch: i for i, ch in enumerate("ab\né")}, unknown_id=9)
+    assert table.byte_lut is not None and table.byte_lut[ord('é')] == 3
+    # The Latin-1 path and the codepoint fallback (for text above U+00FF) agree
+    assert table.encode("abé\nz").tolist() == [0, 1, 3, 2, 9]
+    assert table.encode("a€b").tolist() == [0, 9, 1]
+    assert table.encode_bytes(b"ba\n", np.uint8).tolist() == [1, 0, 2]
+    assert CharEncodeTable({'a': 0, '€': 1}).byte_lut is None
+    with pytest.raises(ValueError):
+        CharEncodeTable({'😀': 0}).encode_bytes(b"a")
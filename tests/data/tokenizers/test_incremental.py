@@ -0,0 +1,91 @@
+"""
+Tests for incremental (streaming) detokenization.
+"""
+import pytest
+
+from craft.data.tokenizers.char import CharTokenizer
+from craft.data.tokenizers.incremental import CharIncrementalDecoder, IncrementalDecoder
+
+
+class PieceTokenizer:
+    """SentencePiece-like decoding: '▁' marks a space, <0xNN> pieces are UTF-8 bytes, the leading space is dropped."""
+
+    PIECES = ["▁Hello", "▁wor", "ld", "!", "▁", "<0xE2>", "<0x82>", "<0xAC>", "s", "<0xFF>"]
+
+    def decode(self, ids):
+        data = bytearray()
+        for piece in (self.PIECES[i] for i in ids):
+            if piece.startswith("<0x"):
+                data.append(int(piece[3:5], 16))
+            else:
+                data.extend(piece.replace("▁", " ").encode("utf-8"))
+        text = data.decode("utf-8", errors="replace")
+        return text[1:] if text.startswith(" ") else text
+
+
+def _stream(decoder, ids):
+    return [decoder.push(i) for i in ids] + [decoder.flush()]
+
+
+def test_fragments_join_to_full_decode():
+    tokenizer = PieceTokenizer()
+    ids = [0, 1, 2, 3, 4, 5, 6, 7, 8, 1, 2]
+    fragments = _stream(IncrementalDecoder(tokenizer), ids)
+    assert "".join(fragments) == tokenizer.decode(ids) == "Hello world! €s world"
+    # Leading-space markers after the first word are kept
+    assert fragments[:4] == ["Hello", " wor", "ld", "!"]
+
+
+def test_partial_utf8_bytes_are_held_back():
+    decoder = IncrementalDecoder(PieceTokenizer())
+    decoder.push(0)
+    assert decoder.push(5) == "" and decoder.push(6) == ""
+    assert decoder.push(7) == "€"
+
+
+def test_invalid_bytes_are_emitted_after_max_pending():
+    decoder = IncrementalDecoder(PieceTokenizer(), max_pending=2)
+    assert decoder.push(9) == ""
+    assert decoder.push(9) == "��"
+    assert decoder.push(5) == "" and decoder.flush() == "�"
+
+
+def test_prompt_as_context():
+    tokenizer = PieceTokenizer()
+    decoder = IncrementalDecoder(tokenizer)
+    decoder.extend([0, 1])
+    assert decoder.push(2) == "ld"
+    assert decoder.push(1) == " wor"
+
+
+class CleanupTokenizer:
+    """Joins pieces, then removes the space before punctuation (which rewrites the context)."""
+
+    PIECES = ["one", "two ", ".", " three"]
+
+    def decode(self, ids):
+        return "".join(self.PIECES[i] for i in ids).replace(" .", ".")
+
+
+def test_rewritten_context_is_not_emitted_again():
+    decoder = IncrementalDecoder(CleanupTokenizer())
+    assert decoder.push(0) == "one" and decoder.push(1) == "two "
+    # "two " is re-decoded as "two." with the next piece: only the text after "two" is new
+    assert decoder.push(2) == "."
+    assert decoder.push(3) == " three" and decoder.flush() == ""
+
+
+@pytest.fixture
+def char_tokenizer():
+    tokenizer = CharTokenizer(unk_token=None)
+    tokenizer.char_to_idx = {ch: i for i, ch in enumerate("abc é")}
+    tokenizer.idx_to_char = {i: ch for ch, i in tokenizer.char_to_idx.items()}
+    tokenizer._sync_special_ids_with_vocab()
+    return tokenizer
+
+
+def test_char_tokenizer_incremental_decoder(char_tokenizer):
+    decoder = char_tokenizer.incremental_decoder()
+    assert isinstance(decoder, CharIncrementalDecoder)
+    ids = char_tokenizer.encode("abé ca")
+    assert "".join(_stream(decoder, ids)) == char_tokenizer.decode(ids) == "abé ca"
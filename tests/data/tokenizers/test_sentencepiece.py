@@ -12,6 +12,7 @@ from typing import Any, Dict
 
 # Module under test
 from craft.data.tokenizers.sentencepiece import SentencePieceTokenizer, METADATA_FILENAME # Import METADATA_FILENAME
+from craft.data.tokenizers.binary_format import BINARY_FILE_NAME
 
 # --- Fixtures ---
 
@@ -147,14 +148,53 @@ class TestSentencePieceTokenizer:
         sp_tokenizer_fixture.decode(ids_to_decode)
         mock_sp_processor.decode.assert_called_once_with(ids_to_decode)
 
+    def test_batch_encode_uses_native_threads(self, sp_tokenizer_fixture, mock_sp_processor):
+        """batch_encode passes the whole list and num_threads to the processor, then adds BOS/EOS per flags."""
+        mock_sp_processor.encode.return_value = [[10, 20], [], [2, 30]]
+        sp_tokenizer_fixture._add_bos_token = True
+        result = sp_tokenizer_fixture.batch_encode(["a", "", "b"], num_threads=3)
+        mock_sp_processor.encode.assert_called_once_with(["a", "", "b"], num_threads=3)
+        assert result == [[2, 10, 20], [2], [2, 30]]
+        assert sp_tokenizer_fixture.batch_encode(["a", "", "b"], add_special_tokens=False) == [[10, 20], [], [30]]
+        assert sp_tokenizer_fixture.batch_encode(["a", "", "b"], None, False) == [[10, 20], [], [30]]
+        # Positional add_special_tokens in its original second position still works
+        assert sp_tokenizer_fixture.batch_encode(["a", "", "b"], False) == [[10, 20], [], [30]]
+        assert mock_sp_processor.encode.call_args.kwargs == {'num_threads': ANY}
+
+    def test_batch_decode_uses_native_threads(self, sp_tokenizer_fixture, mock_sp_processor):
+        mock_sp_processor.decode.return_value = ["x", "y"]
+        assert sp_tokenizer_fixture.batch_decode([[10], [20, 30]], num_threads=2) == ["x", "y"]
+        mock_sp_processor.decode.assert_called_once_with([[10], [20, 30]], num_threads=2)
+        assert sp_tokenizer_fixture.batch_decode([]) == []
+
     def test_get_vocab_size_initialized(self, sp_tokenizer_fixture, mock_sp_processor):
         """Test get_vocab_size returns the value from the loaded processor."""
         assert sp_tokenizer_fixture.get_vocab_size() == mock_sp_processor.get_piece_size()
 
-    def test_save_not_implemented(self, sp_tokenizer_fixture: SentencePieceTokenizer):
-        """Test that save method is not implemented (use trainer)."""
-        with pytest.raises(NotImplementedError):
-            sp_tokenizer_fixture.save("some_dir") # TODO: Save to temp dir
+    def test_save_writes_binary_vocab_table(self, sp_tokenizer_fixture: SentencePieceTokenizer, mock_sp_processor, tmp_path):
+        """Test that save writes tokenizer.bin and a reload serves vocab lookups from it."""
+        save_dir = tmp_path / "saved"
+        sp_tokenizer_fixture.save(save_dir)
+        assert (save_dir / SentencePieceTokenizer.MODEL_FILENAME).is_file()
+        assert (save_dir / METADATA_FILENAME).is_file()
+        assert (save_dir / BINARY_FILE_NAME).is_file()
+
+        mock_sp_processor.id_to_piece.reset_mock()
+        with patch('craft.data.tokenizers.sentencepiece.spm.SentencePieceProcessor', return_value=mock_sp_processor) as mock_proc_cls:
+            reloaded = SentencePieceTokenizer(model_path=str(save_dir))
+            assert reloaded.vocab_table is not None
+            mock_proc_cls.assert_not_called() # Metadata, ids and vocab come from tokenizer.bin
+            assert reloaded.get_vocab_size() == 1000
+            assert (reloaded.unk_token_id, reloaded.bos_token_id, reloaded.eos_token_id, reloaded.pad_token_id) == (1, 2, 3, 0)
+            assert reloaded.id_to_token(500) == "<piece_500>"
+            assert reloaded.token_to_id("<piece_500>") == 500
+            assert reloaded.token_to_id("<unk>") == 1 # Special token override
+            assert reloaded.token_to_id("missing") is None
+            assert len(reloaded.get_vocab()) == 1000
+            mock_proc_cls.assert_not_called()
+            reloaded.decode([10]) # The model is loaded by the first call that needs it
+            mock_proc_cls.assert_called_once()
+        mock_sp_processor.id_to_piece.assert_not_called() # No per-piece rebuild
 
     def test_train_not_implemented(self, sp_tokenizer_fixture: SentencePieceTokenizer):
         """Test that train method is not implemented (use trainer)."""
@@ -227,6 +227,16 @@ class TestSubwordTokenizer:
         mock_hf_tokenizer.decode.assert_called_with(ids, skip_special_tokens=False)
         assert result_not_skipped == "decoded subword text" # Mock doesn't change based on skip
         
+    def test_batch_encode_decode_use_hf_batch_methods(self, default_subword_config, mock_hf_tokenizer):
+        """batch_encode / batch_decode delegate to encode_batch / decode_batch in one call."""
+        tokenizer = self._setup_initialized_tokenizer(default_subword_config['vocab_size'], mock_hf_tokenizer)
+        mock_hf_tokenizer.encode_batch.return_value = [MagicMock(ids=[1, 2]), MagicMock(ids=[3])]
+        assert tokenizer.batch_encode(["a b", "c"]) == [[1, 2], [3]]
+        mock_hf_tokenizer.encode_batch.assert_called_once_with(["a b", "c"])
+        mock_hf_tokenizer.decode_batch.return_value = ["a b", "c"]
+        assert tokenizer.batch_decode([[1, 2], [3]]) == ["a b", "c"]
+        mock_hf_tokenizer.decode_batch.assert_called_once_with([[1, 2], [3]], skip_special_tokens=True)
+
     def test_get_vocab_size_initialized(self, default_subword_config, mock_hf_tokenizer):
         """Test get_vocab_size delegates to HF tokenizer when initialized."""
         tokenizer = self._setup_initialized_tokenizer(default_subword_config['vocab_size'], mock_hf_tokenizer)
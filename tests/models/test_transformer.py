@@ -60,4 +60,19 @@ class TestTransformerModel:
         input_ids = torch.randint(0, transformer_model.config.vocab_size, (5, 10))
         output = transformer_model(input_ids)
         
-        # Expected shape: (batch_size, seq_len, vocab_size) 
\ No newline at end of file
+        # Expected shape: (batch_size, seq_len, vocab_size) 
+
+def test_document_mask_isolates_packed_documents():
+    model = TransformerModel(vocab_size=50, d_model=32, n_head=4, n_layers=2, max_seq_length=16).eval()
+    segment_ids = torch.tensor([[0, 0, 0, 1, 1, 1, 1, 2]])
+    mask = model._generate_document_mask(segment_ids)
+    assert mask.dtype == torch.bool and mask.shape == (1, 8, 8)
+    assert not mask[0, 4, 3] and mask[0, 4, 2] and mask[0, 3, 4] # Same document / other document / future
+    input_ids = torch.randint(0, 50, (1, 8))
+    changed = input_ids.clone()
+    changed[0, :3] = (changed[0, :3] + 1) % 50 # Edit only the first document
+    with torch.no_grad():
+        logits, changed_logits = model(input_ids, segment_ids=segment_ids), model(changed, segment_ids=segment_ids)
+        padded = model(input_ids, segment_ids=segment_ids, attention_mask=torch.ones(1, 8, dtype=torch.long))
+    assert torch.allclose(logits[0, 3:], changed_logits[0, 3:], atol=1e-5)
+    assert torch.allclose(logits, padded, atol=1e-5)
@@ -0,0 +1,51 @@
+"""
+Tests for the sequence-length curriculum in src/craft/training/curriculum.py
+"""
+import pytest
+import torch
+
+from craft.config.schemas import TrainingConfig
+from craft.training.curriculum import SequenceLengthWarmup
+
+
+def test_length_schedule_grows_to_full_length():
+    warmup = SequenceLengthWarmup(start_length=128, warmup_steps=100, multiple_of=64)
+    assert warmup.length_at(0, 1024) == 128
+    assert warmup.length_at(50, 1024) == 576
+    assert warmup.length_at(100, 1024) == 1024
+    assert warmup.length_at(10_000, 1024) == 1024
+    assert [warmup.length_at(s, 1024) for s in range(100)] == sorted(warmup.length_at(s, 1024) for s in range(100))
+
+
+def test_apply_keeps_tokens_per_step_and_alignment():
+    warmup = SequenceLengthWarmup(start_length=4, warmup_steps=10, multiple_of=1)
+    inputs = torch.arange(32).view(2, 16)
+    targets = inputs + 1
+    x, y, kwargs = warmup.apply(0, inputs, targets, {'segment_ids': torch.zeros(2, 16, dtype=torch.long)})
+    assert x.shape == y.shape == (8, 4)
+    assert torch.equal(y, x + 1)
+    assert kwargs['segment_ids'].shape == (8, 4)
+    assert x[4].tolist() == [16, 17, 18, 19] # Second row's first chunk
+    # After warmup the batch is untouched
+    x_full, _, _ = warmup.apply(10, inputs, targets, {})
+    assert x_full is inputs
+
+
+def test_apply_drops_remainder_and_padding_only_chunks():
+    warmup = SequenceLengthWarmup(start_length=4, warmup_steps=10, multiple_of=1)
+    inputs = torch.ones(1, 10, dtype=torch.long)
+    mask = torch.tensor([[1, 1, 1, 1, 1, 0, 0, 0, 0, 0]])
+    x, y, kwargs = warmup.apply(0, inputs, inputs, {'attention_mask': mask})
+    # 10 // 4 = 2 chunks; both contain real tokens
+    assert x.shape == (2, 4)
+    mask = torch.tensor([[1, 1, 1, 0, 0, 0, 0, 0, 0, 0]])
+    x, _, kwargs = warmup.apply(0, inputs, inputs, {'attention_mask': mask})
+    assert x.shape == (1, 4)
+    assert kwargs['attention_mask'].tolist() == [[1, 1, 1, 0]]
+
+
+def test_training_config_accepts_warmup():
+    config = TrainingConfig(max_steps=10, seq_len_warmup={'start_length': 64, 'warmup_steps': 5})
+    assert config.seq_len_warmup.multiple_of == 8
+    with pytest.raises(ValueError):
+        SequenceLengthWarmup(start_length=0, warmup_steps=5)
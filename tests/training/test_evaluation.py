@@ -408,4 +408,63 @@ def test_evaluator_initialization(
     assert not evaluator.use_amp
     assert evaluator.callbacks == mock_callbacks
 
-# More tests to come... 
\ No newline at end of file
+# More tests to come... 
+
+class _ScoringModel(torch.nn.Module):
+    """Returns uniform logits; records the inputs it sees."""
+    def __init__(self, vocab_size=10):
+        super().__init__()
+        self.vocab_size = vocab_size
+        self.seen = []
+
+    def forward(self, x, **kwargs):
+        self.seen.append(x[:, 0].clone())
+        return torch.zeros(x.size(0), x.size(1), self.vocab_size)
+
+
+def _val_loader(num_samples=40, seq_len=4, batch_size=4):
+    inputs = torch.arange(num_samples).unsqueeze(1).repeat(1, seq_len)
+    return DataLoader(TensorDataset(inputs, torch.zeros_like(inputs)), batch_size=batch_size)
+
+
+def test_evaluate_budget_scores_same_subset_each_time():
+    model = _ScoringModel()
+    evaluator = Evaluator(model, _val_loader(), torch.device("cpu"), max_batches=2, subset_seed=3)
+    evaluator.evaluate()
+    first = torch.cat(model.seen)
+    model.seen.clear()
+    evaluator.evaluate()
+    second = torch.cat(model.seen)
+    assert len(first) == 8 # 2 batches of 4 samples
+    assert torch.equal(first, second)
+    assert len(set(first.tolist())) == 8
+
+
+def test_evaluate_token_budget_uses_block_size():
+    loader = _val_loader()
+    loader.dataset.block_size = 4 # TensorDataset has no block_size; 4 tokens per sample
+    model = _ScoringModel()
+    Evaluator(model, loader, torch.device("cpu"), max_tokens=12).evaluate()
+    assert len(torch.cat(model.seen)) == 3
+
+
+def test_evaluate_full_eval_every():
+    model = _ScoringModel()
+    evaluator = Evaluator(model, _val_loader(), torch.device("cpu"), max_batches=1, full_eval_every=2)
+    counts = []
+    for _ in range(4):
+        model.seen.clear()
+        evaluator.evaluate()
+        counts.append(len(torch.cat(model.seen)))
+    assert counts == [4, 40, 4, 40]
+    model.seen.clear()
+    evaluator.evaluate(full=True)
+    assert len(torch.cat(model.seen)) == 40
+
+
+def test_evaluate_budget_stops_streaming_loader():
+    batches = [(torch.ones(2, 3, dtype=torch.long), torch.zeros(2, 3, dtype=torch.long)) for _ in range(5)]
+    model = _ScoringModel()
+    results = Evaluator(model, batches, torch.device("cpu"), max_batches=2).evaluate()
+    assert len(model.seen) == 2
+    assert results['loss'] == pytest.approx(torch.log(torch.tensor(10.0)).item())
@@ -338,6 +338,7 @@ def test_trainer_init_refactored(
         device=mock_initialize_device.return_value,
         use_amp=trainer.config.use_amp,
         callbacks=mock_callback_list_instance,
+        eval_budget={'max_batches': None, 'max_tokens': None, 'full_eval_every': None},
     )
     compile_options_cfg = experiment_config.get("torch_compile_options")
     mock_compile_model.assert_called_once_with(
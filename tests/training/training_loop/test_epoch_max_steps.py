@@ -90,4 +90,18 @@ class TestEpochMaxSteps:
         assert mock_progress_tracker_instance.update.call_count == config.max_steps
         assert mock_cross_entropy.call_count == config.max_steps
         assert mock_optimizer.zero_grad.call_count == 1 + config.max_steps
-        assert "average_epoch_loss" in epoch_metrics # Check average loss key exists 
\ No newline at end of file
+        assert "average_epoch_loss" in epoch_metrics # Check average loss key exists 
+
+def test_max_steps_records_batches_consumed():
+    """A pass stopped by max_steps records how many batches the loop took, for the sampler checkpoint."""
+    data = torch.randint(0, 10, (20, 4))
+    loader = DataLoader(TensorDataset(data, data), batch_size=2)
+    model = torch.nn.Embedding(10, 10)
+    config = TrainingConfig(batch_size=2, log_interval=10, num_epochs=1, learning_rate=1e-3, use_amp=False, max_steps=3)
+    loop = TrainingLoop(
+        model=model, optimizer=torch.optim.SGD(model.parameters(), lr=1e-3),
+        train_dataloader=loader, device=torch.device("cpu"), config=config,
+    )
+    assert loop.batches_consumed is None
+    loop.train_epoch(trainer=MagicMock(), current_epoch=0, global_step=0, progress=ProgressTracker(disable_progress_bar=True))
+    assert loop.batches_consumed == 3